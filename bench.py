@@ -0,0 +1,431 @@
+"""Benchmarks for the scan path against local stub servers.
+
+Run with `python bench.py`. Results are printed and written to bench_output.txt.
+
+Every upstream (Roblox users, groups, friends and badges, plus Mococo) is served
+by one in-process aiohttp app. Each Roblox service listens on its own loopback
+address so the bot keeps a separate rate limiter per service, as it does in
+production (Linux routes all of 127.0.0.0/8 to loopback). Discord is replaced
+by the fake interaction, channel and member objects below.
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from aiohttp import web
+
+import bot
+
+STUB_HOST = "127.0.0.1"
+STUB_PORT = 8765
+OUTPUT_FILE = "bench_output.txt"
+
+# Stub address per upstream service -> the real host whose rate limits it gets
+STUB_SERVICES = {
+    "mococo": (STUB_HOST, "api.moco-co.org"),
+    "users": ("127.0.0.2", "users.roblox.com"),
+    "groups": ("127.0.0.3", "groups.roblox.com"),
+    "friends": ("127.0.0.4", "friends.roblox.com"),
+    "badges": ("127.0.0.5", "badges.roblox.com"),
+}
+ROOT_USER_ID = 10_000_000  # Scanned users get IDs from here; their friends count up from ROOT_USER_ID + 1000 * run
+BENIGN_GROUP_ID = 1
+
+
+class StubServer:
+    """In-process aiohttp server standing in for the Roblox and Mococo APIs"""
+
+    def __init__(self, latency=0.05, flagged_every=25, error_rate=0.0, friends=100, badges=650,
+                 friends_of_friends=20, seed=1):
+        self.latency = latency
+        self.flagged_every = flagged_every
+        self.error_rate = error_rate
+        self.friends = friends
+        self.badges = badges
+        self.friends_of_friends = friends_of_friends
+        self.random = random.Random(seed)
+        self.requests = {}
+        self.errors = 0
+        self.runner = None
+
+    def count(self, name):
+        self.requests[name] = self.requests.get(name, 0) + 1
+
+    async def respond(self, name, body):
+        """Count the request, wait the stub latency, and fail it at the configured error rate"""
+        self.count(name)
+        await asyncio.sleep(self.latency)
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.errors += 1
+            return web.json_response({"errors": [{"message": "stub error"}]}, status=500)
+        return web.json_response(body)
+
+    def is_root(self, user_id):
+        return user_id >= ROOT_USER_ID
+
+    def friend_ids(self, user_id):
+        if self.is_root(user_id):
+            base = ROOT_USER_ID // 10 + (user_id - ROOT_USER_ID) * 1000
+            return list(range(base + 1, base + 1 + self.friends))
+        return [user_id * 100 + index for index in range(1, self.friends_of_friends + 1)]
+
+    def mococo_record(self, user_id):
+        return {"id": user_id, "flagged": user_id % self.flagged_every == 0}
+
+    async def mococo_user(self, request):
+        return await self.respond("mococo_user", self.mococo_record(int(request.match_info["user_id"])))
+
+    async def mococo_check(self, request):
+        user_ids = (await request.json())["userIds"]
+        return await self.respond("mococo_check", {"results": [self.mococo_record(user_id) for user_id in user_ids]})
+
+    async def usernames(self, request):
+        names = (await request.json())["usernames"]
+        data = [{"id": int(name.rsplit("_", 1)[1]), "name": name, "requestedUsername": name}
+                for name in names if name.startswith("bench_") and name.rsplit("_", 1)[1].isdigit()]
+        return await self.respond("usernames", {"data": data})
+
+    async def user_info(self, request):
+        user_id = int(request.match_info["user_id"])
+        return await self.respond("user_info", {
+            "id": user_id, "name": f"user_{user_id}", "displayName": f"User {user_id}",
+            "created": "2018-06-01T00:00:00.000Z",
+        })
+
+    async def users_bulk(self, request):
+        user_ids = (await request.json())["userIds"]
+        data = [{"id": user_id, "name": f"user_{user_id}", "displayName": f"User {user_id}"} for user_id in user_ids]
+        return await self.respond("users_bulk", {"data": data})
+
+    async def user_groups(self, request):
+        user_id = int(request.match_info["user_id"])
+        group_ids = [BENIGN_GROUP_ID]
+        if user_id % self.flagged_every == 0:
+            group_ids.append(min(bot.policy_store.snapshot.flagged_groups))
+        return await self.respond("user_groups", {"data": [{"group": {"id": group_id}, "role": {"rank": 1}} for group_id in group_ids]})
+
+    async def group_info(self, request):
+        group_id = int(request.match_info["group_id"])
+        return await self.respond("group_info", {"id": group_id, "name": f"Group {group_id}", "memberCount": 1000})
+
+    async def group_users(self, request):
+        return await self.respond("group_users", {"data": [], "nextPageCursor": None})
+
+    async def friends_page(self, request):
+        friend_ids = self.friend_ids(int(request.match_info["user_id"]))
+        start = int(request.query.get("cursor") or 0)
+        limit = int(request.query.get("limit", 100))
+        page = friend_ids[start:start + limit]
+        cursor = str(start + limit) if start + limit < len(friend_ids) else None
+        return await self.respond("friends", {"data": [{"id": friend_id} for friend_id in page], "nextPageCursor": cursor})
+
+    async def friend_count(self, request):
+        return await self.respond("friend_count", {"count": len(self.friend_ids(int(request.match_info["user_id"])))})
+
+    async def badges_page(self, request):
+        start = int(request.query.get("cursor") or 0)
+        page = min(100, max(0, self.badges - start))
+        cursor = str(start + page) if start + page < self.badges else None
+        return await self.respond("badges", {"data": [{"id": start + index} for index in range(page)], "nextPageCursor": cursor})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/user/{user_id}", self.mococo_user)
+        app.router.add_post("/check", self.mococo_check)
+        app.router.add_post("/v1/usernames/users", self.usernames)
+        app.router.add_post("/v1/users", self.users_bulk)
+        app.router.add_get("/v1/users/{user_id}", self.user_info)
+        app.router.add_get("/v2/users/{user_id}/groups/roles", self.user_groups)
+        app.router.add_get("/v1/groups/{group_id}", self.group_info)
+        app.router.add_get("/v1/groups/{group_id}/users", self.group_users)
+        app.router.add_get("/v1/users/{user_id}/friends", self.friends_page)
+        app.router.add_get("/v1/users/{user_id}/friends/count", self.friend_count)
+        app.router.add_get("/v1/users/{user_id}/badges", self.badges_page)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        for host, _ in STUB_SERVICES.values():
+            await web.TCPSite(self.runner, host, STUB_PORT).start()
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+class FakeDiscord:
+    """Counts and delays every call made through the fake Discord objects"""
+
+    def __init__(self, latency=0.1):
+        self.latency = latency
+        self.calls = {}
+        self.ids = iter(range(1, 1 << 62))
+
+    async def call(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        await asyncio.sleep(self.latency)
+
+
+class FakeMessage:
+    def __init__(self, discord_layer, channel, content):
+        self.discord = discord_layer
+        self.channel = channel
+        self.content = content
+        self.id = next(discord_layer.ids)
+
+    async def edit(self, content=None, **kwargs):
+        await self.discord.call("message_edit")
+        self.content = content
+
+    async def delete(self, delay=None):
+        await self.discord.call("message_delete")
+
+
+class FakeChannel:
+    def __init__(self, discord_layer, name="bench"):
+        self.discord = discord_layer
+        self.name = name
+        self.id = next(discord_layer.ids)
+        self.mention = f"<#{self.id}>"
+        self.messages = []
+
+    def __str__(self):
+        return self.name
+
+    async def send(self, content=None, **kwargs):
+        await self.discord.call("channel_send")
+        message = FakeMessage(self.discord, self, content)
+        self.messages.append(message)
+        return message
+
+
+class FakeFollowup:
+    def __init__(self, channel):
+        self.channel = channel
+
+    async def send(self, content=None, wait=False, ephemeral=False, **kwargs):
+        await self.channel.discord.call("followup_send")
+        message = FakeMessage(self.channel.discord, self.channel, content)
+        self.channel.messages.append(message)
+        return message
+
+
+class FakeResponse:
+    def __init__(self, discord_layer):
+        self.discord = discord_layer
+
+    async def defer(self, **kwargs):
+        await self.discord.call("response_defer")
+
+    async def send_message(self, content=None, **kwargs):
+        await self.discord.call("response_send")
+
+
+class FakeGuild:
+    def __init__(self):
+        self.roles = []
+        self.members = {}
+        self.me = None
+
+    def get_member(self, member_id):
+        return self.members.get(member_id)
+
+
+class FakeMember:
+    def __init__(self, discord_layer, guild, username):
+        self.discord = discord_layer
+        self.guild = guild
+        self.id = next(discord_layer.ids)
+        self.name = username
+        self.nick = username
+        self.display_name = username
+        self.mention = f"<@{self.id}>"
+        self.roles = []
+        self.top_role = None
+        guild.members[self.id] = self
+
+    async def add_roles(self, *roles, reason=None):
+        await self.discord.call("add_roles")
+
+    async def remove_roles(self, *roles, reason=None):
+        await self.discord.call("remove_roles")
+
+
+class FakeInteraction:
+    def __init__(self, discord_layer, channel, guild, user):
+        self.channel = channel
+        self.guild = guild
+        self.user = user
+        self.response = FakeResponse(discord_layer)
+        self.followup = FakeFollowup(channel)
+
+
+def point_bot_at_stub():
+    base = f"http://{STUB_HOST}:{STUB_PORT}"
+    bot.MOCOCO_API_BASE = base
+    bot.MOCOCO_CHECK_ENDPOINT = f"{base}/check"
+    bot.MOCOCO_USER_ENDPOINT = f"{base}/user"
+    # Rewrite each Roblox endpoint to its service's stub address, keeping the path
+    stub_for_host = {real_host: host for host, real_host in STUB_SERVICES.values()}
+    for name in bot.UPSTREAM_ENDPOINTS:
+        url = getattr(bot, name)
+        parts = urlsplit(url)
+        if parts.hostname in stub_for_host:
+            setattr(bot, name, url.replace(f"{parts.scheme}://{parts.netloc}", f"http://{stub_for_host[parts.hostname]}:{STUB_PORT}", 1))
+    # Give each stub address the same limits as the real host it stands in for
+    for host, real_host in STUB_SERVICES.values():
+        bot.HOST_RATE_LIMITS[host] = bot.HOST_RATE_LIMITS[real_host]
+    for cache in bot.cache_registry:
+        cache.store = None
+
+
+def reset_bot_state(stub):
+    for cache in bot.cache_registry:
+        cache.clear()
+    bot.host_limiters.clear()
+    bot.mococo_breaker = bot.CircuitBreaker("Mococo")
+    bot.mococo_bulk_disabled_until = 0.0
+    bot.tracer.pending.clear()
+    bot.tracer.recent.clear()
+    bot.verification_history.pending.clear()
+    stub.requests.clear()
+    stub.errors = 0
+
+
+async def wait_for_outbound():
+    """Let the outbound dispatcher finish posting queued channel messages"""
+    while bot.outbound_dispatcher.workers:
+        await asyncio.sleep(0.01)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def bench_mococo_batching(stub, friends):
+    """Mococo fan-out for one scan: per-friend calls vs bulk check requests.
+
+    The "unlimited" row is the behaviour before the per-host limiter: per-friend
+    calls, five at a time, with no rate cap.
+    """
+    friend_ids = list(range(1000, 1000 + friends))
+    lines = [f"Mococo fan-out ({friends} friends, {stub.latency * 1000:.0f}ms stub latency, no injected errors)"]
+    # Injected 500s would make the adaptive limiter back off and swamp the batching difference
+    error_rate, stub.error_rate = stub.error_rate, 0.0
+    limits = bot.HOST_RATE_LIMITS[STUB_HOST]
+    for label, bulk_enabled, host_limits in (("unlimited", False, (1_000_000, 5)), ("per-friend", False, limits), ("batched", True, limits)):
+        reset_bot_state(stub)
+        bot.HOST_RATE_LIMITS[STUB_HOST] = host_limits
+        bot.MOCOCO_BULK_ENABLED = bulk_enabled
+        start = time.perf_counter()
+        results = await asyncio.gather(*(bot.check_user_with_mococo(friend_id) for friend_id in friend_ids))
+        elapsed = time.perf_counter() - start
+        flagged = sum(1 for result in results if result and result.get("flagged"))
+        requests = sum(stub.requests.values())
+        lines.append(f"  {label:<11} requests={requests:<4} wall={elapsed:7.2f}s flagged={flagged}")
+    bot.HOST_RATE_LIMITS[STUB_HOST] = limits
+    bot.MOCOCO_BULK_ENABLED = True
+    stub.error_rate = error_rate
+    return lines
+
+
+async def bench_scenario(stub, discord_layer, name, runs, run_once):
+    """Run one command `runs` times from a cold cache and report wall time, traffic and stage timings"""
+    walls = []
+    requests = {}
+    discord_calls = {}
+    stages = {}
+    errors = 0
+    failed = 0
+    for run in range(runs):
+        reset_bot_state(stub)
+        discord_layer.calls.clear()
+        username = f"bench_{ROOT_USER_ID + run}"
+        start = time.perf_counter()
+        try:
+            with bot.tracer.trace(name, user=username) as root:
+                await run_once(username)
+                await wait_for_outbound()
+        except Exception as e:
+            # Injected errors can outlast the bot's retries; record the run and carry on
+            failed += 1
+            print(f"{name} run {run} failed: {e!r}")
+        walls.append(time.perf_counter() - start)
+        errors += stub.errors
+        for endpoint, count in stub.requests.items():
+            requests[endpoint] = requests.get(endpoint, 0) + count
+        for call, count in discord_layer.calls.items():
+            discord_calls[call] = discord_calls.get(call, 0) + count
+        trace = bot.tracer.recent[username.lower()]
+        for span in trace.spans:
+            if span.parent_id == root.span_id and span.duration is not None:
+                stages[span.name] = max(stages.get(span.name, 0.0), span.duration)
+
+    lines = [f"{name}: runs={runs} failed={failed} mean={sum(walls) / runs:6.2f}s p50={percentile(walls, 0.5):6.2f}s max={max(walls):6.2f}s"]
+    lines.append("  upstream  " + " ".join(f"{endpoint}={count / runs:.0f}" for endpoint, count in sorted(requests.items()))
+                 + f" (stub errors {errors / runs:.1f}/run)")
+    lines.append("  discord   " + " ".join(f"{call}={count / runs:.0f}" for call, count in sorted(discord_calls.items())))
+    lines.append("  slowest   " + " ".join(f"{stage}={seconds:.2f}s" for stage, seconds in sorted(stages.items(), key=lambda item: -item[1])[:6]))
+    return lines
+
+
+async def bench_commands(stub, args):
+    discord_layer = FakeDiscord(args.discord_latency)
+    guild = FakeGuild()
+    channel = FakeChannel(discord_layer)
+    admin = FakeMember(discord_layer, guild, bot.ADMIN_USER)
+    interaction = FakeInteraction(discord_layer, channel, guild, admin)
+
+    async def check(username):
+        await bot.run_check(interaction, username)
+
+    async def deepcheck(username):
+        await bot.run_deepcheck(interaction, username, args.depth)
+
+    async def auto_check(username):
+        # Test mode posts results but skips role changes and appeal channels
+        member = FakeMember(discord_layer, guild, username)
+        await bot.auto_check_user(member, username, channel, test_mode=True)
+
+    scenarios = {"check": check, "deepcheck": deepcheck, "auto_check_user": auto_check}
+    lines = [f"Commands ({args.friends} friends, {args.badges} badges, {stub.latency * 1000:.0f}ms upstream, "
+             f"{args.discord_latency * 1000:.0f}ms Discord, {args.error_rate:.0%} errors, deepcheck depth {args.depth})"]
+    for name in args.scenarios.split(","):
+        lines += await bench_scenario(stub, discord_layer, name, args.runs, scenarios[name])
+    return lines
+
+
+async def main(args):
+    stub = StubServer(latency=args.latency, error_rate=args.error_rate, friends=args.friends, badges=args.badges, seed=args.seed)
+    await stub.start()
+    point_bot_at_stub()
+    try:
+        lines = [f"Benchmark run {datetime.now().isoformat(timespec='seconds')}"]
+        lines += await bench_mococo_batching(stub, args.friends)
+        if args.scenarios:
+            lines += await bench_commands(stub, args)
+    finally:
+        await bot.outbound_dispatcher.stop()
+        await bot.close_http_session()
+        await stub.stop()
+
+    report = "\n".join(lines)
+    print(report)
+    with open(OUTPUT_FILE, "a") as f:
+        f.write(report + "\n\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--friends", type=int, default=100, help="Friends per simulated scan")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub response latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of stub responses that return HTTP 500")
+    parser.add_argument("--badges", type=int, default=650, help="Badges each scanned user has")
+    parser.add_argument("--discord-latency", type=float, default=0.1, help="Latency of each fake Discord call in seconds")
+    parser.add_argument("--depth", type=int, default=1, help="Friend hops explored by the deepcheck scenario")
+    parser.add_argument("--runs", type=int, default=3, help="Cold-cache runs per command scenario")
+    parser.add_argument("--scenarios", default="check,deepcheck,auto_check_user",
+                        help="Comma-separated command scenarios to run (empty for the Mococo fan-out only)")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for stub error injection")
+    asyncio.run(main(parser.parse_args()))
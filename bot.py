@@ -3,18 +3,31 @@ from discord import app_commands
 from discord.ext import commands
 import aiohttp
 import asyncio
-import requests
 import os
 import json
 import traceback
 import atexit
+import time
+import sqlite3
+import threading
+import contextlib
+import contextvars
+import random
+import itertools
+import re
+from collections import OrderedDict, deque
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+from dataclasses import asdict, dataclass
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
+from aiohttp import web
 
 TOKEN = os.getenv('DISCORD_TOKEN', "pastetokenhere") # idk how to set up private data values in github 
 if not TOKEN:
     raise ValueError("DISCORD_TOKEN is required!")
 
+# Built-in defaults; once changed from Discord, the policy store (policy.json) takes over
 FLAGGED_GROUP_IDS = [12960473, 35488582, 32418149, 35576099, 1051291555, 34532432, 34107403, 15872214, 35988727, 34202968, 35448137, 12877535, 13835630, 35942619, 8487267, 33301603, 35788564, 35868778, 172319536]
 WHITELIST = [528953104939483186, 713929689768656999] 
 ADMIN_USER = "wizardstrike1"
@@ -32,8 +45,11 @@ DEFAULT_CUTS = 5
 ROBLOX_API = "https://users.roblox.com/v1/usernames/users"
 GROUPS_API = "https://groups.roblox.com/v2/users/{user_id}/groups/roles"
 FRIENDS_API = "https://friends.roblox.com/v1/users/{user_id}/friends"
+FRIEND_COUNT_API = "https://friends.roblox.com/v1/users/{user_id}/friends/count"
 GROUP_INFO_API = "https://groups.roblox.com/v1/groups/{group_id}"
+GROUP_USERS_API = "https://groups.roblox.com/v1/groups/{group_id}/users?limit=100&sortOrder=Desc"
 USER_INFO_API = "https://users.roblox.com/v1/users/{user_id}"
+USERS_BULK_API = "https://users.roblox.com/v1/users"
 THUMBNAIL_API = "https://thumbnails.roblox.com/v1/users/avatar-headshot?userIds={user_id}&size=720x720&format=Png&isCircular=false"
 BADGES_API = "https://badges.roblox.com/v1/users/{user_id}/badges?limit=100&sortOrder=Asc"
 
@@ -42,70 +58,1462 @@ MOCOCO_API_BASE = "https://api.moco-co.org"
 MOCOCO_CHECK_ENDPOINT = f"{MOCOCO_API_BASE}/check"
 MOCOCO_USER_ENDPOINT = f"{MOCOCO_API_BASE}/user"
 
-async def check_user_with_mococo(session, roblox_user_id):
-    """Check a Roblox user using Mococo API for suspicious/condo associations"""
-    try:
-        # Try the user endpoint first
-        url = f"{MOCOCO_USER_ENDPOINT}/{roblox_user_id}"
-        headers = {
-            'Accept': 'application/json',
-            'User-Agent': 'RobloxModerationBot/1.0'
+# Shared HTTP client configuration
+HTTP_CONNECTION_LIMIT = 100  # Total open connections across all hosts
+HTTP_CONNECTION_LIMIT_PER_HOST = 20  # Per-host cap (users/groups/friends.roblox.com, api.moco-co.org)
+HTTP_KEEPALIVE_TIMEOUT = 60  # Seconds an idle connection is kept for reuse
+HTTP_DNS_CACHE_TTL = 300  # Seconds to cache DNS lookups
+HTTP_TIMEOUT = aiohttp.ClientTimeout(total=30, connect=10, sock_read=20)
+
+http_session = None
+http_stats = {
+    "requests": 0,
+    "connections_created": 0,
+    "connections_reused": 0,
+    "request_errors": 0,
+}
+
+async def _on_request_start(session, ctx, params):
+    http_stats["requests"] += 1
+
+async def _on_request_exception(session, ctx, params):
+    http_stats["request_errors"] += 1
+
+async def _on_connection_create_end(session, ctx, params):
+    http_stats["connections_created"] += 1
+
+async def _on_connection_reuseconn(session, ctx, params):
+    http_stats["connections_reused"] += 1
+
+async def get_http_session():
+    """Return the process-wide HTTP session, creating it on first use"""
+    global http_session
+    if http_session is None or http_session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_CONNECTION_LIMIT,
+            limit_per_host=HTTP_CONNECTION_LIMIT_PER_HOST,
+            keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+            use_dns_cache=True
+        )
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(_on_request_start)
+        trace_config.on_request_exception.append(_on_request_exception)
+        trace_config.on_connection_create_end.append(_on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(_on_connection_reuseconn)
+        http_session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=HTTP_TIMEOUT,
+            trace_configs=[trace_config],
+            headers={'User-Agent': 'RobloxModerationBot/1.0'}
+        )
+        print("🌐 Opened shared HTTP session")
+    return http_session
+
+async def close_http_session():
+    """Close the process-wide HTTP session on shutdown"""
+    global http_session
+    if http_session is not None and not http_session.closed:
+        await http_session.close()
+        print("🌐 Closed shared HTTP session")
+    http_session = None
+
+def get_connection_reuse_ratio():
+    """Fraction of requests that were served over an already-open connection"""
+    total = http_stats["connections_created"] + http_stats["connections_reused"]
+    if total == 0:
+        return 0.0
+    return http_stats["connections_reused"] / total
+
+# Metrics configuration
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)  # Seconds, for upstream and Discord calls
+SCAN_BUCKETS = (1, 2.5, 5, 10, 20, 30, 60, 120, 300)  # Seconds, for whole scans and queued jobs
+LOOP_LAG_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+class Metric:
+    """A counter or gauge: one value per label set"""
+
+    def __init__(self, name, kind, help_text):
+        self.name = name
+        self.kind = kind
+        self.help = help_text
+        self.values = {}  # sorted (label, value) tuple -> number
+
+    def inc(self, value=1, **labels):
+        key = tuple(sorted(labels.items()))
+        self.values[key] = self.values.get(key, 0) + value
+
+    def set(self, value, **labels):
+        self.values[tuple(sorted(labels.items()))] = value
+
+    def get(self, **labels):
+        return self.values.get(tuple(sorted(labels.items())), 0)
+
+    def samples(self):
+        """(suffix, labels, value) lines in exposition order"""
+        for key, value in self.values.items():
+            yield "", key, value
+
+class Histogram(Metric):
+    """Cumulative-bucket histogram per label set, plus quantile estimates for /botstats"""
+
+    def __init__(self, name, help_text, buckets):
+        super().__init__(name, "histogram", help_text)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        series = self.values.get(key)
+        if series is None:
+            series = self.values[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series["counts"][index] += 1
+                break
+        else:
+            series["counts"][-1] += 1
+        series["sum"] += value
+        series["count"] += 1
+
+    def quantile(self, q, key):
+        """Estimate the q-quantile of one series by interpolating inside its bucket"""
+        series = self.values[key]
+        rank = q * series["count"]
+        bounds = self.buckets + (float("inf"),)
+        seen = 0
+        for index, count in enumerate(series["counts"]):
+            if count and seen + count >= rank:
+                lower = bounds[index - 1] if index else 0.0
+                if bounds[index] == float("inf"):
+                    return lower
+                return lower + (bounds[index] - lower) * (rank - seen) / count
+            seen += count
+        return 0.0
+
+    def samples(self):
+        for key, series in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series["counts"]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                yield "_bucket", key + (("le", le),), cumulative
+            yield "_sum", key, series["sum"]
+            yield "_count", key, series["count"]
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class MetricsRegistry:
+    """Process-wide metrics rendered in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = []  # Called before rendering to refresh gauges read from other objects
+
+    def _add(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text):
+        return self._add(Metric(name, "counter", help_text))
+
+    def gauge(self, name, help_text):
+        return self._add(Metric(name, "gauge", help_text))
+
+    def histogram(self, name, help_text, buckets):
+        return self._add(Histogram(name, help_text, buckets))
+
+    def collect(self):
+        for collector in self.collectors:
+            try:
+                collector()
+            except Exception as e:
+                print(f"⚠️ Metrics collector {collector.__name__} failed: {e}")
+
+    def render(self):
+        self.collect()
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, labels, value in metric.samples():
+                label_text = ",".join(f'{label}="{escape_label(label_value)}"' for label, label_value in labels)
+                lines.append(f"{metric.name}{suffix}{{{label_text}}} {value}" if label_text else f"{metric.name}{suffix} {value}")
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+upstream_latency = metrics.histogram("bot_upstream_request_seconds", "Upstream response time per endpoint (excluding rate limiter wait)", LATENCY_BUCKETS)
+upstream_responses = metrics.counter("bot_upstream_responses_total", "Upstream responses by endpoint and HTTP status")
+upstream_errors = metrics.counter("bot_upstream_errors_total", "Upstream requests that failed without a response")
+rate_limit_wait = metrics.histogram("bot_rate_limit_wait_seconds", "Time spent waiting for a host rate limiter slot", LATENCY_BUCKETS)
+discord_send_latency = metrics.histogram("bot_discord_send_seconds", "Discord channel message send time", LATENCY_BUCKETS)
+discord_sends = metrics.counter("bot_discord_sends_total", "Discord channel message sends by status")
+scan_duration = metrics.histogram("bot_scan_duration_seconds", "Wall time of one user scan by command", SCAN_BUCKETS)
+verdicts = metrics.counter("bot_verdicts_total", "Verification verdicts by command")
+job_duration = metrics.histogram("bot_queue_job_seconds", "Verification queue job run time by job kind", SCAN_BUCKETS)
+job_wait = metrics.histogram("bot_queue_wait_seconds", "Verification queue wait before a job starts", SCAN_BUCKETS)
+loop_lag = metrics.histogram("bot_event_loop_lag_seconds", "How late the event loop woke a periodic timer", LOOP_LAG_BUCKETS)
+
+# Endpoint constants used as the `endpoint` label, most specific first where one URL extends another
+UPSTREAM_ENDPOINTS = (
+    "ROBLOX_API", "GROUPS_API", "FRIEND_COUNT_API", "FRIENDS_API", "GROUP_USERS_API", "GROUP_INFO_API",
+    "USER_INFO_API", "USERS_BULK_API", "THUMBNAIL_API", "BADGES_API", "MOCOCO_CHECK_ENDPOINT", "MOCOCO_USER_ENDPOINT",
+)
+endpoint_patterns = {}  # URL template -> compiled pattern
+
+def endpoint_label(url):
+    """Name of the endpoint constant a request URL was built from, or its host"""
+    path = url.split("?", 1)[0]
+    for name in UPSTREAM_ENDPOINTS:
+        template = globals()[name].split("?", 1)[0]
+        pattern = endpoint_patterns.get(template)
+        if pattern is None:
+            # Placeholders match one path segment; one extra trailing segment covers f"{MOCOCO_USER_ENDPOINT}/{id}"
+            pattern = re.compile(re.sub(r"\\\{\w+\\\}", "[^/]+", re.escape(template)) + "(/[^/]+)?$")
+            endpoint_patterns[template] = pattern
+        if pattern.match(path):
+            return name
+    return urlsplit(url).hostname or "unknown"
+
+# Tracing configuration
+TRACE_FILE = "traces.jsonl"
+TRACE_FILE_MAX_BYTES = 10 * 1024 * 1024  # Rotate to traces.jsonl.1 once the file would pass this size
+TRACE_FILE_BACKUPS = 3  # Rotated files kept (traces.jsonl.1 ... .3)
+TRACE_FLUSH_INTERVAL = 2  # Seconds between batched writes
+TRACE_MAX_SPANS = 5000  # Spans kept per trace; later spans are counted but dropped
+TRACE_RECENT_USERS = 200  # Users whose latest trace stays in memory for /perfstats
+
+@dataclass
+class Span:
+    span_id: int
+    parent_id: int  # None for the root span
+    name: str
+    start: float  # Seconds after the trace started
+    tags: dict
+    duration: float = None  # None while running
+
+class Trace:
+    """All spans recorded under one root span (one queued scan job)"""
+
+    def __init__(self, name, tags):
+        self.trace_id = os.urandom(8).hex()
+        self.started_at = time.time()
+        self.start_monotonic = time.monotonic()
+        self.ids = itertools.count(1)
+        self.root = Span(0, None, name, 0.0, tags)
+        self.spans = [self.root]
+        self.dropped = 0
+        self.finished = False
+
+current_span = contextvars.ContextVar("current_span", default=None)  # (Trace, Span) the running code belongs to
+
+class Tracer:
+    """Nested timing spans for scans, written to a rotating JSONL file.
+
+    `trace()` opens a root span and `span()` opens a child of whatever span
+    is current, so stages, upstream calls and tasks started inside a trace
+    nest under it automatically. Outside a trace `span()` does nothing.
+    Finished traces are queued and appended from a worker thread; the latest
+    trace per user also stays in memory for /perfstats.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.pending = []  # Encoded span lines
+        self.recent = OrderedDict()  # Lowercase username -> latest finished Trace
+        self.task = None
+        self.traces_finished = 0
+        self.spans_written = 0
+        self.spans_dropped = 0
+        self.rotations = 0
+
+    @contextlib.contextmanager
+    def trace(self, name, **tags):
+        trace = Trace(name, tags)
+        token = current_span.set((trace, trace.root))
+        try:
+            yield trace.root
+        except BaseException as e:
+            trace.root.tags["error"] = type(e).__name__
+            raise
+        finally:
+            trace.root.duration = time.monotonic() - trace.start_monotonic
+            current_span.reset(token)
+            self._finish(trace)
+
+    @contextlib.contextmanager
+    def span(self, name, **tags):
+        current = current_span.get()
+        if current is None or current[0].finished:
+            yield None
+            return
+        trace, parent = current
+        if len(trace.spans) >= TRACE_MAX_SPANS:
+            trace.dropped += 1
+            yield None
+            return
+        span = Span(next(trace.ids), parent.span_id, name, time.monotonic() - trace.start_monotonic, tags)
+        trace.spans.append(span)
+        token = current_span.set((trace, span))
+        try:
+            yield span
+        except BaseException as e:
+            span.tags["error"] = type(e).__name__
+            raise
+        finally:
+            span.duration = time.monotonic() - trace.start_monotonic - span.start
+            current_span.reset(token)
+
+    def tag(self, **tags):
+        """Add tags (such as the resolved user) to the current trace's root span"""
+        current = current_span.get()
+        if current is not None:
+            current[0].root.tags.update(tags)
+
+    def _finish(self, trace):
+        trace.finished = True
+        self.traces_finished += 1
+        self.spans_dropped += trace.dropped
+        command = trace.root.tags.get("command", trace.root.name)
+        user = trace.root.tags.get("user")
+        for span in trace.spans:
+            self.pending.append(json.dumps({
+                "trace_id": trace.trace_id,
+                "span_id": span.span_id,
+                "parent_id": span.parent_id,
+                "name": span.name,
+                "command": command,
+                "user": user,
+                "started_at": round(trace.started_at + span.start, 6),
+                "duration_ms": round(span.duration * 1000, 3) if span.duration is not None else None,
+                "tags": span.tags,
+            }, default=str))
+        if user:
+            self.recent[user.lower()] = trace
+            self.recent.move_to_end(user.lower())
+            while len(self.recent) > TRACE_RECENT_USERS:
+                self.recent.popitem(last=False)
+
+    def _rotate(self):
+        for index in range(TRACE_FILE_BACKUPS - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{index}"):
+                os.replace(f"{self.path}.{index}", f"{self.path}.{index + 1}")
+        os.replace(self.path, f"{self.path}.1")
+        self.rotations += 1
+
+    def _write(self, lines):
+        data = "".join(f"{line}\n" for line in lines)
+        with self.lock:
+            if os.path.exists(self.path) and os.path.getsize(self.path) + len(data) > TRACE_FILE_MAX_BYTES:
+                self._rotate()
+            with open(self.path, 'a') as f:
+                f.write(data)
+        self.spans_written += len(lines)
+
+    async def flush(self):
+        if not self.pending:
+            return
+        lines = self.pending
+        self.pending = []
+        try:
+            await asyncio.to_thread(self._write, lines)
+        except Exception as e:
+            print(f"⚠️ Error writing traces: {e}")
+
+    def _read_latest(self, user):
+        """Rebuild the newest trace for `user` from the current trace file"""
+        with self.lock:
+            if not os.path.exists(self.path):
+                return None
+            records = []
+            with open(self.path, 'r') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        continue  # Torn line from a crash mid-write
+        trace_id = next((record["trace_id"] for record in reversed(records)
+                         if record["parent_id"] is None and (record["user"] or "").lower() == user), None)
+        spans = [record for record in records if record["trace_id"] == trace_id]
+        if not spans:
+            return None
+        root = next(record for record in spans if record["parent_id"] is None)
+        trace = Trace(root["name"], root["tags"])
+        trace.trace_id = trace_id
+        trace.started_at = root["started_at"]
+        trace.finished = True
+        trace.spans = [
+            Span(record["span_id"], record["parent_id"], record["name"], record["started_at"] - root["started_at"], record["tags"],
+                 record["duration_ms"] / 1000 if record["duration_ms"] is not None else None)
+            for record in sorted(spans, key=lambda record: record["span_id"])
+        ]
+        trace.root = trace.spans[0]
+        return trace
+
+    async def latest(self, user):
+        """Most recent finished trace for a Roblox username, from memory or the trace file"""
+        trace = self.recent.get(user.lower())
+        if trace is not None:
+            return trace
+        await self.flush()
+        return await asyncio.to_thread(self._read_latest, user.lower())
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(TRACE_FLUSH_INTERVAL)
+            await self.flush()
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        await self.flush()
+
+tracer = Tracer(TRACE_FILE)
+
+# Rate limiter configuration: host -> (starting requests/second, max concurrent requests)
+HOST_RATE_LIMITS = {
+    "api.moco-co.org": (50, 5),  # Concurrency is the real limit here, as with the old five-at-a-time loop
+    "users.roblox.com": (20, 10),
+    "groups.roblox.com": (20, 10),
+    "friends.roblox.com": (10, 5),
+    "badges.roblox.com": (10, 5),
+}
+DEFAULT_HOST_RATE_LIMIT = (10, 5)
+RATE_LIMIT_MIN_RATE = 0.5  # Never throttle a host below this many requests/second
+RATE_LIMIT_MIN_CONCURRENCY = 1
+RATE_LIMIT_INCREASE = 0.1  # Additive increase per successful request
+RATE_LIMIT_PROBE_FACTOR = 4  # Successes may raise a host's rate up to this multiple of its starting rate
+RATE_LIMIT_DECREASE = 0.5  # Multiplicative decrease on 429/5xx
+RATE_LIMIT_DEFAULT_BACKOFF = 2  # Seconds to pause a host when a 429/5xx has no Retry-After
+RATE_LIMIT_MAX_BACKOFF = 60
+API_MAX_RETRIES = 2  # Retries for 429/5xx responses before returning them to the caller
+
+class HostLimiter:
+    """Token-bucket rate limiter with AIMD concurrency control for one upstream host.
+
+    Requests take a token (refilled at `rate` per second) and a concurrency
+    slot. The configured rate is only a starting point: successful responses
+    keep raising it, probing for the fastest rate the host accepts (up to
+    RATE_LIMIT_PROBE_FACTOR times the start), and raise concurrency back to
+    its configured maximum. A 429 or 5xx halves both and pauses the host for
+    the Retry-After period.
+    """
+
+    def __init__(self, host, start_rate, max_concurrency, probe_factor=RATE_LIMIT_PROBE_FACTOR):
+        self.host = host
+        self.start_rate = start_rate
+        self.max_rate = start_rate * probe_factor
+        self.max_concurrency = max_concurrency
+        self.rate = float(start_rate)
+        self.concurrency = float(max_concurrency)
+        self.tokens = float(start_rate)
+        self.last_refill = time.monotonic()
+        self.blocked_until = 0.0
+        self.consecutive_throttles = 0
+        self.in_flight = 0
+        self.waiting = 0
+        self.requests = 0
+        self.throttled = 0
+        self.cond = asyncio.Condition()
+
+    def _refill(self, now):
+        self.tokens = min(self.rate, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def _delay(self):
+        """Seconds until a request may start, 0 if now, or None to wait for a release"""
+        now = time.monotonic()
+        self._refill(now)
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.in_flight >= int(self.concurrency):
+            return None
+        if self.tokens < 1:
+            return (1 - self.tokens) / self.rate
+        return 0
+
+    async def acquire(self, abort=None):
+        """Wait for a token and a slot. Returns False if abort() became true while queued."""
+        self.waiting += 1
+        try:
+            async with self.cond:
+                while True:
+                    if abort is not None and abort():
+                        return False
+                    delay = self._delay()
+                    if delay == 0:
+                        self.tokens -= 1
+                        self.in_flight += 1
+                        self.requests += 1
+                        return True
+                    if abort is not None:
+                        # Re-check the abort condition at least once a second
+                        delay = 1.0 if delay is None else min(delay, 1.0)
+                    try:
+                        await asyncio.wait_for(self.cond.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            self.waiting -= 1
+
+    async def release(self, status=None, retry_after=None):
+        """Return a slot and adapt the rate to the response status (None for network errors)"""
+        async with self.cond:
+            self.in_flight -= 1
+            if status is not None and (status == 429 or status >= 500):
+                self.throttled += 1
+                if time.monotonic() < self.blocked_until and retry_after is None:
+                    # Already backing off; this response was sent before the pause began
+                    self.cond.notify_all()
+                    return
+                self.consecutive_throttles += 1
+                self.rate = max(RATE_LIMIT_MIN_RATE, self.rate * RATE_LIMIT_DECREASE)
+                self.concurrency = max(RATE_LIMIT_MIN_CONCURRENCY, self.concurrency * RATE_LIMIT_DECREASE)
+                if retry_after is None:
+                    retry_after = min(RATE_LIMIT_MAX_BACKOFF, RATE_LIMIT_DEFAULT_BACKOFF * 2 ** (self.consecutive_throttles - 1))
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+                print(f"⏳ {self.host} throttled ({status}); pausing {retry_after:.1f}s at {self.rate:.1f} req/s")
+            elif status is not None:
+                self.consecutive_throttles = 0
+                self.rate = min(self.max_rate, self.rate + RATE_LIMIT_INCREASE)
+                self.concurrency = min(self.max_concurrency, self.concurrency + RATE_LIMIT_INCREASE)
+            self.cond.notify_all()
+
+    def stats(self):
+        return {
+            "rate": self.rate,
+            "start_rate": self.start_rate,
+            "max_rate": self.max_rate,
+            "concurrency": int(self.concurrency),
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "requests": self.requests,
+            "throttled": self.throttled,
+            "paused_for": max(0.0, self.blocked_until - time.monotonic()),
         }
+
+host_limiters = {}
+
+def get_host_limiter(url):
+    host = urlsplit(url).hostname or ""
+    limiter = host_limiters.get(host)
+    if limiter is None:
+        start_rate, max_concurrency = HOST_RATE_LIMITS.get(host, DEFAULT_HOST_RATE_LIMIT)
+        limiter = HostLimiter(host, start_rate, max_concurrency)
+        host_limiters[host] = limiter
+    return limiter
+
+def parse_retry_after(value):
+    """Parse a Retry-After header (seconds or HTTP date) into seconds"""
+    if not value:
+        return None
+    try:
+        return min(RATE_LIMIT_MAX_BACKOFF, max(0.0, float(value)))
+    except ValueError:
+        pass
+    try:
+        return min(RATE_LIMIT_MAX_BACKOFF, max(0.0, parsedate_to_datetime(value).timestamp() - time.time()))
+    except (TypeError, ValueError):
+        return None
+
+@contextlib.asynccontextmanager
+async def api_request(method, url, retries=API_MAX_RETRIES, breaker=None, **kwargs):
+    """Make a request through the shared session and the host's rate limiter.
+
+    429 and 5xx responses are retried up to `retries` times, honouring
+    Retry-After. After that the last response is returned to the caller.
+    If a circuit `breaker` is given, it is checked once a rate-limit slot is
+    free, so requests queued behind an outage fail fast once it opens.
+    """
+    session = await get_http_session()
+    limiter = get_host_limiter(url)
+    endpoint = endpoint_label(url)
+    attempt = 0
+    with tracer.span(f"{method} {endpoint}", endpoint=endpoint) as span:
+        while True:
+            abort = breaker.rejecting if breaker is not None else None
+            wait_start = time.monotonic()
+            if not await limiter.acquire(abort):
+                raise CircuitOpenError(f"{breaker.name} circuit breaker is open")
+            rate_limit_wait.observe(time.monotonic() - wait_start, host=limiter.host)
+            if breaker is not None and not breaker.allow():
+                await limiter.release()
+                raise CircuitOpenError(f"{breaker.name} circuit breaker is open")
+            request_start = time.monotonic()
+            try:
+                resp = await session.request(method, url, **kwargs)
+            except BaseException as e:
+                if isinstance(e, Exception):
+                    upstream_errors.inc(endpoint=endpoint, error=type(e).__name__)
+                await limiter.release()
+                raise
+            upstream_latency.observe(time.monotonic() - request_start, endpoint=endpoint)
+            upstream_responses.inc(endpoint=endpoint, status=str(resp.status))
+            retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+            await limiter.release(resp.status, retry_after)
+            if (resp.status == 429 or resp.status >= 500) and attempt < retries:
+                resp.release()
+                attempt += 1
+                continue
+            break
+        if span is not None:
+            span.tags.update(status=resp.status, retries=attempt)
+    try:
+        yield resp
+    finally:
+        resp.release()
+
+# Cache configuration (seconds)
+GROUP_NAME_CACHE_TTL = 24 * 3600  # Group names rarely change
+USER_GROUP_CACHE_TTL = 3600  # Memberships change; re-check friends at least hourly
+PROFILE_CACHE_TTL = 6 * 3600
+MOCOCO_CACHE_TTL = 6 * 3600
+NEGATIVE_CACHE_TTL = 300  # 404s and empty responses
+STALE_WHILE_REVALIDATE = 600  # Serve expired entries this long while refreshing in the background
+GROUP_NAME_CACHE_SIZE = 5000
+USER_GROUP_CACHE_SIZE = 50000
+PROFILE_CACHE_SIZE = 50000
+MOCOCO_CACHE_SIZE = 50000
+
+CACHE_MISS = object()
+cache_registry = []  # Every TTLCache, for /cachestats
+singleflight_registry = []  # Every SingleFlight, for /cachestats
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one in-flight task.
+
+    The first caller for a key starts the work and later callers await the
+    same task until it finishes. Results and exceptions reach every caller.
+    Each caller is shielded, so cancelling one does not cancel the shared work.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.inflight = {}  # key -> task
+        self.calls = 0
+        self.shared = 0
+        singleflight_registry.append(self)
+
+    async def do(self, key, factory):
+        self.calls += 1
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self.inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def _done(self, key, task):
+        if self.inflight.get(key) is task:
+            del self.inflight[key]
+        # Mark the exception as retrieved in case every caller was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def dedupe_rate(self):
+        if self.calls == 0:
+            return 0.0
+        return self.shared / self.calls
+
+batcher_registry = []  # Every RequestBatcher, for /cachestats
+
+class RequestBatcher:
+    """Merges concurrent single-ID lookups into bulk requests.
+
+    Callers queue IDs and await their results. IDs queued within `window`
+    seconds of each other go out together in chunks of at most `batch_size`,
+    and a full batch is sent without waiting. `send_batch(ids)` returns a
+    {id: result} dict. A result may be an exception instance, which is
+    raised to that ID's callers. IDs missing from the dict resolve to None.
+    """
+
+    def __init__(self, name, send_batch, batch_size, window):
+        self.name = name
+        self.send_batch = send_batch
+        self.batch_size = batch_size
+        self.window = window
+        self.pending = {}  # id -> future shared by every caller waiting on it
+        self.inflight = {}  # id -> future for IDs already sent, awaiting a response
+        self.tasks = set()
+        self.timer = None
+        self.requests_sent = 0
+        self.ids_requested = 0
+        self.lookups = 0
+        self.shared_lookups = 0  # Lookups that joined an ID already queued or in flight
+        batcher_registry.append(self)
+
+    async def fetch(self, ids):
+        """Return {id: result} for every ID with a non-empty result"""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for key in ids:
+            future = self.pending.get(key) or self.inflight.get(key)
+            self.lookups += 1
+            if future is None:
+                future = loop.create_future()
+                self.pending[key] = future
+            else:
+                self.shared_lookups += 1
+            futures.append(future)
         
-        async with session.get(url, headers=headers) as resp:
-            if resp.status == 200:
-                data = await resp.json()
-                return data
-            elif resp.status == 404:
-                return {"flagged": False, "message": "User not in database"}
+        if len(self.pending) >= self.batch_size:
+            task = asyncio.create_task(self._send(self._take_pending()))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+        elif self.pending and self.timer is None:
+            self.timer = asyncio.create_task(self._send_after_window())
+        
+        # Shield the shared futures so one cancelled caller doesn't cancel the others
+        results = await asyncio.gather(*(asyncio.shield(f) for f in futures))
+        return {key: result for key, result in zip(ids, results) if result}
+
+    async def fetch_one(self, key):
+        """Return the result for a single ID, raising its error if it failed"""
+        return (await self.fetch([key])).get(key)
+
+    def _take_pending(self):
+        batch = self.pending
+        self.pending = {}
+        self.inflight.update(batch)
+        return batch
+
+    async def _send_after_window(self):
+        await asyncio.sleep(self.window)
+        self.timer = None
+        batch = self._take_pending()
+        if batch:
+            await self._send(batch)
+
+    async def _send(self, batch):
+        keys = list(batch)
+        chunks = [keys[i:i + self.batch_size] for i in range(0, len(keys), self.batch_size)]
+        await asyncio.gather(*(self._send_chunk(chunk, batch) for chunk in chunks))
+
+    async def _send_chunk(self, chunk, batch):
+        self.requests_sent += 1
+        self.ids_requested += len(chunk)
+        try:
+            results = await self.send_batch(chunk)
+        except Exception as e:
+            results = {key: e for key in chunk}
+        
+        for key in chunk:
+            result = results.get(key)
+            future = batch[key]
+            if self.inflight.get(key) is future:
+                del self.inflight[key]
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+                # Mark retrieved so an unawaited failure doesn't log a warning
+                future.exception()
             else:
-                print(f"Mococo API error: {resp.status}")
-                return None
+                future.set_result(result)
+
+class TTLCache:
+    """Bounded LRU cache with per-entry expiry, negative caching and stale-while-revalidate.
+
+    Entries live for `ttl` seconds, or `negative_ttl` for 404s and empty results.
+    After expiry, get_or_fetch may still serve an entry for up to `stale_ttl`
+    seconds while it refreshes the entry in the background. When there are more
+    than `max_entries` entries, the least recently used one is evicted.
+    """
+
+    def __init__(self, name, ttl, max_entries, negative_ttl=NEGATIVE_CACHE_TTL, stale_ttl=0, store=None):
+        self.name = name
+        self.store = store  # Optional DiskCache that keeps entries across restarts
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # key -> (value, expires_at, negative)
+        self.refreshing = {}  # key -> background refresh task
+        self.hits = 0
+        self.negative_hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.disk_hits = 0
+        self.flights = SingleFlight(name)  # Coalesces concurrent misses for the same key
+        cache_registry.append(self)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        entry = self._entry(key)
+        return entry is not None and time.monotonic() < entry[1]
+
+    def _entry(self, key):
+        """Return the live (fresh or stale) entry for key, dropping it if fully expired"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() >= entry[1] + self.stale_ttl:
+            del self.entries[key]
+            self.expirations += 1
+            return None
+        return entry
+
+    def _record_hit(self, key, entry):
+        self.entries.move_to_end(key)
+        self.hits += 1
+        if entry[2]:
+            self.negative_hits += 1
+
+    def get(self, key, default=CACHE_MISS):
+        """Return a fresh value for key, or default"""
+        entry = self._entry(key)
+        if entry is None or time.monotonic() >= entry[1]:
+            self.misses += 1
+            return default
+        self._record_hit(key, entry)
+        return entry[0]
+
+    def peek(self, key, default=None):
+        """Return a fresh value without touching counters or LRU order"""
+        entry = self._entry(key)
+        if entry is None or time.monotonic() >= entry[1]:
+            return default
+        return entry[0]
+
+    def set(self, key, value, negative=False):
+        ttl = self.negative_ttl if negative else self.ttl
+        self._insert(key, value, time.monotonic() + ttl, negative)
+        if self.store:
+            self.store.put(self.name, key, value, ttl, negative)
+
+    def _insert(self, key, value, expires_at, negative):
+        self.entries[key] = (value, expires_at, negative)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    async def warm(self, keys):
+        """Load any of keys that are not in memory from the disk store"""
+        if not self.store:
+            return
+        missing = [key for key in keys if self._entry(key) is None]
+        if not missing:
+            return
+        for key, value, remaining, negative in await self.store.load(self.name, missing):
+            if remaining + self.stale_ttl > 0:
+                self._insert(key, value, time.monotonic() + remaining, negative)
+                self.disk_hits += 1
+
+    def invalidate(self, key):
+        self.entries.pop(key, None)
+
+    def clear(self):
+        self.entries.clear()
+
+    async def get_or_fetch(self, key, fetch, is_negative=lambda value: not value):
+        """Return the cached value for key, awaiting fetch() on a miss.
+
+        Exceptions from fetch() propagate and nothing is cached, so transient
+        upstream errors are retried on the next call.
+        """
+        entry = self._entry(key)
+        if entry is None and self.store:
+            await self.warm([key])
+            entry = self._entry(key)
+        if entry is not None:
+            if time.monotonic() < entry[1]:
+                self._record_hit(key, entry)
+                return entry[0]
+            # Expired but inside the stale window: serve it and refresh in the background
+            self.entries.move_to_end(key)
+            self.stale_hits += 1
+            if key not in self.refreshing:
+                self.refreshing[key] = asyncio.create_task(self._refresh(key, fetch, is_negative))
+            return entry[0]
+        
+        self.misses += 1
+        return await self.flights.do(key, lambda: self._fetch_and_set(key, fetch, is_negative))
+
+    async def _fetch_and_set(self, key, fetch, is_negative):
+        value = await fetch()
+        self.set(key, value, negative=is_negative(value))
+        return value
+
+    async def _refresh(self, key, fetch, is_negative):
+        try:
+            value = await fetch()
+            self.set(key, value, negative=is_negative(value))
+        except Exception as e:
+            print(f"⚠️ Background refresh failed for {self.name} cache key {key}: {e}")
+        finally:
+            self.refreshing.pop(key, None)
+
+    def hit_ratio(self):
+        lookups = self.hits + self.stale_hits + self.misses
+        if lookups == 0:
+            return 0.0
+        return (self.hits + self.stale_hits) / lookups
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "disk_hits": self.disk_hits,
+            "hit_ratio": self.hit_ratio(),
+        }
+
+# Persistent cache configuration
+API_CACHE_DB = "api_cache.db"
+DISK_CACHE_FLUSH_INTERVAL = 5  # Seconds between batched writes
+DISK_CACHE_COMPACT_INTERVAL = 3600  # Seconds between expired-row sweeps
+DISK_CACHE_VACUUM_THRESHOLD = 5000  # Rebuild the file after deleting this many rows
+
+class DiskCache:
+    """SQLite-backed store behind TTLCache so a restarted bot starts warm.
+
+    Rows are read on demand in a worker thread. Writes are queued in memory
+    and a background task flushes them in batches, so the event loop never
+    touches the disk. Rows that have expired past the stale window are
+    deleted periodically.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = None
+        self.lock = threading.Lock()
+        self.pending = {}  # (namespace, key) -> (value, stored_at, expires_at, negative)
+        self.task = None
+        self.rows_written = 0
+        self.rows_read = 0
+        self.rows_compacted = 0
+
+    def _connect(self):
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL, "
+                "stored_at REAL NOT NULL, expires_at REAL NOT NULL, negative INTEGER NOT NULL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires_at)")
+            self.conn.commit()
+        return self.conn
+
+    def put(self, namespace, key, value, ttl, negative):
+        now = time.time()
+        self.pending[(namespace, json.dumps(key))] = (json.dumps(value), now, now + ttl, negative)
+
+    async def load(self, namespace, keys):
+        """Return [(key, value, seconds_until_expiry, negative)] for keys found on disk"""
+        found = []
+        to_read = []
+        now = time.time()
+        for key in keys:
+            queued = self.pending.get((namespace, json.dumps(key)))
+            if queued:
+                found.append((key, json.loads(queued[0]), queued[2] - now, bool(queued[3])))
+            else:
+                to_read.append(key)
+        if to_read:
+            try:
+                found.extend(await asyncio.to_thread(self._read, namespace, to_read))
+            except Exception as e:
+                print(f"⚠️ Error reading API cache: {e}")
+        return found
+
+    def _read(self, namespace, keys):
+        rows = []
+        now = time.time()
+        with self.lock:
+            conn = self._connect()
+            encoded = [json.dumps(key) for key in keys]
+            for i in range(0, len(encoded), 500):
+                chunk = encoded[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows.extend(conn.execute(
+                    f"SELECT key, value, expires_at, negative FROM cache WHERE namespace = ? AND key IN ({placeholders})",
+                    [namespace, *chunk]
+                ).fetchall())
+        self.rows_read += len(rows)
+        return [(json.loads(key), json.loads(value), expires_at - now, bool(negative)) for key, value, expires_at, negative in rows]
+
+    async def flush(self):
+        if not self.pending:
+            return
+        batch = self.pending
+        self.pending = {}
+        try:
+            await asyncio.to_thread(self._write, batch)
+        except Exception as e:
+            print(f"⚠️ Error writing API cache: {e}")
+
+    def _write(self, batch):
+        with self.lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, stored_at, expires_at, negative) VALUES (?, ?, ?, ?, ?, ?)",
+                [(namespace, key, value, stored_at, expires_at, int(negative))
+                 for (namespace, key), (value, stored_at, expires_at, negative) in batch.items()]
+            )
+            conn.commit()
+        self.rows_written += len(batch)
+
+    def _compact(self):
+        with self.lock:
+            conn = self._connect()
+            deleted = conn.execute(
+                "DELETE FROM cache WHERE expires_at < ?", (time.time() - STALE_WHILE_REVALIDATE,)
+            ).rowcount
+            conn.commit()
+            self.rows_compacted += deleted
+            if deleted >= DISK_CACHE_VACUUM_THRESHOLD:
+                conn.execute("VACUUM")
+        if deleted:
+            print(f"🧹 Compacted API cache: removed {deleted} expired rows")
+
+    async def _run(self):
+        last_compact = time.monotonic()
+        while True:
+            await asyncio.sleep(DISK_CACHE_FLUSH_INTERVAL)
+            await self.flush()
+            if time.monotonic() - last_compact >= DISK_CACHE_COMPACT_INTERVAL:
+                last_compact = time.monotonic()
+                try:
+                    await asyncio.to_thread(self._compact)
+                except Exception as e:
+                    print(f"⚠️ Error compacting API cache: {e}")
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        await self.flush()
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+api_disk_cache = DiskCache(API_CACHE_DB)
+
+# Mococo client resilience configuration
+MOCOCO_TIMEOUT = aiohttp.ClientTimeout(total=8, connect=3)  # Per-call timeout
+MOCOCO_MAX_RETRIES = 2  # Retries for timeouts, connection errors, 429 and 5xx
+MOCOCO_RETRY_BASE_DELAY = 0.5  # Seconds; full jitter up to base * 2**attempt
+BREAKER_WINDOW = 20  # Recent calls used to compute the error rate
+BREAKER_MIN_CALLS = 10  # Calls needed in the window before the error rate can trip the breaker
+BREAKER_ERROR_RATE = 0.5  # Error rate that opens the breaker
+BREAKER_CONSECUTIVE_FAILURES = 5  # Consecutive failures that open the breaker
+BREAKER_COOLDOWN = 30  # Seconds the breaker stays open before probing
+BREAKER_MAX_COOLDOWN = 300  # Cooldown doubles after each failed probe up to this
+
+MOCOCO_BULK_ENABLED = True  # Use MOCOCO_CHECK_ENDPOINT for multi-user lookups
+MOCOCO_BATCH_SIZE = 50  # User IDs per bulk check request
+MOCOCO_BATCH_WINDOW = 0.05  # Seconds to collect concurrent lookups into one request
+MOCOCO_BULK_RETRY_INTERVAL = 3600  # Seconds to stay on per-user calls after the bulk endpoint is unavailable
+
+MOCOCO_SKIPPED = {"flagged": False, "skipped": True, "message": "Mococo skipped (breaker open)"}
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit breaker is open"""
+
+class CircuitBreaker:
+    """Fails fast while an upstream service is down and probes for recovery.
+
+    The breaker opens when the recent error rate or the run of consecutive
+    failures crosses its threshold. While open, calls are rejected until the
+    cooldown passes. Then one probe call is let through (half-open). A
+    successful probe closes the breaker. A failed one reopens it with a
+    doubled cooldown.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, name):
+        self.name = name
+        self.state = self.CLOSED
+        self.outcomes = deque(maxlen=BREAKER_WINDOW)  # True for success
+        self.latencies = deque(maxlen=500)  # Seconds, successful and failed calls
+        self.consecutive_failures = 0
+        self.cooldown = BREAKER_COOLDOWN
+        self.opened_until = 0.0
+        self.probe_in_flight = False
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+        self.retries = 0
+        self.times_opened = 0
+
+    def rejecting(self):
+        """True while the breaker is open and still cooling down"""
+        return self.state == self.OPEN and time.monotonic() < self.opened_until
+
+    def allow(self):
+        """Return True if a call may proceed right now"""
+        if self.state == self.OPEN and time.monotonic() >= self.opened_until:
+            self.state = self.HALF_OPEN
+            print(f"🟡 {self.name} circuit breaker half-open, probing")
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self, latency):
+        self.calls += 1
+        self.outcomes.append(True)
+        self.latencies.append(latency)
+        self.consecutive_failures = 0
+        if self.state != self.CLOSED:
+            print(f"🟢 {self.name} circuit breaker closed")
+        self.state = self.CLOSED
+        self.cooldown = BREAKER_COOLDOWN
+        self.probe_in_flight = False
+
+    def record_failure(self, latency):
+        self.calls += 1
+        self.failures += 1
+        self.outcomes.append(False)
+        self.latencies.append(latency)
+        self.consecutive_failures += 1
+        if self.state == self.HALF_OPEN:
+            self.cooldown = min(BREAKER_MAX_COOLDOWN, self.cooldown * 2)
+            self._open()
+        elif self.state == self.CLOSED and (
+            self.consecutive_failures >= BREAKER_CONSECUTIVE_FAILURES
+            or (len(self.outcomes) >= BREAKER_MIN_CALLS and self.error_rate() >= BREAKER_ERROR_RATE)
+        ):
+            self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_until = time.monotonic() + self.cooldown
+        self.probe_in_flight = False
+        self.times_opened += 1
+        print(f"🔴 {self.name} circuit breaker open for {self.cooldown}s")
+
+    def error_rate(self):
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def latency_percentiles(self, percentiles=(50, 95, 99)):
+        """Return {percentile: seconds} over recent calls, or {} if there are none"""
+        if not self.latencies:
+            return {}
+        ordered = sorted(self.latencies)
+        return {p: ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] for p in percentiles}
+
+mococo_breaker = CircuitBreaker("Mococo")
+
+def is_transient_error(error):
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status == 429 or error.status >= 500
+    return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError))
+
+async def request_mococo_status(roblox_user_id):
+    """Make one Mococo API call, raising on API errors"""
+    url = f"{MOCOCO_USER_ENDPOINT}/{roblox_user_id}"
+    headers = {
+        'Accept': 'application/json',
+        'User-Agent': 'RobloxModerationBot/1.0'
+    }
+    
+    # Retries are handled here (with jitter) so the breaker sees every failure
+    async with api_request("GET", url, retries=0, breaker=mococo_breaker, headers=headers, timeout=MOCOCO_TIMEOUT) as resp:
+        if resp.status == 200:
+            return await resp.json()
+        elif resp.status == 404:
+            return {"flagged": False, "message": "User not in database"}
+        else:
+            raise aiohttp.ClientResponseError(resp.request_info, resp.history, status=resp.status, message="Mococo API error")
+
+async def call_mococo(request):
+    """Run a Mococo request with jittered retries, behind the circuit breaker"""
+    attempt = 0
+    while True:
+        start = time.monotonic()
+        try:
+            result = await request()
+        except CircuitOpenError:
+            raise
+        except asyncio.CancelledError:
+            # Don't leave a half-open breaker waiting on a probe that will never report
+            mococo_breaker.probe_in_flight = False
+            raise
+        except Exception as e:
+            if not is_transient_error(e):
+                # The service answered; the request itself was bad
+                mococo_breaker.record_success(time.monotonic() - start)
+                raise
+            mococo_breaker.record_failure(time.monotonic() - start)
+            if attempt >= MOCOCO_MAX_RETRIES:
+                raise
+            mococo_breaker.retries += 1
+            await asyncio.sleep(random.uniform(0, MOCOCO_RETRY_BASE_DELAY * 2 ** attempt))
+            attempt += 1
+            continue
+        mococo_breaker.record_success(time.monotonic() - start)
+        return result
+
+class MococoBulkUnavailable(Exception):
+    """Raised when the Mococo bulk check endpoint is not available"""
+
+mococo_bulk_disabled_until = 0.0
+
+def parse_mococo_batch(data, user_ids):
+    """Map a bulk check response onto {user_id: record}.
+
+    Accepts either a list of records carrying "id"/"userId" or an object keyed
+    by user ID, optionally wrapped in "results" or "data". IDs missing from the
+    response are treated like a per-user 404. A body in neither shape, or one
+    that mentions none of the requested IDs, raises MococoBulkUnavailable so
+    the batch falls back to per-user calls instead of reading as all clean.
+    """
+    records = data
+    if isinstance(data, dict):
+        records = data.get("results", data.get("data", data))
+    by_id = {}
+    if isinstance(records, dict):
+        for key, record in records.items():
+            if str(key).isdigit() and isinstance(record, dict):
+                by_id[int(key)] = record
+    elif isinstance(records, list):
+        for record in records:
+            user_id = record.get("id", record.get("userId")) if isinstance(record, dict) else None
+            if user_id is not None:
+                by_id[int(user_id)] = record
+    else:
+        raise MococoBulkUnavailable(f"Mococo bulk endpoint returned an unrecognized body ({type(records).__name__})")
+    if not by_id.keys() & set(user_ids):
+        raise MococoBulkUnavailable("Mococo bulk response contained none of the requested users")
+    return {user_id: by_id.get(user_id, {"flagged": False, "message": "User not in database"}) for user_id in user_ids}
+
+async def request_mococo_batch(user_ids):
+    """Check several users with one call to MOCOCO_CHECK_ENDPOINT"""
+    headers = {
+        'Accept': 'application/json',
+        'User-Agent': 'RobloxModerationBot/1.0'
+    }
+    async with api_request("POST", MOCOCO_CHECK_ENDPOINT, retries=0, breaker=mococo_breaker,
+                           json={"userIds": user_ids}, headers=headers, timeout=MOCOCO_TIMEOUT) as resp:
+        if resp.status in (404, 405, 501):
+            raise MococoBulkUnavailable(f"Mococo bulk endpoint returned {resp.status}")
+        if resp.status != 200:
+            raise aiohttp.ClientResponseError(resp.request_info, resp.history, status=resp.status, message="Mococo API error")
+        return parse_mococo_batch(await resp.json(), user_ids)
+
+async def send_mococo_batch(user_ids):
+    """Resolve a batch of Mococo lookups, falling back to per-user calls"""
+    global mococo_bulk_disabled_until
+    if MOCOCO_BULK_ENABLED and len(user_ids) > 1 and time.monotonic() >= mococo_bulk_disabled_until:
+        try:
+            return await call_mococo(lambda: request_mococo_batch(user_ids))
+        except MococoBulkUnavailable as e:
+            mococo_bulk_disabled_until = time.monotonic() + MOCOCO_BULK_RETRY_INTERVAL
+            print(f"⚠️ {e}; using per-user Mococo lookups for {MOCOCO_BULK_RETRY_INTERVAL}s")
+    
+    results = await asyncio.gather(
+        *(call_mococo(lambda user_id=user_id: request_mococo_status(user_id)) for user_id in user_ids),
+        return_exceptions=True
+    )
+    return dict(zip(user_ids, results))
+
+mococo_batcher = RequestBatcher("mococo", send_mococo_batch, MOCOCO_BATCH_SIZE, MOCOCO_BATCH_WINDOW)
+
+async def fetch_mococo_status(roblox_user_id):
+    """Fetch a user's Mococo record, batched with other concurrent lookups"""
+    return await mococo_batcher.fetch_one(roblox_user_id)
+
+async def check_user_with_mococo(roblox_user_id):
+    """Check a Roblox user using Mococo API for suspicious/condo associations.
+
+    Returns the Mococo record, MOCOCO_SKIPPED while the circuit breaker is
+    open, or None if the call failed.
+    """
+    try:
+        return await mococo_cache.get_or_fetch(
+            roblox_user_id,
+            lambda: fetch_mococo_status(roblox_user_id),
+            is_negative=lambda result: result.get("message") == "User not in database"
+        )
+    except CircuitOpenError:
+        return MOCOCO_SKIPPED
+    except aiohttp.ClientResponseError as e:
+        print(f"Mococo API error: {e.status}")
+        return None
     except Exception as e:
-        print(f"Error calling Mococo API: {e}")
+        print(f"Error calling Mococo API: {e!r}")
         return None
 
-async def get_user_badges_count(user_id):
-    """Get the total badge count for a Roblox user."""
+def is_mococo_skipped(result):
+    return bool(result and result.get("skipped"))
+
+# Badge requirement configuration
+BADGE_THRESHOLD = 600  # Minimum badges required to pass verification
+
+BADGES_AT_THRESHOLD = "at_threshold"  # Threshold proven, counting stopped early
+BADGES_BELOW_THRESHOLD = "below_threshold"  # Every badge counted, total is exact
+BADGES_UNAVAILABLE = "unavailable"  # Private inventory or API error
+
+@dataclass(frozen=True)
+class BadgeCountResult:
+    """Outcome of a threshold-aware badge count"""
+    status: str
+    count: int = 0
+    private: bool = False
+
+    @property
+    def meets_threshold(self):
+        return self.status == BADGES_AT_THRESHOLD
+
+    def display(self):
+        """Badge count as shown in reports ("600+" once the threshold is proven)"""
+        if self.status == BADGES_AT_THRESHOLD:
+            return f"{self.count}+"
+        return str(self.count)
+
+async def count_user_badges(user_id, threshold=BADGE_THRESHOLD):
+    """Count a user's badges, stopping as soon as the threshold is reached."""
+    count = 0
+    cursor = ""
     try:
-        all_badges = []
-        cursor = ""
-        
         while True:
+            badges_url = BADGES_API.format(user_id=user_id)
             if cursor:
-                badges_url = BADGES_API.format(user_id=user_id) + f"&cursor={cursor}"
-            else:
-                badges_url = BADGES_API.format(user_id=user_id)
+                badges_url += f"&cursor={cursor}"
             
-            response = requests.get(badges_url)
-            if response.status_code == 200:
-                data = response.json()
-                all_badges.extend(data.get("data", []))
-                
-                # Check if there are more badges to fetch
-                cursor = data.get("nextPageCursor")
-                if not cursor:
-                    break
-            else:
-                print(f"Error fetching badges: {response.status_code}")
-                return None
-        
-        return len(all_badges)
+            async with api_request("GET", badges_url) as resp:
+                if resp.status != 200:
+                    print(f"Error fetching badges: {resp.status}")
+                    return BadgeCountResult(BADGES_UNAVAILABLE, count, private=resp.status == 403)
+                data = await resp.json()
+            
+            count += len(data.get("data", []))
+            if count >= threshold:
+                return BadgeCountResult(BADGES_AT_THRESHOLD, count)
+            
+            # Check if there are more badges to fetch
+            cursor = data.get("nextPageCursor")
+            if not cursor:
+                break
     except Exception as e:
-        print(f"Error in get_user_badges_count: {e}")
-        return None
+        print(f"Error in count_user_badges: {e}")
+        return BadgeCountResult(BADGES_UNAVAILABLE, count)
+    
+    # An empty inventory means the badges are hidden
+    if count == 0:
+        return BadgeCountResult(BADGES_UNAVAILABLE, 0, private=True)
+    return BadgeCountResult(BADGES_BELOW_THRESHOLD, count)
+
+
+# Profile batching configuration
+PROFILE_BATCH_SIZE = 100  # Bulk users endpoint accepts up to 100 IDs per request
+PROFILE_BATCH_WINDOW = 0.05  # Seconds to collect concurrent lookups into one request
+
+async def send_profile_batch(user_ids):
+    """Fetch profiles for up to PROFILE_BATCH_SIZE IDs in one bulk users request.
+
+    Errors and non-200 responses raise, so the batcher fails every ID in the
+    batch instead of reporting them all as missing accounts.
+    """
+    profiles = {}
+    async with api_request("POST", USERS_BULK_API, json={"userIds": user_ids, "excludeBannedUsers": False}) as resp:
+        resp.raise_for_status()
+        data = await resp.json()
+    for user in data.get("data", []):
+        profiles[user["id"]] = store_user_profile(user)
+    return profiles
+
+profile_flights = SingleFlight("profile_details")
+profile_batcher = RequestBatcher("profiles", send_profile_batch, PROFILE_BATCH_SIZE, PROFILE_BATCH_WINDOW)
+
+def store_user_profile(profile):
+    """Merge a profile into the shared profile store"""
+    merged = dict(user_profile_cache.peek(profile["id"]) or {})
+    merged.update(profile)
+    user_profile_cache.set(profile["id"], merged)
+    return merged
 
+async def get_user_profiles(user_ids):
+    """Get {user_id: profile} with name and displayName, batching any unknown IDs"""
+    profiles = {}
+    missing = []
+    await user_profile_cache.warm(user_ids)
+    for user_id in user_ids:
+        profile = user_profile_cache.get(user_id)
+        if profile is CACHE_MISS:
+            missing.append(user_id)
+        elif profile:
+            profiles[user_id] = profile
+    if missing:
+        try:
+            found = await profile_batcher.fetch(missing)
+        except Exception as e:
+            # Leave the IDs uncached so the next lookup retries them
+            print(f"Error fetching user profiles: {e}")
+            return profiles
+        for user_id in missing:
+            if user_id not in found:
+                # Unknown or deleted account: absent from a successful response
+                user_profile_cache.set(user_id, {}, negative=True)
+        profiles.update(found)
+    return profiles
 
 async def get_user_info(user_id):
     """Get user information including creation date."""
+    # The bulk users endpoint omits "created", so a profile is only complete once
+    # it has been fetched individually. Its name and displayName are shared with
+    # get_usernames_from_ids through the profile store.
+    await user_profile_cache.warm([user_id])
+    cached = user_profile_cache.get(user_id)
+    if cached is not CACHE_MISS and "created" in cached:
+        return cached
+    return await profile_flights.do(user_id, lambda: fetch_user_info(user_id))
+
+async def fetch_user_info(user_id):
     try:
-        user_url = USER_INFO_API.format(user_id=user_id)
-        response = requests.get(user_url)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            print(f"Error fetching user info: {response.status_code}")
-            return None
+        async with api_request("GET", USER_INFO_API.format(user_id=user_id)) as resp:
+            if resp.status == 200:
+                return store_user_profile(await resp.json())
+            else:
+                print(f"Error fetching user info: {resp.status}")
+                return None
     except Exception as e:
         print(f"Error in get_user_info: {e}")
         return None
@@ -134,8 +1542,10 @@ async def check_account_age(user_data):
         print(f"Error in check_account_age: {e}")
         return False, "Error checking account age"
 
-group_name_cache = {}
-user_group_cache = {}
+group_name_cache = TTLCache("group_names", GROUP_NAME_CACHE_TTL, GROUP_NAME_CACHE_SIZE, stale_ttl=STALE_WHILE_REVALIDATE, store=api_disk_cache)
+user_group_cache = TTLCache("user_groups", USER_GROUP_CACHE_TTL, USER_GROUP_CACHE_SIZE, stale_ttl=STALE_WHILE_REVALIDATE, store=api_disk_cache)
+user_profile_cache = TTLCache("profiles", PROFILE_CACHE_TTL, PROFILE_CACHE_SIZE, store=api_disk_cache)  # Roblox user ID -> profile (name, displayName, created once known)
+mococo_cache = TTLCache("mococo", MOCOCO_CACHE_TTL, MOCOCO_CACHE_SIZE, stale_ttl=STALE_WHILE_REVALIDATE, store=api_disk_cache)
 tracking_channel_id = None
 tracked_users = set()
 is_tracking = False
@@ -144,33 +1554,177 @@ rally_starter_id = None  # Track who started the rally
 # User linking system
 user_links = {}  # Discord user ID -> Roblox username
 
-# Data persistence functions
-def load_data():
-    """Load data from JSON files"""
-    global cuts_data, user_links
-    try:
-        if os.path.exists('cuts_data.json'):
-            with open('cuts_data.json', 'r') as f:
-                cuts_data = {int(k): v for k, v in json.load(f).items()}
-        if os.path.exists('user_links.json'):
-            with open('user_links.json', 'r') as f:
-                user_links = {int(k): v for k, v in json.load(f).items()}
-        print("✅ Loaded data from files")
-    except Exception as e:
-        print(f"⚠️ Error loading data: {e}")
+# Data persistence configuration
+DATA_FILES = {"cuts": "cuts_data.json", "links": "user_links.json"}  # Snapshot file per table
+DATA_JOURNAL_FILE = "data_journal.jsonl"  # Append-only log of changes since the last snapshot
+DATA_FLUSH_INTERVAL = 0.5  # Seconds between journal appends
+DATA_COMPACT_MIN_ENTRIES = 200  # Journal entries before folding them into the snapshots
 
-def save_data():
-    """Save data to JSON files"""
-    try:
-        with open('cuts_data.json', 'w') as f:
-            json.dump(cuts_data, f, indent=2)
-        with open('user_links.json', 'w') as f:
-            json.dump(user_links, f, indent=2)
-        print("💾 Data saved to files")
-    except Exception as e:
-        print(f"⚠️ Error saving data: {e}")
+class DataJournal:
+    """Write-ahead journal for cuts_data and user_links.
 
-def check_whitelist(user_id: int) -> bool:
+    A change is applied in memory and queued as one JSON line; a background
+    task appends queued lines to DATA_JOURNAL_FILE in a worker thread, so a
+    /cut costs one small append however many users have cuts. Once the
+    journal holds more entries than the tables (and at least
+    DATA_COMPACT_MIN_ENTRIES), it is folded into the snapshot files, each
+    written atomically (temp file + rename), and truncated. Loading replays
+    the journal over the snapshots, skipping lines it cannot decode; if the
+    snapshots themselves cannot be read, the journal is only ever appended
+    to, so the files on disk are never overwritten with empty tables.
+    """
+
+    def __init__(self, path, files):
+        self.path = path
+        self.files = files
+        self.lock = threading.Lock()
+        self.pending = []  # Encoded journal lines not yet on disk
+        self.journal_entries = 0
+        self.loaded = False  # Compaction rewrites the snapshots, so it needs the tables to have loaded
+        self.task = None
+        self.entries_written = 0
+        self.compactions = 0
+
+    def tables(self):
+        return {"cuts": cuts_data, "links": user_links}
+
+    def load(self):
+        """Read the snapshots, replay the journal over them and rebind the module-level tables"""
+        global cuts_data, user_links
+        self.loaded = False
+        tables = {}
+        for table, path in self.files.items():
+            tables[table] = {}
+            if os.path.exists(path):
+                with open(path, 'r') as f:
+                    tables[table] = {int(k): v for k, v in json.load(f).items()}
+        replayed = 0
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                text = f.read()
+            *lines, torn = text.split("\n")
+            if torn:
+                # A crash mid-append leaves a partial last line; cut it off so the next append starts clean
+                print(f"⚠️ Dropping torn journal entry: {torn[:80]!r}")
+                with open(self.path, 'r+') as f:
+                    f.truncate(len(text) - len(torn))
+            for line in lines:
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                    table = tables.setdefault(entry["table"], {})
+                    if entry["value"] is None:
+                        table.pop(entry["key"], None)
+                    else:
+                        table[entry["key"]] = entry["value"]
+                except (ValueError, KeyError, TypeError) as e:
+                    print(f"⚠️ Skipping unreadable journal entry {line[:80]!r}: {e}")
+                    continue
+                replayed += 1
+        self.journal_entries = replayed
+        cuts_data = tables["cuts"]
+        user_links = tables["links"]
+        self.loaded = True
+        return replayed
+
+    def record(self, table, key, value):
+        """Queue a change already applied in memory; a value of None records a deletion"""
+        self.pending.append(json.dumps({"table": table, "key": key, "value": value}))
+
+    def _due_for_compaction(self):
+        return self.loaded and self.journal_entries >= max(DATA_COMPACT_MIN_ENTRIES, sum(len(table) for table in self.tables().values()))
+
+    def _append(self, lines):
+        with self.lock:
+            with open(self.path, 'a') as f:
+                f.write("".join(f"{line}\n" for line in lines))
+                f.flush()
+                os.fsync(f.fileno())
+        self.entries_written += len(lines)
+
+    def _snapshot(self, tables):
+        """Write every table atomically, then drop the journal they cover"""
+        with self.lock:
+            for table, path in self.files.items():
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump(tables[table], f, indent=2)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, path)
+            # Snapshots are on disk, so the queued lines and the old journal are both covered
+            open(self.path, 'w').close()
+        self.compactions += 1
+
+    async def flush(self, compact=False):
+        """Append queued entries, folding the journal into the snapshots when it has grown past them"""
+        compact = compact and self.loaded and (self.pending or self.journal_entries)
+        if not self.pending and not compact:
+            return
+        lines = self.pending
+        self.pending = []
+        self.journal_entries += len(lines)
+        try:
+            if compact or self._due_for_compaction():
+                # Copy on the loop so the snapshot matches the queued lines exactly
+                tables = {table: dict(data) for table, data in self.tables().items()}
+                await asyncio.to_thread(self._snapshot, tables)
+                self.journal_entries = 0
+                print(f"💾 Compacted data journal into snapshots ({sum(len(t) for t in tables.values())} entries)")
+            else:
+                await asyncio.to_thread(self._append, lines)
+        except Exception as e:
+            self.pending = lines + self.pending
+            self.journal_entries -= len(lines)
+            print(f"⚠️ Error writing data journal: {e}")
+
+    def flush_sync(self):
+        """Last-chance append at interpreter exit, for changes the flush task never reached"""
+        if self.pending:
+            lines = self.pending
+            self.pending = []
+            try:
+                self._append(lines)
+                print(f"💾 Flushed {len(lines)} journal entries at exit")
+            except Exception as e:
+                print(f"⚠️ Error writing data journal: {e}")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(DATA_FLUSH_INTERVAL)
+            await self.flush()
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        await self.flush(compact=True)
+
+data_journal = DataJournal(DATA_JOURNAL_FILE, DATA_FILES)
+
+# Data persistence functions
+def load_data():
+    """Load cuts and links from their snapshots plus the data journal"""
+    try:
+        replayed = data_journal.load()
+        print(f"✅ Loaded data from files ({replayed} journal entries replayed)")
+    except Exception as e:
+        print(f"⚠️ Error loading data: {e}")
+
+def save_data():
+    """Append any changes still queued in the data journal"""
+    data_journal.flush_sync()
+
+def check_whitelist(user_id: int) -> bool:
     return user_id in WHITELIST
 
 def check_admin(user: discord.User) -> bool:
@@ -208,7 +1762,7 @@ async def cut(
     current_cuts = get_cuts(member.id)
     new_cuts = max(current_cuts - amount, 0)
     cuts_data[member.id] = new_cuts
-    save_data()  # Save data after modification
+    data_journal.record("cuts", member.id, new_cuts)
 
     highest_role = member.top_role.name if member.top_role and member.top_role.name != "@everyone" else "No Role"
 
@@ -234,7 +1788,7 @@ async def set_cuts(interaction: discord.Interaction, member: discord.Member, amo
         return
 
     cuts_data[member.id] = max(amount, 0)
-    save_data()  # Save data after modification
+    data_journal.record("cuts", member.id, cuts_data[member.id])
     await interaction.response.send_message(
         f"✅ Set {member.mention}'s cuts to **{cuts_data[member.id]}**."
     )
@@ -269,35 +1823,38 @@ async def config(
         await interaction.response.send_message("❌ You are not authorized to use this command.", ephemeral=True)
         return
     
-    global AUTO_CHECK_CHANNEL_ID, PRIVACY_ISSUE_CHANNEL_ID, ENABLE_AUTO_CHECK, AUTO_CHECK_ROLE_NAME, FLAGGED_ROLE_NAME
-    
     changes = []
+    updates = {}
     
     # Update auto-check channel
     if auto_check_channel:
-        AUTO_CHECK_CHANNEL_ID = auto_check_channel.id
+        updates["auto_check_channel_id"] = auto_check_channel.id
         changes.append(f"Main verification channel: {auto_check_channel.mention}")
     
     # Update privacy issue channel
     if privacy_channel is not None:
-        PRIVACY_ISSUE_CHANNEL_ID = privacy_channel.id
+        updates["privacy_issue_channel_id"] = privacy_channel.id
         changes.append(f"Privacy issue channel: {privacy_channel.mention}")
     
     # Update auto-check enable/disable
     if enable_auto_check is not None:
-        ENABLE_AUTO_CHECK = enable_auto_check
+        updates["enable_auto_check"] = enable_auto_check
         status = "enabled" if enable_auto_check else "disabled"
         changes.append(f"Auto-check: {status}")
     
     # Update role names
     if verified_role:
-        AUTO_CHECK_ROLE_NAME = verified_role
+        updates["auto_check_role_name"] = verified_role
         changes.append(f"Verified role: `{verified_role}`")
     
     if flagged_role:
-        FLAGGED_ROLE_NAME = flagged_role
+        updates["flagged_role_name"] = flagged_role
         changes.append(f"Flagged role: `{flagged_role}`")
     
+    if updates:
+        snapshot = policy_store.update_config(**updates)
+        changes.append(f"Policy version: v{snapshot.version}")
+    
     if not changes:
         # Show current settings
         embed = discord.Embed(
@@ -337,339 +1894,1408 @@ async def config(
 
 
 
-async def get_group_name(session, group_id):
-    if group_id in group_name_cache:
-        return group_name_cache[group_id]
-    async with session.get(GROUP_INFO_API.format(group_id=group_id)) as resp:
+async def fetch_group_name(group_id):
+    """Fetch a group's name, or None if the group does not exist"""
+    async with api_request("GET", GROUP_INFO_API.format(group_id=group_id)) as resp:
+        if resp.status == 404:
+            return None
+        resp.raise_for_status()
         data = await resp.json()
-        name = data.get("name", f"Group {group_id}")
-        group_name_cache[group_id] = name
-        return name
+        return data.get("name")
 
-async def get_user_id(session, username):
-    async with session.post(ROBLOX_API, json={"usernames": [username]}) as resp:
-        data = await resp.json()
-        if data.get("data"):
-            return data["data"][0]["id"]
+async def get_group_name(group_id):
+    name = await group_name_cache.get_or_fetch(group_id, lambda: fetch_group_name(group_id))
+    return name or f"Group {group_id}"
+
+async def get_user_id(username):
+    with tracer.span("get_user_id", username=username):
+        async with api_request("POST", ROBLOX_API, json={"usernames": [username]}) as resp:
+            data = await resp.json()
+            if data.get("data"):
+                return data["data"][0]["id"]
     return None
 
-async def get_user_groups(session, user_id):
-    if user_id in user_group_cache:
-        return user_group_cache[user_id]
-    async with session.get(GROUPS_API.format(user_id=user_id)) as resp:
+async def fetch_user_groups(user_id):
+    """Fetch the IDs of every group a user is in ([] for unknown users)"""
+    async with api_request("GET", GROUPS_API.format(user_id=user_id)) as resp:
+        if resp.status == 404:
+            return []
+        resp.raise_for_status()
         data = await resp.json()
-        groups = [group["group"]["id"] for group in data.get("data", [])]
-        user_group_cache[user_id] = groups
-        return groups
+        return [group["group"]["id"] for group in data.get("data", [])]
+
+async def get_user_groups(user_id):
+    return await user_group_cache.get_or_fetch(user_id, lambda: fetch_user_groups(user_id))
 
-async def get_usernames_from_ids(session, user_ids):
+async def get_usernames_from_ids(user_ids):
     """Get usernames from a list of user IDs using the Users API"""
     if not user_ids:
         return {}
     
-    # Roblox Users API can handle up to 100 IDs at once
-    user_id_to_username = {}
-    
-    for i in range(0, len(user_ids), 100):
-        batch = user_ids[i:i+100]
-        url = f"https://users.roblox.com/v1/users"
-        async with session.post(url, json={"userIds": batch}) as resp:
-            if resp.status == 200:
-                data = await resp.json()
-                for user in data.get("data", []):
-                    user_id_to_username[user["id"]] = user.get("name", f"User_{user['id']}")
-    
-    return user_id_to_username
+    with tracer.span("get_usernames_from_ids", ids=len(user_ids)):
+        profiles = await get_user_profiles(user_ids)
+    return {user_id: profile.get("name", f"User_{user_id}") for user_id, profile in profiles.items()}
 
-async def get_all_friends(session, user_id, max_friends=200):
-    friends = []
-    cursor = None
-    while len(friends) < max_friends:
+# Friend list configuration
+SCAN_MAX_FRIENDS = 200  # Friends fetched per scanned user; None fetches every page
+
+# Friend sampling strategies for scans that check only part of a friend list
+SAMPLE_FIRST = "first"  # The first N friends in list order, checked as pages arrive
+SAMPLE_RANDOM = "random"  # N friends drawn at random from the whole friend list
+SAMPLE_ALL = "all"  # Every friend, until the time budget runs out
+DEEPCHECK_SAMPLE_SIZE = 20  # Friends /deepcheck checks with the first and random strategies
+DEEPCHECK_SAMPLE_STRATEGY = SAMPLE_FIRST
+DEEPCHECK_TIME_BUDGET = 90  # Seconds /deepcheck may spend checking friends with the all strategy
+
+@dataclass
+class FriendPage:
+    friend_ids: list
+    cursor: str  # Pass to iter_friend_pages to resume after this page; None on the last page
+
+async def iter_friend_pages(user_id, limit=SCAN_MAX_FRIENDS, cursor=None):
+    """Yield a user's friends page by page as each page arrives.
+
+    `limit` caps the total friends yielded (None for all). Start from a
+    `cursor` returned with an earlier page to resume where it stopped.
+    A page that still fails after retries raises, so a throttled or failing
+    friends API never looks like an empty friend list.
+    """
+    remaining = limit
+    while remaining is None or remaining > 0:
         url = f"{FRIENDS_API.format(user_id=user_id)}?limit=100"
         if cursor:
             url += f"&cursor={cursor}"
-        async with session.get(url) as resp:
+        async with api_request("GET", url) as resp:
+            resp.raise_for_status()
+            data = await resp.json()
+        friend_ids = [friend["id"] for friend in data.get("data", []) if friend["id"] != -1]  # Filter out invalid IDs
+        cursor = data.get("nextPageCursor")
+        if remaining is not None:
+            friend_ids = friend_ids[:remaining]
+            remaining -= len(friend_ids)
+        yield FriendPage(friend_ids, cursor)
+        if not cursor:
+            return
+
+async def stored_friend_pages(friend_ids):
+    """Serve a previously fetched friend list through the same interface as iter_friend_pages"""
+    yield FriendPage(list(friend_ids), None)
+
+async def get_friend_count(user_id):
+    """Total friends a user has (cheap probe so reports can say "X of Y"), or None"""
+    try:
+        async with api_request("GET", FRIEND_COUNT_API.format(user_id=user_id)) as resp:
+            if resp.status != 200:
+                return None
+            data = await resp.json()
+            return data.get("count")
+    except aiohttp.ClientError as e:
+        print(f"Error fetching friend count for {user_id}: {e}")
+        return None
+
+async def get_all_friends(user_id, max_friends=200):
+    friends = []
+    async for page in iter_friend_pages(user_id, limit=max_friends):
+        friends.extend({"id": friend_id} for friend_id in page.friend_ids)
+    return friends
+
+# Flagged group roster index configuration
+ROSTER_MAX_MEMBERS = 50000  # Larger groups are checked with live per-user lookups instead
+ROSTER_FULL_INTERVAL = 6 * 3600  # Full recrawl, which also drops members who left
+ROSTER_INCREMENTAL_INTERVAL = 900  # Crawl newest members until reaching already-known ones
+ROSTER_MAX_AGE = 12 * 3600  # Rosters not fully crawled within this are not trusted
+ROSTER_PAGE_DELAY = 0.5  # Seconds between roster pages, leaving groups API capacity for scans
+ROSTER_POLL_INTERVAL = 60  # Seconds between checks for due crawls and policy changes
+
+@dataclass
+class GroupRoster:
+    group_id: int
+    members: set
+    member_count: int
+    crawled_at: float  # Wall clock time of the last full crawl
+    updated_at: float  # Wall clock time of the last full or incremental crawl
+    too_large: bool = False
+
+class GroupRosterIndex:
+    """Local user ID -> flagged group index built by crawling flagged group rosters.
+
+    A background task keeps every flagged group's member list fresh (full
+    crawls plus cheap newest-first incremental crawls) so friend checks can
+    be answered without a groups API call. If any flagged group is too large
+    to index, not crawled yet or stale, lookup() returns None and callers
+    fall back to a live lookup.
+    """
+
+    def __init__(self):
+        self.rosters = {}  # Group ID -> GroupRoster
+        self.members = {}  # Roblox user ID -> set of indexed group IDs
+        self.task = None
+        self.local_hits = 0
+        self.live_fallbacks = 0
+        self.pages_crawled = 0
+        self.crawl_errors = 0
+
+    def is_fresh(self, group_id):
+        roster = self.rosters.get(group_id)
+        return roster is not None and not roster.too_large and time.time() - roster.crawled_at <= ROSTER_MAX_AGE
+
+    def lookup(self, user_id, flagged_group_ids):
+        """Flagged groups a user is in, or None if the index cannot answer for every flagged group"""
+        if not all(self.is_fresh(gid) for gid in flagged_group_ids):
+            self.live_fallbacks += 1
+            return None
+        self.local_hits += 1
+        return self.members.get(user_id, set()) & flagged_group_ids
+
+    def _set_roster(self, roster):
+        old = self.rosters.get(roster.group_id)
+        if old is not None:
+            for user_id in old.members - roster.members:
+                groups = self.members.get(user_id)
+                if groups is not None:
+                    groups.discard(roster.group_id)
+                    if not groups:
+                        del self.members[user_id]
+        for user_id in roster.members:
+            self.members.setdefault(user_id, set()).add(roster.group_id)
+        self.rosters[roster.group_id] = roster
+
+    def _drop(self, group_id):
+        roster = self.rosters.get(group_id)
+        if roster is not None:
+            self._set_roster(GroupRoster(group_id, set(), 0, 0.0, 0.0))
+            del self.rosters[group_id]
+
+    def _persist(self, roster):
+        api_disk_cache.put("group_rosters", roster.group_id, {
+            "members": sorted(roster.members),
+            "member_count": roster.member_count,
+            "crawled_at": roster.crawled_at,
+            "updated_at": roster.updated_at,
+            "too_large": roster.too_large,
+        }, ROSTER_MAX_AGE, False)
+
+    async def _load_from_disk(self, group_ids):
+        for group_id, value, _, _ in await api_disk_cache.load("group_rosters", list(group_ids)):
+            self._set_roster(GroupRoster(
+                group_id, set(value["members"]), value["member_count"],
+                value["crawled_at"], value["updated_at"], value["too_large"]
+            ))
+        if self.rosters:
+            print(f"✅ Loaded {len(self.rosters)} flagged group rosters ({len(self.members)} users) from disk")
+
+    async def _member_count(self, group_id):
+        async with api_request("GET", GROUP_INFO_API.format(group_id=group_id)) as resp:
+            resp.raise_for_status()
             data = await resp.json()
-            friends.extend(data.get("data", []))
+            return data.get("memberCount", 0)
+
+    async def _crawl(self, group_id, known=None):
+        """Page through a roster newest-first. With `known`, stop after the first page that reaches known members."""
+        members = set()
+        cursor = None
+        while True:
+            url = GROUP_USERS_API.format(group_id=group_id)
+            if cursor:
+                url += f"&cursor={cursor}"
+            async with api_request("GET", url) as resp:
+                resp.raise_for_status()
+                data = await resp.json()
+            self.pages_crawled += 1
+            page = {entry["user"]["userId"] for entry in data.get("data", [])}
+            members |= page
             cursor = data.get("nextPageCursor")
-            if not cursor:
-                break
-    return friends[:max_friends]
+            if not cursor or (known is not None and page & known):
+                return members
+            await asyncio.sleep(ROSTER_PAGE_DELAY)
+
+    async def refresh_group(self, group_id, full):
+        roster = self.rosters.get(group_id)
+        now = time.time()
+        if full or roster is None:
+            member_count = await self._member_count(group_id)
+            if member_count > ROSTER_MAX_MEMBERS:
+                print(f"⚠️ Flagged group {group_id} has {member_count} members; using live lookups for it")
+                roster = GroupRoster(group_id, set(), member_count, now, now, too_large=True)
+            else:
+                roster = GroupRoster(group_id, await self._crawl(group_id), member_count, now, now)
+        else:
+            new_members = await self._crawl(group_id, known=roster.members)
+            roster = GroupRoster(group_id, roster.members | new_members, roster.member_count, roster.crawled_at, now)
+        self._set_roster(roster)
+        self._persist(roster)
+
+    async def _run(self):
+        await self._load_from_disk(policy_store.snapshot.flagged_groups)
+        while True:
+            flagged = policy_store.snapshot.flagged_groups
+            for group_id in list(self.rosters):
+                if group_id not in flagged:
+                    self._drop(group_id)
+            for group_id in flagged:
+                roster = self.rosters.get(group_id)
+                now = time.time()
+                try:
+                    if roster is None or now - roster.crawled_at >= ROSTER_FULL_INTERVAL:
+                        await self.refresh_group(group_id, full=True)
+                    elif not roster.too_large and now - roster.updated_at >= ROSTER_INCREMENTAL_INTERVAL:
+                        await self.refresh_group(group_id, full=False)
+                except Exception as e:
+                    self.crawl_errors += 1
+                    print(f"⚠️ Error crawling roster for group {group_id}: {e}")
+            await asyncio.sleep(ROSTER_POLL_INTERVAL)
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+    def coverage(self):
+        """Return (fresh indexed groups, flagged groups)"""
+        flagged = policy_store.snapshot.flagged_groups
+        return sum(1 for gid in flagged if self.is_fresh(gid)), len(flagged)
+
+roster_index = GroupRosterIndex()
 
-async def check_friend_groups(session, friend_name, friend_id):
+async def check_friend_groups(friend_name, friend_id, flagged_group_ids=None):
+    if flagged_group_ids is None:
+        flagged_group_ids = FLAGGED_GROUP_IDS
     try:
-        friend_groups = await get_user_groups(session, friend_id)
+        # Answer from the roster index when it covers every flagged group
+        friend_groups = roster_index.lookup(friend_id, flagged_group_ids)
+        if friend_groups is None:
+            friend_groups = await get_user_groups(friend_id)
         flagged_names = []
         for gid in friend_groups:
-            if gid in FLAGGED_GROUP_IDS:
-                name = await get_group_name(session, gid)
+            if gid in flagged_group_ids:
+                name = await get_group_name(gid)
                 flagged_names.append(name)
         if flagged_names:
             return f"❗ **Friend {friend_name}** is in flagged groups: {', '.join(flagged_names)}"
     except Exception as e:
         print(f"Error checking friend {friend_name} (ID: {friend_id}): {e}")
-        return None
+        raise
 
-@tree.command(name="check", description="Check Roblox user and their friends for flagged groups")
-@app_commands.describe(target="Roblox username to scan or Discord user with linked account")
-async def check(interaction: discord.Interaction, target: str):
-    await interaction.response.defer(thinking=True)
-    
-    # Determine if target is a Discord mention or Roblox username
-    username = None
-    if target.startswith('<@') and target.endswith('>'):
-        # Extract Discord user ID from mention
-        user_id_str = target.strip('<@!>')
+# Scan pipeline configuration
+PROGRESS_EDIT_INTERVAL = 2.0  # Minimum seconds between progress message edits
+PROGRESS_MAX_CHARS = 1800  # Hit lines shown in the progress message before truncating
+FRIEND_GRAPH_TTL = 7 * 24 * 3600  # How long a scanned user's friend set is kept for diffing
+FRIEND_GRAPH_SIZE = 5000
+FRIEND_LIST_REUSE = 600  # Rescans within this many seconds reuse the stored friend list
+FRIEND_RESULT_TTL = 3600  # Friend check results younger than this are reused on rescans
+
+@dataclass
+class FriendScanResult:
+    """Outcome of the checks run against one friend"""
+    friend_id: int
+    name: str
+    group_hit: str = None  # Message from check_friend_groups
+    mococo_flagged: bool = False
+    mococo_skipped: bool = False
+    groups_checked: bool = True
+    checked_at: float = 0.0  # Wall clock time of the checks
+    errored: bool = False  # The group lookup or Mococo call failed, so a clean result proves nothing
+
+    @property
+    def flagged(self):
+        return bool(self.group_hit or self.mococo_flagged)
+
+    def issues(self):
+        issues = []
+        if self.group_hit:
+            issues.append(self.group_hit)
+        if self.mococo_flagged:
+            issues.append(f"🚨 **Friend {self.name}** flagged by Mococo for suspicious content!")
+        return issues
+
+@dataclass
+class ScanResult:
+    """Everything a scan learned about one Roblox user; commands only render this"""
+    user_id: int
+    username: str
+    badges: BadgeCountResult
+    user_info: dict
+    age_valid: bool
+    age_message: str
+    mococo: dict
+    flagged_groups: list  # Names of flagged groups the user is in
+    friends: list  # Friend entries as returned by the friends API
+    friend_results: list  # FriendScanResult for every scanned friend
+    timings: dict  # Stage name -> seconds
+    policy_version: int  # Policy snapshot the scan was evaluated against
+    previous_scan_at: float = None  # Wall clock time of the last stored scan, if any
+    added_friends: list = None  # (ID, name) of friends new since the last scan
+    removed_friends: list = None  # (ID, name) of friends gone since the last scan
+    reused_results: int = 0  # Friend results carried over from the last scan
+    friend_count: int = None  # Total friends according to the count probe
+    friends_cursor: str = None  # Resume cursor when the friend list was capped
+    sample_strategy: str = SAMPLE_FIRST  # How friend_results were picked from the friend list
+    budget_exhausted: bool = False  # The time budget ran out before every picked friend was checked
+    duration: float = 0.0  # Wall time of the whole scan in seconds
+
+    def friends_label(self):
+        """"**X**" friends, or "**X** of **Y**" when the list was capped"""
+        if self.friend_count and self.friend_count > len(self.friends):
+            return f"**{len(self.friends)}** of **{self.friend_count}**"
+        return f"**{len(self.friends)}**"
+
+    @property
+    def mococo_flagged(self):
+        return bool(self.mococo and self.mococo.get("flagged"))
+
+    @property
+    def flagged_friends(self):
+        return [result for result in self.friend_results if result.flagged]
+
+    @property
+    def friend_issues(self):
+        return [issue for result in self.flagged_friends for issue in result.issues()]
+
+    @property
+    def mococo_skipped(self):
+        """Accounts (user and friends) whose Mococo check was skipped"""
+        skipped = sum(1 for result in self.friend_results if result.mococo_skipped)
+        return skipped + (1 if is_mococo_skipped(self.mococo) else 0)
+
+    def change_summary(self, max_names=10):
+        """One or two lines describing friend changes since the last scan, or None on a first scan"""
+        if self.previous_scan_at is None:
+            return None
+        hours = (time.time() - self.previous_scan_at) / 3600
+        lines = [f"🔁 **Since last scan** ({hours:.1f}h ago): +{len(self.added_friends)} / -{len(self.removed_friends)} friends, "
+                 f"{self.reused_results} friend results reused"]
+        for label, friends in (("Added", self.added_friends), ("Removed", self.removed_friends)):
+            if friends:
+                names = ", ".join(name for _, name in friends[:max_names])
+                more = f" (+{len(friends) - max_names} more)" if len(friends) > max_names else ""
+                lines.append(f"   {label}: {names}{more}")
+        return "\n".join(lines)
+
+    def risk_score(self):
+        """Signals that a passing user deserves an earlier re-check: unchecked friends, friend churn, a young account"""
+        score = 0
+        if self.mococo_skipped:
+            score += 1
+        if self.added_friends:
+            score += min(3, len(self.added_friends) // 10 + 1)
+        created = (self.user_info or {}).get("created")
+        if created:
+            created_datetime = datetime.fromisoformat(created.replace("Z", "+00:00"))
+            if (datetime.now(created_datetime.tzinfo) - created_datetime).days < 90:
+                score += 1
+        return score
+
+    def verdict(self):
+        """VERDICT_PRIVACY if badges or profile are hidden, VERDICT_FAIL on any issue, else VERDICT_PASS"""
+        if self.badges.status == BADGES_UNAVAILABLE or self.user_info is None:
+            return VERDICT_PRIVACY
+        if (self.badges.status == BADGES_BELOW_THRESHOLD or not self.age_valid or self.mococo_flagged
+                or self.flagged_groups or self.flagged_friends):
+            return VERDICT_FAIL
+        return VERDICT_PASS
+
+    def validation_info(self):
+        info = ""
+        if self.badges.status != BADGES_UNAVAILABLE:
+            info += f" (Badges: {self.badges.display()})"
+        if self.user_info is not None:
+            info += f" ({self.age_message})"
+        return info
+
+class ScanProgress:
+    """One status message edited in place while a scan's friends are checked.
+
+    Edits are throttled to PROGRESS_EDIT_INTERVAL and happen in the
+    background, so a slow Discord edit never holds back the scan.
+    """
+
+    def __init__(self, message, title):
+        self.message = message
+        self.title = title
+        self.done = 0
+        self.total = 0
+        self.hits = []
+        self.last_edit = 0.0
+        self.flush_task = None
+
+    @classmethod
+    async def start(cls, send, title):
+        """Post the initial message with `send` (must return the sent message)"""
+        message = await send(f"{title}...")
+        return cls(message, title)
+
+    def friend_done(self, result, done, total):
+        """Record a finished friend and schedule a throttled edit"""
+        self.done = done
+        self.total = total
+        if result.flagged:
+            self.hits.extend(result.issues())
+        if self.message is not None and self.flush_task is None:
+            delay = max(0.0, self.last_edit + PROGRESS_EDIT_INTERVAL - time.monotonic())
+            self.flush_task = asyncio.create_task(self._flush(delay))
+
+    def render(self):
+        lines = [f"{self.title} — **{self.done}/{self.total}** friends scanned, **{len(self.hits)}** hits so far"]
+        length = len(lines[0])
+        for hit in self.hits:
+            if length + len(hit) > PROGRESS_MAX_CHARS:
+                lines.append(f"…and {len(self.hits) - (len(lines) - 1)} more")
+                break
+            lines.append(hit)
+            length += len(hit) + 1
+        return "\n".join(lines)
+
+    async def _flush(self, delay):
+        await asyncio.sleep(delay)
+        self.flush_task = None
+        await self._edit(self.render())
+
+    async def _edit(self, content):
+        self.last_edit = time.monotonic()
         try:
-            mentioned_user_id = int(user_id_str)
-            if mentioned_user_id in user_links:
-                username = user_links[mentioned_user_id]
-                mentioned_user = interaction.guild.get_member(mentioned_user_id)
-                display_name = mentioned_user.display_name if mentioned_user else f"User ID {mentioned_user_id}"
-                await interaction.followup.send(f"🔗 Using linked account for {display_name}: `{username}`")
-            else:
-                await interaction.followup.send(f"❌ The mentioned user does not have a linked Roblox account.")
-                return
-        except ValueError:
-            await interaction.followup.send(f"❌ Invalid Discord mention format.")
-            return
-    else:
-        username = target
-    
-    async with aiohttp.ClientSession() as session:
-        user_id = await get_user_id(session, username)
-        if not user_id:
-            await interaction.followup.send(f"❌ Could not find Roblox user `{username}`.")
-            return
+            await self.message.edit(content=content)
+        except discord.HTTPException as e:
+            print(f"⚠️ Could not update progress message: {e}")
 
-        # Check badge count requirement (at least 600 badges)
-        badge_count = await get_user_badges_count(user_id)
-        badge_warning = None
-        if badge_count is None:
-            badge_warning = f"⚠️ Could not fetch badge count for `{username}`."
-        elif badge_count == 0:
-            badge_warning = f"⚠️ `{username}` has badges set to private."
-        elif badge_count < 600:
-            badge_warning = f"⚠️ `{username}` only has **{badge_count}** badges (minimum 600 required)."
-        
-        # Check account age requirement (at least 1 month old)
-        user_info = await get_user_info(user_id)
-        age_warning = None
-        if user_info is None:
-            age_warning = f"⚠️ Could not fetch account information for `{username}`."
+    async def finish(self, content):
+        """Replace the progress text with the final header"""
+        if self.flush_task:
+            self.flush_task.cancel()
+            self.flush_task = None
+        if self.message is not None:
+            await self._edit(content)
+
+async def run_stages(stages):
+    """Run {name: (dependencies, stage)} as a dependency graph.
+
+    Each stage starts as soon as its dependencies finish and receives their
+    results as keyword arguments. Returns ({name: result}, {name: seconds}).
+    """
+    tasks = {}
+    timings = {}
+
+    async def run(name):
+        dependencies, stage = stages[name]
+        inputs = {dependency: await tasks[dependency] for dependency in dependencies}
+        start = time.monotonic()
+        with tracer.span(name):
+            result = await stage(**inputs)
+        timings[name] = time.monotonic() - start
+        return result
+
+    for name in stages:
+        tasks[name] = asyncio.ensure_future(run(name))
+    try:
+        results = await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        raise
+    return dict(zip(tasks, results)), timings
+
+async def scan_friend(friend_id, friend_name, check_groups=True, flagged_group_ids=None):
+    """Run the local group and Mococo checks for one friend concurrently"""
+    with tracer.span("scan_friend", friend_id=friend_id):
+        group_check = check_friend_groups(friend_name, friend_id, flagged_group_ids) if check_groups else asyncio.sleep(0)
+        group_hit, mococo_result = await asyncio.gather(group_check, check_user_with_mococo(friend_id), return_exceptions=True)
+    group_failed = isinstance(group_hit, Exception)
+    if isinstance(mococo_result, Exception):
+        mococo_result = None
+    return FriendScanResult(
+        friend_id,
+        friend_name,
+        group_hit=None if group_failed else group_hit,
+        mococo_flagged=bool(mococo_result and mococo_result.get("flagged")),
+        mococo_skipped=is_mococo_skipped(mococo_result),
+        groups_checked=check_groups,
+        checked_at=time.time(),
+        errored=group_failed or mococo_result is None
+    )
+
+friend_graph_cache = TTLCache("friend_graph", FRIEND_GRAPH_TTL, FRIEND_GRAPH_SIZE, store=api_disk_cache)  # Roblox user ID -> last scan's friend set and results
+
+async def load_friend_graph(user_id):
+    await friend_graph_cache.warm([user_id])
+    return friend_graph_cache.get(user_id, None)
+
+def store_friend_graph(user_id, friend_ids, results, groups_version, previous, complete=True):
+    """Save a scan's friend set and results, keeping earlier results for friends it did not check"""
+    stored = {}
+    if previous and previous.get("groups_version") == groups_version:
+        stored = {int(friend_id): result for friend_id, result in previous["results"].items()}
+    for result in results:
+        # Skipped or failed checks are retried by the next scan rather than carried over
+        if not result.mococo_skipped and not result.errored:
+            stored[result.friend_id] = asdict(result)
+    friend_set = set(friend_ids)
+    friend_graph_cache.set(user_id, {
+        "scanned_at": time.time(),
+        "groups_version": groups_version,
+        "friend_ids": list(friend_ids),
+        "complete": complete,  # False if the friend list was capped
+        "results": {str(friend_id): result for friend_id, result in stored.items() if friend_id in friend_set},
+    })
+
+async def scan_user(user_id, username, friend_sample=None, friend_groups=True, on_friend_result=None, max_friends=SCAN_MAX_FRIENDS,
+                    sample_strategy=SAMPLE_FIRST, time_budget=None):
+    """Scan a Roblox user and their friends.
+
+    Badges, profile, groups, friends and the user's own Mococo lookup start
+    together once the ID is known, so a scan takes about as long as its
+    slowest branch. Friend pages are checked as they arrive, while later
+    pages are still loading. `max_friends` caps the friends fetched (None
+    for all), `friend_sample` limits how many of them are checked, and
+    `on_friend_result(result, done, total)` is called as each friend finishes.
+    With SAMPLE_RANDOM the sample is drawn once the whole list is fetched;
+    `time_budget` stops fetching and checking friends after that many
+    seconds and keeps whatever finished.
+    The whole scan uses the policy snapshot current when it started.
+    """
+    policy = policy_store.snapshot
+    scan_start = time.monotonic()
+    tracer.tag(user=username, user_id=user_id)
+
+    async def age(profile):
+        if profile is None:
+            return False, None
+        return await check_account_age(profile)
+
+    async def flagged_groups(groups):
+        flagged_ids = [gid for gid in groups if gid in policy.flagged_groups]
+        return list(await asyncio.gather(*(get_group_name(gid) for gid in flagged_ids)))
+
+    def reusable_result(previous, friend_id):
+        """The last scan's result for a friend if it is recent and made against the same flagged groups"""
+        if not previous or previous.get("groups_version") != policy.groups_version:
+            return None
+        stored = previous["results"].get(str(friend_id))
+        if (stored and time.time() - stored["checked_at"] < FRIEND_RESULT_TTL and not stored.get("errored")
+                and (stored["groups_checked"] or not friend_groups)):
+            return FriendScanResult(**stored)
+        return None
+
+    async def stream_friends(previous):
+        count_task = asyncio.ensure_future(get_friend_count(user_id))
+        # A rescan shortly after the last one reuses its friend list if it covered enough
+        if (previous and time.time() - previous["scanned_at"] < FRIEND_LIST_REUSE
+                and (previous.get("complete", True) or (max_friends is not None and len(previous["friend_ids"]) >= max_friends))):
+            reused_ids = previous["friend_ids"][:max_friends]
+            # Cutting the stored list down to max_friends leaves it as incomplete as a capped fetch
+            list_complete = previous.get("complete", True) and len(reused_ids) == len(previous["friend_ids"])
+            pages = stored_friend_pages(reused_ids)
         else:
-            age_valid, age_message = await check_account_age(user_info)
-            if not age_valid:
-                age_warning = f"⚠️ `{username}` account age validation failed: {age_message}"
-
-        friends = await get_all_friends(session, user_id, max_friends=200)
-        total_friends = len(friends)
-
-        # Include validation status in the scanning message
-        validation_info = ""
-        if badge_count is not None:
-            validation_info += f" (Badges: {badge_count})"
-        if user_info is not None:
-            age_valid, age_message = await check_account_age(user_info)
-            validation_info += f" ({age_message})"
-        
-        # Send any warnings before starting the scan
-        warnings = []
-        if badge_warning:
-            warnings.append(badge_warning)
-        if age_warning:
-            warnings.append(age_warning)
-        
-        if warnings:
-            await interaction.followup.send("\n".join(warnings))
+            list_complete = True  # Unless the last page fetched still has a cursor
+            pages = iter_friend_pages(user_id, limit=max_friends)
         
-        # Optional: Quick Mococo check for main user
-        mococo_result = await check_user_with_mococo(session, user_id)
-        if mococo_result and mococo_result.get("flagged"):
-            await interaction.followup.send(f"🚨 **Mococo Alert**: `{username}` flagged for suspicious content associations!")
-        
-        await interaction.followup.send(f"🔍 Scanning `{username}`{validation_info} and **{total_friends}** friends for flagged groups. This may take a moment...")
+        friend_ids = []
+        selected = []  # Friends picked for checking, in friend-list order
+        results = []
+        reused = 0
+        page_tasks = []
+        cursor = None
+
+        def expected_total():
+            total = len(selected)
+            if count_task.done() and not count_task.cancelled() and not count_task.exception() and count_task.result() is not None:
+                caps = [count_task.result()] + [cap for cap in (max_friends, friend_sample) if cap is not None]
+                total = max(total, min(caps))
+            return total
+
+        def report(result):
+            results.append(result)
+            if on_friend_result:
+                on_friend_result(result, len(results), expected_total())
+
+        async def check_page(page_ids):
+            with tracer.span("friend_fanout", friends=len(page_ids)):
+                usernames = await get_usernames_from_ids(page_ids)
+                checks = [
+                    scan_friend(friend_id, usernames.get(friend_id, f"User_{friend_id}"), friend_groups, policy.flagged_groups)
+                    for friend_id in page_ids
+                ]
+                for next_result in asyncio.as_completed(checks):
+                    report(await next_result)
+
+        def select(candidates):
+            nonlocal reused
+            to_check = []
+            for friend_id in candidates:
+                selected.append(friend_id)
+                stored = reusable_result(previous, friend_id)
+                if stored:
+                    reused += 1
+                    report(stored)
+                else:
+                    to_check.append(friend_id)
+            # One name lookup per 100 friends, matching the users API batch size
+            for start in range(0, len(to_check), 100):
+                page_tasks.append(asyncio.ensure_future(check_page(to_check[start:start + 100])))
 
-        # Get usernames for all friends
-        friend_ids = [friend["id"] for friend in friends if friend["id"] != -1]  # Filter out invalid IDs
-        id_to_username = await get_usernames_from_ids(session, friend_ids)
+        async def consume():
+            nonlocal cursor, fetched_all
+            async for page in pages:
+                friend_ids.extend(page.friend_ids)
+                cursor = page.cursor
+                if sample_strategy == SAMPLE_RANDOM and friend_sample is not None:
+                    continue
+                room = len(page.friend_ids) if friend_sample is None else max(0, friend_sample - len(selected))
+                select(page.friend_ids[:room])
+            fetched_all = True
+            if sample_strategy == SAMPLE_RANDOM and friend_sample is not None:
+                select(random.sample(friend_ids, min(friend_sample, len(friend_ids))))
+            await asyncio.gather(*page_tasks)
 
-        flagged = []
+        budget_exhausted = False
+        fetched_all = False  # The time budget can stop the page fetch before it reaches the end
+        try:
+            await asyncio.wait_for(consume(), time_budget)
+        except asyncio.TimeoutError:
+            budget_exhausted = True
+            print(f"⏱️ Friend check time budget ({time_budget}s) ran out for {user_id}: {len(results)}/{len(selected)} checked")
+        finally:
+            for task in page_tasks:
+                task.cancel()
         
-        # Check main user groups (local flagged groups)
-        user_groups = await get_user_groups(session, user_id)
-        for gid in user_groups:
-            if gid in FLAGGED_GROUP_IDS:
-                name = await get_group_name(session, gid)
-                flagged.append(f"⚠️ **{username}** is in flagged group: {name}")
-
-        # Enhanced friend checking with both local groups AND Mococo API
-        sem = asyncio.Semaphore(5)  # Reduced from 10 to respect Mococo API limits
-
-        async def enhanced_friend_check(friend):
-            async with sem:
-                friend_id = friend["id"]
-                if friend_id == -1:  # Skip invalid friend IDs
-                    return None
-                
-                friend_name = id_to_username.get(friend_id, f"User_{friend_id}")
-                results = []
-                
-                # Check local flagged groups
-                local_result = await check_friend_groups(session, friend_name, friend_id)
-                if local_result:
-                    results.append(local_result)
-                
-                # Check with Mococo API
-                mococo_friend_result = await check_user_with_mococo(session, friend_id)
-                if mococo_friend_result and mococo_friend_result.get("flagged"):
-                    results.append(f"🚨 **Friend {friend_name}** flagged by Mococo for suspicious content!")
-                
-                return results if results else None
-
-        # Check friends with enhanced detection
-        tasks = [enhanced_friend_check(friend) for friend in friends]
-        results = await asyncio.gather(*tasks)
-
-        # Flatten results and add to flagged list
-        for result_set in results:
-            if result_set:
-                flagged.extend(result_set)
-
-        if flagged:
-            # Add summary header
-            summary = f"🚨 **Found {len(flagged)} issues:**\n\n"
-            message = summary + "\n".join(flagged)
-            if len(message) > 1900:
-                await interaction.followup.send(summary)
-                chunks = [("\n".join(flagged))[i:i+1800] for i in range(0, len("\n".join(flagged)), 1800)]
-                for chunk in chunks:
-                    await interaction.followup.send(chunk)
-            else:
-                await interaction.followup.send(message)
-        else:
-            await interaction.followup.send(f"✅ `{username}` and their friends are clean (checked local groups + Mococo database).")
+        try:
+            friend_count = await count_task
+        except Exception:
+            friend_count = None
+        # Report in friend-list order, not completion order
+        order = {friend_id: index for index, friend_id in enumerate(selected)}
+        return {
+            "friend_ids": friend_ids,
+            "results": sorted(results, key=lambda result: order[result.friend_id]),
+            "reused": reused,
+            "friend_count": friend_count,
+            "cursor": cursor,
+            "complete": list_complete and fetched_all and cursor is None,
+            "budget_exhausted": budget_exhausted,
+        }
 
-@tree.command(name="deepcheck", description="Advanced check using Mococo API for suspicious content associations")
-@app_commands.describe(target="Roblox username to scan or Discord user with linked account")
-async def deepcheck(interaction: discord.Interaction, target: str):
-    await interaction.response.defer(thinking=True)
+    results, timings = await run_stages({
+        "badges": ((), lambda: count_user_badges(user_id)),
+        "profile": ((), lambda: get_user_info(user_id)),
+        "mococo": ((), lambda: check_user_with_mococo(user_id)),
+        "groups": ((), lambda: get_user_groups(user_id)),
+        "previous": ((), lambda: load_friend_graph(user_id)),
+        "age": (("profile",), age),
+        "flagged_groups": (("groups",), flagged_groups),
+        "friends": (("previous",), stream_friends),
+    })
+    age_valid, age_message = results["age"]
+    friends = results["friends"]
     
-    # Determine if target is a Discord mention or Roblox username
-    username = None
-    if target.startswith('<@') and target.endswith('>'):
-        # Extract Discord user ID from mention
-        user_id_str = target.strip('<@!>')
-        try:
-            mentioned_user_id = int(user_id_str)
-            if mentioned_user_id in user_links:
-                username = user_links[mentioned_user_id]
-                mentioned_user = interaction.guild.get_member(mentioned_user_id)
-                display_name = mentioned_user.display_name if mentioned_user else f"User ID {mentioned_user_id}"
-                await interaction.followup.send(f"🔗 Using linked account for {display_name}: `{username}`")
-            else:
-                await interaction.followup.send(f"❌ The mentioned user does not have a linked Roblox account.")
-                return
-        except ValueError:
-            await interaction.followup.send(f"❌ Invalid Discord mention format.")
-            return
-    else:
-        username = target
+    # Diff against the last scan, then store this one
+    previous = results["previous"]
+    friend_ids = friends["friend_ids"]
+    names = {result.friend_id: result.name for result in friends["results"]}
+    added = removed = None
+    if previous:
+        # Only compare the part of the friend list both scans covered; a capped list says nothing past its end
+        previous_ids = previous["friend_ids"] if friends["complete"] else previous["friend_ids"][:len(friend_ids)]
+        current_ids = friend_ids if previous.get("complete", True) else friend_ids[:len(previous["friend_ids"])]
+        previous_set = set(previous["friend_ids"])
+        current_set = set(friend_ids)
+        previous_names = {int(friend_id): result["name"] for friend_id, result in previous["results"].items()}
+        added = [(friend_id, names.get(friend_id, f"User_{friend_id}")) for friend_id in current_ids if friend_id not in previous_set]
+        removed = [(friend_id, previous_names.get(friend_id, f"User_{friend_id}")) for friend_id in previous_ids if friend_id not in current_set]
+    store_friend_graph(user_id, friend_ids, friends["results"], policy.groups_version, previous, complete=friends["complete"])
     
-    async with aiohttp.ClientSession() as session:
-        user_id = await get_user_id(session, username)
-        if not user_id:
-            await interaction.followup.send(f"❌ Could not find Roblox user `{username}`.")
-            return
+    return ScanResult(
+        user_id=user_id,
+        username=username,
+        badges=results["badges"],
+        user_info=results["profile"],
+        age_valid=age_valid,
+        age_message=age_message,
+        mococo=results["mococo"],
+        flagged_groups=results["flagged_groups"],
+        friends=[{"id": friend_id} for friend_id in friend_ids],
+        friend_results=friends["results"],
+        timings=timings,
+        policy_version=policy.version,
+        previous_scan_at=previous["scanned_at"] if previous else None,
+        added_friends=added,
+        removed_friends=removed,
+        reused_results=friends["reused"],
+        friend_count=friends["friend_count"],
+        friends_cursor=friends["cursor"],
+        sample_strategy=sample_strategy,
+        budget_exhausted=friends["budget_exhausted"],
+        duration=time.monotonic() - scan_start
+    )
 
-        await interaction.followup.send(f"🔍 Running deep scan on `{username}` using Mococo API and local checks...")
+def mentioned_user_id(target):
+    """Discord user ID from a mention such as <@123>, or None if `target` is not a valid mention"""
+    if not (target.startswith('<@') and target.endswith('>')):
+        return None
+    try:
+        return int(target.strip('<@!>'))
+    except ValueError:
+        return None
 
-        # Check with Mococo API
-        mococo_result = await check_user_with_mococo(session, user_id)
-        
-        # Run standard checks
-        badge_count = await get_user_badges_count(user_id)
-        user_info = await get_user_info(user_id)
-        friends = await get_all_friends(session, user_id, max_friends=200)
-        user_groups = await get_user_groups(session, user_id)
-        
-        # Build comprehensive report
-        report = [f"📊 **Deep Scan Report for `{username}`**\n"]
-        
-        # Mococo API results
-        if mococo_result:
-            if mococo_result.get("flagged"):
-                report.append(f"🚨 **MOCOCO ALERT**: User flagged for suspicious content associations")
-                if "reason" in mococo_result:
-                    report.append(f"   Reason: {mococo_result['reason']}")
-                if "confidence" in mococo_result:
-                    report.append(f"   Confidence: {mococo_result['confidence']}%")
+async def resolve_scan_target(interaction, target):
+    """Turn a Roblox username or a linked Discord mention into a username, or None after reporting why"""
+    if not (target.startswith('<@') and target.endswith('>')):
+        return target
+    
+    discord_id = mentioned_user_id(target)
+    if discord_id is None:
+        await interaction.followup.send(f"❌ Invalid Discord mention format.")
+        return None
+    if discord_id not in user_links:
+        await interaction.followup.send(f"❌ The mentioned user does not have a linked Roblox account.")
+        return None
+    
+    username = user_links[discord_id]
+    mentioned_user = interaction.guild.get_member(discord_id)
+    display_name = mentioned_user.display_name if mentioned_user else f"User ID {discord_id}"
+    await interaction.followup.send(f"🔗 Using linked account for {display_name}: `{username}`")
+    return username
+
+# Friend network exploration configuration
+NETWORK_MAX_DEPTH = 3  # Deepest hop /deepcheck may explore
+NETWORK_NODE_BUDGET = 300  # Accounts checked across all hops of one exploration
+NETWORK_FRIENDS_PER_NODE = 100  # Friends fetched (one page) when expanding a node past hop 1
+NETWORK_MAX_EXPANSIONS = 25  # Nodes expanded per hop, including the root's direct friends
+NETWORK_FETCH_WAVE = 10  # Friend lists fetched at once; later waves are skipped once the budget is full
+NETWORK_SHARED_FRIEND_SIGNAL = 2  # Accounts reached from this many expanded nodes count as a signal
+
+@dataclass
+class NetworkHit:
+    user_id: int
+    name: str
+    hop: int
+    path: list  # Names from the scanned user to this account
+    issues: list
+
+@dataclass
+class NetworkExploration:
+    depth: int
+    checked: int  # Accounts checked across all hops
+    expanded: int  # Accounts whose friend lists were fetched
+    pruned: int  # Checked accounts not expanded (no signal, or past NETWORK_MAX_EXPANSIONS)
+    budget_exhausted: bool
+    hits: list  # NetworkHit, ordered by hop
+
+async def explore_friend_network(root_id, root_name, max_depth, root_friends=None, node_budget=NETWORK_NODE_BUDGET):
+    """Breadth-first crawl of the friend graph around a user.
+
+    Each hop checks newly reached accounts (local groups + Mococo) and then
+    expands only nodes with a signal: a hit of their own, or being reached
+    from several expanded nodes. The root's direct friends need no signal,
+    but every hop expands at most NETWORK_MAX_EXPANSIONS nodes, strongest
+    signals first. Accounts are visited at most once and the whole crawl
+    checks at most `node_budget` accounts; friend lists are fetched in waves
+    that stop once the reached accounts fill the remaining budget. Fetches
+    run concurrently through the shared per-host limiters.
+    """
+    flagged_group_ids = policy_store.snapshot.flagged_groups
+    parent = {root_id: None}
+    names = {root_id: root_name}
+    seen_count = {}  # Account ID -> expanded nodes that listed it
+    hits = []
+    checked = expanded = pruned = 0
+    budget_exhausted = False
+    to_expand = [root_id]
+    
+    for hop in range(1, max_depth + 1):
+        reached = []
+        for start in range(0, len(to_expand), NETWORK_FETCH_WAVE):
+            if checked + len(reached) >= node_budget:
+                # Nothing the remaining friend lists add could be checked
+                budget_exhausted = True
+                break
+            wave = to_expand[start:start + NETWORK_FETCH_WAVE]
+            if hop == 1 and root_friends is not None:
+                friend_lists = [root_friends]
             else:
-                report.append(f"✅ **Mococo Check**: Clean (no suspicious associations found)")
-        else:
-            report.append(f"⚠️ **Mococo Check**: API unavailable")
+                friend_lists = await asyncio.gather(
+                    *(get_all_friends(node, max_friends=NETWORK_FRIENDS_PER_NODE) for node in wave),
+                    return_exceptions=True
+                )
+            expanded += len(wave)
+            
+            for node, friends in zip(wave, friend_lists):
+                if isinstance(friends, Exception):
+                    print(f"⚠️ Could not fetch friends of {node} while exploring: {friends}")
+                    continue
+                for friend in friends:
+                    friend_id = friend["id"]
+                    if friend_id == -1:
+                        continue
+                    seen_count[friend_id] = seen_count.get(friend_id, 0) + 1
+                    if friend_id in parent:
+                        continue
+                    if checked + len(reached) >= node_budget:
+                        budget_exhausted = True
+                        continue
+                    parent[friend_id] = node
+                    reached.append(friend_id)
+        if not reached:
+            break
         
-        # Badge and account checks
-        if badge_count is not None:
-            if badge_count == 0:
-                report.append(f"🔒 **Badge Count**: Private ({badge_count} visible)")
-            elif badge_count < 600:
-                report.append(f"⚠️ **Badge Count**: {badge_count} (below recommended 600)")
-            else:
-                report.append(f"✅ **Badge Count**: {badge_count}")
+        names.update(await get_usernames_from_ids(reached))
+        results = await asyncio.gather(*(
+            scan_friend(friend_id, names.get(friend_id, f"User_{friend_id}"), True, flagged_group_ids)
+            for friend_id in reached
+        ))
+        checked += len(reached)
         
-        # Account age check
-        if user_info:
-            age_valid, age_message = await check_account_age(user_info)
-            if age_valid:
-                report.append(f"✅ **Account Age**: {age_message}")
-            else:
-                report.append(f"⚠️ **Account Age**: {age_message}")
+        flagged_ids = set()
+        for result in results:
+            if result.flagged:
+                flagged_ids.add(result.friend_id)
+                path = []
+                node = result.friend_id
+                while node is not None:
+                    path.append(names.get(node, f"User_{node}"))
+                    node = parent[node]
+                hits.append(NetworkHit(result.friend_id, result.name, hop, path[::-1], result.issues()))
         
-        # Group checks (local flagged groups)
-        flagged_groups = []
-        for gid in user_groups:
-            if gid in FLAGGED_GROUP_IDS:
-                name = await get_group_name(session, gid)
-                flagged_groups.append(name)
+        if hop == max_depth or budget_exhausted:
+            break
+        # Prune branches with no signal (direct friends need none); strongest signals first
+        signalled = [
+            friend_id for friend_id in reached
+            if hop == 1 or friend_id in flagged_ids or seen_count.get(friend_id, 0) >= NETWORK_SHARED_FRIEND_SIGNAL
+        ]
+        signalled.sort(key=lambda friend_id: (friend_id not in flagged_ids, -seen_count.get(friend_id, 0)))
+        to_expand = signalled[:NETWORK_MAX_EXPANSIONS]
+        pruned += len(reached) - len(to_expand)
+        if not to_expand:
+            break
+    
+    return NetworkExploration(max_depth, checked, expanded, pruned, budget_exhausted, hits)
+
+def render_network_report(exploration, max_paths=15):
+    """Report lines summarising network hits by hop distance and path"""
+    lines = [f"🕸️ **Friend Network** (depth {exploration.depth}): checked {exploration.checked} accounts, "
+             f"expanded {exploration.expanded}, pruned {exploration.pruned}"
+             + (" — node budget reached" if exploration.budget_exhausted else "")]
+    if not exploration.hits:
+        lines.append("✅ **Network Check**: No flagged accounts found")
+        return lines
+    by_hop = {}
+    for hit in exploration.hits:
+        by_hop[hit.hop] = by_hop.get(hit.hop, 0) + 1
+    lines.append("🚨 **Flagged by hop**: " + ", ".join(f"hop {hop}: {count}" for hop, count in sorted(by_hop.items())))
+    for hit in exploration.hits[:max_paths]:
+        lines.append(f"   • hop {hit.hop}: {' → '.join(hit.path)}")
+    if len(exploration.hits) > max_paths:
+        lines.append(f"   …and {len(exploration.hits) - max_paths} more")
+    return lines
+
+# Verification queue configuration
+VERIFY_WORKERS = 3  # Scans that may run at once
+VERIFY_QUEUE_MAX = 200  # Background jobs beyond this are rejected
+PRIORITY_INTERACTIVE = 0  # /check, /deepcheck, /verify, /testcheck
+PRIORITY_BACKGROUND = 1  # Auto-checks from role grants
+
+@dataclass
+class VerificationJob:
+    key: tuple
+    priority: int
+    label: str
+    run: object  # Zero-argument coroutine function
+    done: asyncio.Future
+    enqueued_at: float
+    started_at: float = None
+
+class VerificationQueue:
+    """Priority job queue with a bounded worker pool for scans.
+
+    Interactive jobs always run before background auto-checks. A job whose
+    key is already queued or running is dropped, and callers can await
+    `job.done` for the result. A duplicate with a higher priority promotes
+    the queued job, so /verify never waits behind the background backlog.
+    """
+
+    def __init__(self, workers=VERIFY_WORKERS, max_background=VERIFY_QUEUE_MAX):
+        self.worker_count = workers
+        self.max_background = max_background
+        self.queue = asyncio.PriorityQueue()
+        self.jobs = {}  # key -> queued or running job
+        self.sequence = itertools.count()
+        self.workers = []
+        self.running = 0
+        self.wait_times = deque(maxlen=200)  # Seconds from enqueue to start
+        self.enqueued = 0
+        self.completed = 0
+        self.failed = 0
+        self.deduplicated = 0
+        self.rejected = 0
+
+    def start(self):
+        if not self.workers:
+            self.workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+
+    async def stop(self):
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    def depth(self, priority=None):
+        queued = [job for job in self.jobs.values() if job.started_at is None]
+        if priority is None:
+            return len(queued)
+        return sum(1 for job in queued if job.priority == priority)
+
+    def position(self, job):
+        """1-based queue position, or 0 once the job is running"""
+        if job.started_at is not None:
+            return 0
+        ahead = sum(
+            1 for other in self.jobs.values()
+            if other.started_at is None and (other.priority, other.enqueued_at) < (job.priority, job.enqueued_at)
+        )
+        return ahead + 1
+
+    def submit(self, key, priority, run, label):
+        """Queue a job. Returns (job, accepted); job is the existing one for duplicates, None if rejected."""
+        existing = self.jobs.get(key)
+        if existing is not None:
+            self.deduplicated += 1
+            if existing.started_at is None and priority < existing.priority:
+                # Requeue at the new priority; the worker skips the stale entry
+                existing.priority = priority
+                self.queue.put_nowait((priority, next(self.sequence), existing))
+            return existing, False
+        if priority == PRIORITY_BACKGROUND and self.depth(PRIORITY_BACKGROUND) >= self.max_background:
+            self.rejected += 1
+            return None, False
         
-        if flagged_groups:
-            report.append(f"🚨 **Flagged Groups**: {', '.join(flagged_groups)}")
+        job = VerificationJob(key, priority, label, run, asyncio.get_running_loop().create_future(), time.monotonic())
+        self.jobs[key] = job
+        self.enqueued += 1
+        self.queue.put_nowait((priority, next(self.sequence), job))
+        return job, True
+
+    async def _worker(self):
+        while True:
+            priority, _, job = await self.queue.get()
+            if job.started_at is not None or priority != job.priority:
+                # Left behind when the job was promoted
+                self.queue.task_done()
+                continue
+            job.started_at = time.monotonic()
+            self.wait_times.append(job.started_at - job.enqueued_at)
+            job_wait.observe(job.started_at - job.enqueued_at, kind=job.key[0])
+            self.running += 1
+            try:
+                with tracer.trace(job.key[0], label=job.label, queued_ms=round((job.started_at - job.enqueued_at) * 1000)):
+                    result = await job.run()
+                self.completed += 1
+                if not job.done.done():
+                    job.done.set_result(result)
+            except asyncio.CancelledError:
+                job.done.cancel()
+                raise
+            except Exception as e:
+                self.failed += 1
+                print(f"❌ Queued job {job.label} failed: {e}")
+                if not job.done.done():
+                    job.done.set_exception(e)
+                    # Background jobs are never awaited; mark the error as seen
+                    job.done.exception()
+            finally:
+                self.running -= 1
+                job_duration.observe(time.monotonic() - job.started_at, kind=job.key[0])
+                if self.jobs.get(job.key) is job:
+                    del self.jobs[job.key]
+                self.queue.task_done()
+
+    def wait_stats(self):
+        """Return (average, p95) wait in seconds over recent jobs"""
+        if not self.wait_times:
+            return 0.0, 0.0
+        ordered = sorted(self.wait_times)
+        return sum(ordered) / len(ordered), ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+verification_queue = VerificationQueue()
+
+async def run_queued(interaction, key, run, label):
+    """Queue an interactive job, tell the user where it is, and wait for it to finish"""
+    job, accepted = verification_queue.submit(key, PRIORITY_INTERACTIVE, run, label)
+    position = verification_queue.position(job)
+    if not accepted:
+        state = "already running" if position == 0 else f"already queued (position {position})"
+        await interaction.followup.send(f"⏳ {label} is {state}. Results will be posted by that request.", ephemeral=True)
+        return None
+    if position > 0:
+        await interaction.followup.send(
+            f"⏳ Queued, position {position}. {verification_queue.running} scans are running; yours will start shortly.",
+            ephemeral=True
+        )
+    return await asyncio.shield(job.done)
+
+@tree.command(name="check", description="Check Roblox user and their friends for flagged groups")
+@app_commands.describe(
+    target="Roblox username to scan or Discord user with linked account",
+    all_friends=f"Scan every friend instead of the first {SCAN_MAX_FRIENDS}"
+)
+async def check(interaction: discord.Interaction, target: str, all_friends: bool = False):
+    await interaction.response.defer(thinking=True)
+    await run_queued(
+        interaction, ("check", target.lower(), all_friends),
+        lambda: run_check(interaction, target, all_friends), f"Check of `{target}`"
+    )
+
+async def run_check(interaction: discord.Interaction, target: str, all_friends: bool = False):
+    """Run /check once a queue worker picks it up"""
+    username = await resolve_scan_target(interaction, target)
+    if not username:
+        return
+    
+    user_id = await get_user_id(username)
+    if not user_id:
+        await interaction.followup.send(f"❌ Could not find Roblox user `{username}`.")
+        return
+
+    progress = await ScanProgress.start(
+        lambda content: interaction.followup.send(content, wait=True),
+        f"🔍 Scanning `{username}` and their friends for flagged groups"
+    )
+    max_friends = None if all_friends else SCAN_MAX_FRIENDS
+    scan = await scan_user(user_id, username, on_friend_result=progress.friend_done, max_friends=max_friends)
+    header = f"🔍 Scanned `{username}`{scan.validation_info()} and {scan.friends_label()} friends for flagged groups."
+    changes = scan.change_summary()
+    await progress.finish(f"{header}\n{changes}" if changes else header)
+    verification_history.record("check", scan.verdict(), username, scan, discord_id=mentioned_user_id(target))
+    
+    # Badge count requirement (at least 600 badges) and account age (at least 1 month old)
+    warnings = []
+    if scan.badges.status == BADGES_UNAVAILABLE:
+        if scan.badges.private:
+            warnings.append(f"⚠️ `{username}` has badges set to private.")
         else:
-            report.append(f"✅ **Local Group Check**: Clean")
-        
-        # Friend analysis summary
-        report.append(f"📱 **Friends**: {len(friends)} total")
-        
-        # Check a sample of friends with Mococo
-        if len(friends) > 0:
-            await interaction.followup.send("🔄 Checking friends with Mococo API (this may take a moment)...")
-            
-            friend_ids = [friend["id"] for friend in friends[:20]]  # Check first 20 friends
-            flagged_friends = []
-            
-            for friend_id in friend_ids:
-                friend_result = await check_user_with_mococo(session, friend_id)
-                if friend_result and friend_result.get("flagged"):
-                    # Get friend username
-                    id_to_username = await get_usernames_from_ids(session, [friend_id])
-                    friend_name = id_to_username.get(friend_id, f"User_{friend_id}")
-                    flagged_friends.append(friend_name)
-            
-            if flagged_friends:
-                report.append(f"🚨 **Flagged Friends**: {', '.join(flagged_friends)}")
-            else:
-                report.append(f"✅ **Friend Sample Check**: Clean (checked {len(friend_ids)} friends)")
-        
-        # Send the complete report
-        final_report = "\n".join(report)
-        
-        if len(final_report) > 1900:
-            chunks = [final_report[i:i+1900] for i in range(0, len(final_report), 1900)]
+            warnings.append(f"⚠️ Could not fetch badge count for `{username}`.")
+    elif scan.badges.status == BADGES_BELOW_THRESHOLD:
+        warnings.append(f"⚠️ `{username}` only has **{scan.badges.count}** badges (minimum {BADGE_THRESHOLD} required).")
+    if scan.user_info is None:
+        warnings.append(f"⚠️ Could not fetch account information for `{username}`.")
+    elif not scan.age_valid:
+        warnings.append(f"⚠️ `{username}` account age validation failed: {scan.age_message}")
+    
+    if warnings:
+        await interaction.followup.send("\n".join(warnings))
+    
+    if scan.mococo_flagged:
+        await interaction.followup.send(f"🚨 **Mococo Alert**: `{username}` flagged for suspicious content associations!")
+
+    # Local flagged groups for the main user, then friend hits (local groups + Mococo)
+    flagged = [f"⚠️ **{username}** is in flagged group: {name}" for name in scan.flagged_groups]
+    flagged.extend(scan.friend_issues)
+
+    mococo_note = ""
+    if scan.mococo_skipped:
+        mococo_note = f"\n⚠️ Mococo skipped (breaker open) for **{scan.mococo_skipped}** accounts; those were checked against local groups only."
+
+    if flagged:
+        # Add summary header
+        summary = f"🚨 **Found {len(flagged)} issues:**{mococo_note}\n\n"
+        message = summary + "\n".join(flagged)
+        if len(message) > 1900:
+            await interaction.followup.send(summary)
+            chunks = [("\n".join(flagged))[i:i+1800] for i in range(0, len("\n".join(flagged)), 1800)]
             for chunk in chunks:
                 await interaction.followup.send(chunk)
         else:
-            await interaction.followup.send(final_report)
+            await interaction.followup.send(message)
+    else:
+        await interaction.followup.send(f"✅ `{username}` and their friends are clean (checked local groups + Mococo database).{mococo_note}")
+
+@tree.command(name="deepcheck", description="Advanced check using Mococo API for suspicious content associations")
+@app_commands.describe(
+    target="Roblox username to scan or Discord user with linked account",
+    depth="Friend hops to explore (1 = direct friends only; 2-3 also check friends-of-friends)",
+    sample=f"Friends to check with the first/random strategies (default {DEEPCHECK_SAMPLE_SIZE})",
+    strategy=f"How friends are picked for checking (default {DEEPCHECK_SAMPLE_STRATEGY})"
+)
+@app_commands.choices(strategy=[
+    app_commands.Choice(name="First N friends", value=SAMPLE_FIRST),
+    app_commands.Choice(name="Random N friends", value=SAMPLE_RANDOM),
+    app_commands.Choice(name=f"All friends (up to {DEEPCHECK_TIME_BUDGET}s)", value=SAMPLE_ALL),
+])
+async def deepcheck(interaction: discord.Interaction, target: str, depth: app_commands.Range[int, 1, NETWORK_MAX_DEPTH] = 1,
+                    sample: app_commands.Range[int, 1, SCAN_MAX_FRIENDS or 1000] = DEEPCHECK_SAMPLE_SIZE, strategy: str = DEEPCHECK_SAMPLE_STRATEGY):
+    await interaction.response.defer(thinking=True)
+    await run_queued(interaction, ("deepcheck", target.lower(), depth, sample, strategy),
+                     lambda: run_deepcheck(interaction, target, depth, sample, strategy), f"Deep check of `{target}`")
+
+async def run_deepcheck(interaction: discord.Interaction, target: str, depth: int = 1,
+                        sample: int = DEEPCHECK_SAMPLE_SIZE, strategy: str = DEEPCHECK_SAMPLE_STRATEGY):
+    """Run /deepcheck once a queue worker picks it up"""
+    username = await resolve_scan_target(interaction, target)
+    if not username:
+        return
+    
+    user_id = await get_user_id(username)
+    if not user_id:
+        await interaction.followup.send(f"❌ Could not find Roblox user `{username}`.")
+        return
+
+    progress = await ScanProgress.start(
+        lambda content: interaction.followup.send(content, wait=True),
+        f"🔍 Running deep scan on `{username}` using Mococo API and local checks"
+    )
+
+    # Standard checks plus a Mococo check of a sample of friends; "all" and "random" read the
+    # whole friend list rather than stopping at SCAN_MAX_FRIENDS
+    if strategy == SAMPLE_ALL:
+        scan = await scan_user(user_id, username, friend_groups=False, on_friend_result=progress.friend_done,
+                               max_friends=None, sample_strategy=SAMPLE_ALL, time_budget=DEEPCHECK_TIME_BUDGET)
+    else:
+        scan = await scan_user(user_id, username, friend_sample=sample, friend_groups=False, on_friend_result=progress.friend_done,
+                               max_friends=None if strategy == SAMPLE_RANDOM else SCAN_MAX_FRIENDS, sample_strategy=strategy)
+    await progress.finish(f"🔍 Deep scan of `{username}` complete.")
+    verification_history.record("deepcheck", scan.verdict(), username, scan, discord_id=mentioned_user_id(target))
+    mococo_result = scan.mococo
+    badges = scan.badges
+    
+    # Build comprehensive report
+    report = [f"📊 **Deep Scan Report for `{username}`**\n"]
+    
+    # Mococo API results
+    if is_mococo_skipped(mococo_result):
+        report.append(f"⚠️ **Mococo Check**: Mococo skipped (breaker open)")
+    elif mococo_result:
+        if mococo_result.get("flagged"):
+            report.append(f"🚨 **MOCOCO ALERT**: User flagged for suspicious content associations")
+            if "reason" in mococo_result:
+                report.append(f"   Reason: {mococo_result['reason']}")
+            if "confidence" in mococo_result:
+                report.append(f"   Confidence: {mococo_result['confidence']}%")
+        else:
+            report.append(f"✅ **Mococo Check**: Clean (no suspicious associations found)")
+    else:
+        report.append(f"⚠️ **Mococo Check**: API unavailable")
+    
+    # Badge and account checks
+    if badges.status == BADGES_UNAVAILABLE:
+        if badges.private:
+            report.append(f"🔒 **Badge Count**: Private ({badges.count} visible)")
+        else:
+            report.append(f"⚠️ **Badge Count**: Unavailable")
+    elif badges.status == BADGES_BELOW_THRESHOLD:
+        report.append(f"⚠️ **Badge Count**: {badges.count} (below recommended {BADGE_THRESHOLD})")
+    else:
+        report.append(f"✅ **Badge Count**: {badges.display()}")
+    
+    # Account age check
+    if scan.user_info:
+        if scan.age_valid:
+            report.append(f"✅ **Account Age**: {scan.age_message}")
+        else:
+            report.append(f"⚠️ **Account Age**: {scan.age_message}")
+    
+    # Group checks (local flagged groups)
+    if scan.flagged_groups:
+        report.append(f"🚨 **Flagged Groups**: {', '.join(scan.flagged_groups)}")
+    else:
+        report.append(f"✅ **Local Group Check**: Clean")
+    
+    # Friend analysis summary
+    report.append(f"📱 **Friends**: {scan.friends_label()} fetched")
+    changes = scan.change_summary()
+    if changes:
+        report.append(changes)
+    
+    # Sampled friends checked with Mococo
+    if scan.friend_results:
+        sampled = len(scan.friend_results)
+        flagged_friends = [result.name for result in scan.flagged_friends]
+        skipped_friends = sum(1 for result in scan.friend_results if result.mococo_skipped)
+        
+        if flagged_friends:
+            report.append(f"🚨 **Flagged Friends**: {', '.join(flagged_friends)}")
+        elif skipped_friends == sampled:
+            report.append(f"⚠️ **Friend Sample Check**: Mococo skipped (breaker open)")
+        else:
+            report.append(f"✅ **Friend Sample Check**: Clean (checked {sampled - skipped_friends} friends, {scan.sample_strategy} strategy)")
+        if skipped_friends and skipped_friends < sampled:
+            report.append(f"⚠️ Mococo skipped (breaker open) for {skipped_friends} sampled friends")
+    if scan.budget_exhausted:
+        report.append(f"⏱️ **Time Budget**: Stopped after {DEEPCHECK_TIME_BUDGET}s with {len(scan.friend_results)} friends checked")
+    
+    # Optional friends-of-friends exploration
+    if depth > 1 and scan.friends:
+        await interaction.followup.send(f"🕸️ Exploring `{username}`'s friend network to depth {depth}...")
+        with tracer.span("explore_friend_network", depth=depth):
+            exploration = await explore_friend_network(user_id, username, depth, root_friends=scan.friends)
+        report.extend(render_network_report(exploration))
+    
+    # Send the complete report
+    final_report = "\n".join(report)
+    
+    if len(final_report) > 1900:
+        chunks = [final_report[i:i+1900] for i in range(0, len(final_report), 1900)]
+        for chunk in chunks:
+            await interaction.followup.send(chunk)
+    else:
+        await interaction.followup.send(final_report)
+
+# Discord outbound dispatcher configuration
+DISCORD_CHANNEL_RATE = (1, 1)  # Sends/second and concurrent sends per channel (Discord allows about 5 per 5s)
+DIGEST_MAX_CHARS = 1900  # Merged digest messages stay under Discord's 2000 character limit
+DIGEST_BACKLOG = 3  # Queued sends before a channel counts as backlogged
+
+@dataclass
+class OutboundMessage:
+    content: str
+    kwargs: dict
+    digest: bool
+    future: asyncio.Future
+
+class OutboundDispatcher:
+    """Per-channel FIFO queue for the bot's outgoing channel messages.
+
+    Each channel is drained by one task paced by its own HostLimiter, so
+    bursts of auto-checks arrive in order instead of racing into Discord's
+    rate limits. Consecutive messages sent with `digest=True` that pile up
+    behind each other are merged into one digest message; a digest never
+    reaches past a regular message, so channel order is kept.
+    """
+
+    def __init__(self):
+        self.queues = {}  # channel ID -> deque of OutboundMessage
+        self.workers = {}  # channel ID -> drain task
+        self.limiters = {}  # channel ID -> HostLimiter
+        self.requested = 0
+        self.api_calls = 0
+        self.digests = 0
+        self.digested = 0
+        self.failed = 0
+
+    def _enqueue(self, channel, content, digest, kwargs):
+        future = asyncio.get_running_loop().create_future()
+        self.queues.setdefault(channel.id, deque()).append(OutboundMessage(content, kwargs, digest, future))
+        self.requested += 1
+        if channel.id not in self.workers:
+            self.workers[channel.id] = asyncio.create_task(self._drain(channel))
+        return future
+
+    async def send(self, channel, content=None, digest=False, **kwargs):
+        """Queue a message and wait until it is sent. Returns the discord.Message."""
+        return await self._enqueue(channel, content, digest, kwargs)
+
+    def post(self, channel, content=None, digest=False, **kwargs):
+        """Queue a message without waiting; failures are logged"""
+        self._enqueue(channel, content, digest, kwargs).add_done_callback(self._log_failure)
+
+    @staticmethod
+    def _log_failure(future):
+        if not future.cancelled() and future.exception():
+            print(f"❌ Failed to send queued message: {future.exception()}")
+
+    def backlog(self, channel):
+        return len(self.queues.get(channel.id, ()))
+
+    def backlogged(self, channel):
+        return self.backlog(channel) >= DIGEST_BACKLOG
+
+    def _take_batch(self, queue):
+        """Pop the next message, plus the digest messages directly behind it that fit alongside it"""
+        first = queue.popleft()
+        batch = [first]
+        # Only plain text can be merged; embeds and other extras go out on their own
+        if not first.digest or first.kwargs or not first.content:
+            return batch
+        length = len(first.content)
+        while queue:
+            item = queue[0]
+            if (not item.digest or item.kwargs or not item.content
+                    or length + len(item.content) + 2 > DIGEST_MAX_CHARS):
+                break
+            batch.append(queue.popleft())
+            length += len(item.content) + 2
+        return batch
+
+    @staticmethod
+    def _resolve(batch, message=None, error=None):
+        """Settle every caller's future; callers that gave up already have a done future"""
+        for item in batch:
+            if item.future.done():
+                continue
+            if error is not None:
+                item.future.set_exception(error)
+            else:
+                item.future.set_result(message)
+
+    async def _drain(self, channel):
+        queue = self.queues[channel.id]
+        limiter = self.limiters.get(channel.id)
+        if limiter is None:
+            # Discord publishes its per-channel limit, so there is nothing to probe for
+            limiter = HostLimiter(f"#{channel}", *DISCORD_CHANNEL_RATE, probe_factor=1)
+            self.limiters[channel.id] = limiter
+        try:
+            while queue:
+                batch = self._take_batch(queue)
+                content = batch[0].content
+                if len(batch) > 1:
+                    content = "\n\n".join(item.content for item in batch)
+                    content = f"📋 **Verification digest** ({len(batch)} results)\n\n{content}"
+                    self.digests += 1
+                    self.digested += len(batch)
+                
+                await limiter.acquire()
+                status = None
+                retry_after = None
+                send_start = time.monotonic()
+                try:
+                    message = await channel.send(content=content, **batch[0].kwargs)
+                    status = 200
+                except discord.HTTPException as e:
+                    status = e.status
+                    retry_after = getattr(e, "retry_after", None)
+                    self.failed += 1
+                    self._resolve(batch, error=e)
+                except Exception as e:
+                    # A bad message fails only its own callers; the channel keeps draining
+                    self.failed += 1
+                    self._resolve(batch, error=e)
+                except BaseException:
+                    for item in batch:
+                        item.future.cancel()
+                    raise
+                else:
+                    self._resolve(batch, message)
+                finally:
+                    self.api_calls += 1
+                    discord_send_latency.observe(time.monotonic() - send_start)
+                    discord_sends.inc(status=str(status))
+                    await limiter.release(status, retry_after)
+        finally:
+            del self.workers[channel.id]
+            if not queue:
+                del self.queues[channel.id]
+
+    async def stop(self):
+        for worker in list(self.workers.values()):
+            worker.cancel()
+        await asyncio.gather(*self.workers.values(), return_exceptions=True)
+        for queue in self.queues.values():
+            for item in queue:
+                item.future.cancel()
+        self.queues.clear()
+
+    def saved_ratio(self):
+        """Fraction of requested sends that digests saved"""
+        if not self.requested:
+            return 0.0
+        return 1 - self.api_calls / self.requested
+
+outbound_dispatcher = OutboundDispatcher()
 
 # Auto-check configuration
 AUTO_CHECK_ROLE_NAME = "Bloxlink Verified"  # Change this to match your Bloxlink verification role
@@ -679,190 +3305,523 @@ ENABLE_AUTO_CHECK = True  # Set to False to disable auto-checking
 FLAGGED_ROLE_NAME = "Flagged"  # Role given to users who fail verification standards
 PERMS_ROLE_NAME = "perms"  # Role for administrators who can access flagged channels
 
-async def auto_check_user(member, roblox_username, channel, test_mode=False, interaction=None):
-    """Automatically run check command on a newly verified user"""
-    try:
-        print(f"🔄 Auto-checking {member.display_name} ({roblox_username})")
+VERDICT_PASS = "pass"
+VERDICT_FAIL = "fail"
+VERDICT_PRIVACY = "privacy"  # Badges or profile hidden; no role change
+VERDICT_ERROR = "error"  # User not found or the scan failed
+
+# Verification history configuration
+HISTORY_DB = "verification_history.db"
+HISTORY_FLUSH_INTERVAL = 2  # Seconds between batched inserts
+HISTORY_DETAIL_DAYS = 30  # Older records drop their issue lists and keep only summary counts
+HISTORY_ROLLUP_DAYS = 180  # Older repeats of the same verdict for an account are merged into one record
+HISTORY_MAINTENANCE_INTERVAL = 6 * 3600  # Seconds between detail pruning and rollup passes
+HISTORY_DETAIL_LIMIT = 50  # Issues kept per record
+
+VERDICT_EMOJI = {VERDICT_PASS: "✅", VERDICT_FAIL: "❌", VERDICT_PRIVACY: "🔒", VERDICT_ERROR: "⚠️"}
+
+class VerificationHistory:
+    """SQLite log of every verdict from /check, /deepcheck and auto-checks.
+
+    Records are indexed by Discord ID, Roblox ID, username and time, so
+    /history is a single index lookup. Like DiskCache, inserts are queued in memory and
+    written in batches from a worker thread. Over time records lose their
+    issue lists (HISTORY_DETAIL_DAYS) and then consecutive records with the
+    same verdict for an account are merged (HISTORY_ROLLUP_DAYS), so the
+    history keeps what changed without growing with every re-check.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.conn = None
+        self.lock = threading.Lock()
+        self.pending = []
+        self.task = None
+        self.recorded = 0
+        self.details_pruned = 0
+        self.rolled_up = 0
+
+    def _connect(self):
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS history ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, checked_at REAL NOT NULL, "
+                "discord_id INTEGER, roblox_id INTEGER, username TEXT, "
+                "command TEXT NOT NULL, verdict TEXT NOT NULL, policy_version INTEGER, "
+                "summary TEXT NOT NULL, detail TEXT, "
+                "repeats INTEGER NOT NULL DEFAULT 0, last_checked_at REAL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS history_discord ON history (discord_id, checked_at)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS history_roblox ON history (roblox_id, checked_at)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS history_username ON history (username COLLATE NOCASE, checked_at)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS history_time ON history (checked_at)")
+            self.conn.commit()
+        return self.conn
+
+    def record(self, command, verdict, username, scan=None, discord_id=None):
+        """Queue one verdict; `scan` (a ScanResult) supplies the summary and issue details"""
+        verdicts.inc(command=command, verdict=verdict)
+        summary = {}
+        detail = None
+        roblox_id = None
+        policy_version = policy_store.snapshot.version
+        if scan is not None:
+            scan_duration.observe(scan.duration, command=command)
+            roblox_id = scan.user_id
+            policy_version = scan.policy_version
+            summary = {
+                "badges": scan.badges.count,
+                "badge_status": scan.badges.status,
+                "age_valid": scan.age_valid,
+                "mococo_flagged": scan.mococo_flagged,
+                "flagged_groups": len(scan.flagged_groups),
+                "friends": len(scan.friends),
+                "friends_checked": len(scan.friend_results),
+                "flagged_friends": len(scan.flagged_friends),
+                "mococo_skipped": scan.mococo_skipped,
+                "added_friends": len(scan.added_friends or []),
+                "removed_friends": len(scan.removed_friends or []),
+                "seconds": round(scan.duration, 2),
+            }
+            detail = {
+                "flagged_groups": scan.flagged_groups,
+                "friend_issues": scan.friend_issues[:HISTORY_DETAIL_LIMIT],
+                "added_friends": [name for _, name in (scan.added_friends or [])][:HISTORY_DETAIL_LIMIT],
+                "removed_friends": [name for _, name in (scan.removed_friends or [])][:HISTORY_DETAIL_LIMIT],
+            }
+        self.pending.append((
+            time.time(), discord_id, roblox_id, username, command, verdict, policy_version,
+            json.dumps(summary), json.dumps(detail) if detail is not None else None
+        ))
+
+    async def flush(self):
+        if not self.pending:
+            return
+        batch = self.pending
+        self.pending = []
+        try:
+            await asyncio.to_thread(self._write, batch)
+        except Exception as e:
+            print(f"⚠️ Error writing verification history: {e}")
+
+    def _write(self, batch):
+        with self.lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT INTO history (checked_at, discord_id, roblox_id, username, command, verdict, policy_version, summary, detail) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                batch
+            )
+            conn.commit()
+        self.recorded += len(batch)
+
+    def _row(self, row):
+        keys = ("id", "checked_at", "discord_id", "roblox_id", "username", "command", "verdict",
+                "policy_version", "summary", "detail", "repeats", "last_checked_at")
+        record = dict(zip(keys, row))
+        record["summary"] = json.loads(record["summary"])
+        record["detail"] = json.loads(record["detail"]) if record["detail"] else None
+        return record
+
+    def _where(self, discord_id, roblox_id, username=None):
+        """WHERE clause matching any given key (each has its own index), or no clause for everything"""
+        filters = []
+        params = []
+        if discord_id is not None:
+            filters.append("discord_id = ?")
+            params.append(discord_id)
+        if roblox_id is not None:
+            filters.append("roblox_id = ?")
+            params.append(roblox_id)
+        if username is not None:
+            # Checks that failed before the account was resolved only stored the username
+            filters.append("username = ? COLLATE NOCASE")
+            params.append(username)
+        return (f"WHERE {' OR '.join(filters)}" if filters else ""), params
+
+    def _read(self, discord_id, roblox_id, username, limit):
+        where, params = self._where(discord_id, roblox_id, username)
+        with self.lock:
+            rows = self._connect().execute(
+                f"SELECT * FROM history {where} ORDER BY checked_at DESC LIMIT ?", [*params, limit]
+            ).fetchall()
+        return [self._row(row) for row in rows]
+
+    async def query(self, discord_id=None, roblox_id=None, limit=10, username=None):
+        """Newest records for a Discord member and/or Roblox account, newest first"""
+        await self.flush()
+        return await asyncio.to_thread(self._read, discord_id, roblox_id, username, limit)
+
+    def _export(self, path, discord_id, roblox_id, username):
+        where, params = self._where(discord_id, roblox_id, username)
+        exported = 0
+        with self.lock:
+            cursor = self._connect().execute(f"SELECT * FROM history {where} ORDER BY checked_at", params)
+            with open(path, 'w') as f:
+                for row in cursor:
+                    f.write(json.dumps(self._row(row)) + "\n")
+                    exported += 1
+        return exported
+
+    async def export(self, path, discord_id=None, roblox_id=None, username=None):
+        """Write matching records (all records if no filter) to `path` as JSONL, oldest first"""
+        await self.flush()
+        return await asyncio.to_thread(self._export, path, discord_id, roblox_id, username)
+
+    def _maintain(self):
+        now = time.time()
+        with self.lock:
+            conn = self._connect()
+            pruned = conn.execute(
+                "UPDATE history SET detail = NULL WHERE detail IS NOT NULL AND checked_at < ?",
+                (now - HISTORY_DETAIL_DAYS * 86400,)
+            ).rowcount
+            # Merge runs of the same verdict into their first record
+            rows = conn.execute(
+                "SELECT id, roblox_id, verdict, checked_at, repeats, last_checked_at FROM history "
+                "WHERE roblox_id IS NOT NULL AND checked_at < ? ORDER BY roblox_id, checked_at",
+                (now - HISTORY_ROLLUP_DAYS * 86400,)
+            ).fetchall()
+            merged = []
+            keep = None
+            for row_id, roblox_id, verdict, checked_at, repeats, last_checked_at in rows:
+                if keep and keep["roblox_id"] == roblox_id and keep["verdict"] == verdict:
+                    keep["repeats"] += repeats + 1
+                    keep["last_checked_at"] = last_checked_at or checked_at
+                    keep["changed"] = True
+                    merged.append((row_id,))
+                else:
+                    if keep and keep["changed"]:
+                        conn.execute("UPDATE history SET repeats = ?, last_checked_at = ? WHERE id = ?",
+                                     (keep["repeats"], keep["last_checked_at"], keep["id"]))
+                    keep = {"id": row_id, "roblox_id": roblox_id, "verdict": verdict, "repeats": repeats,
+                            "last_checked_at": last_checked_at, "changed": False}
+            if keep and keep["changed"]:
+                conn.execute("UPDATE history SET repeats = ?, last_checked_at = ? WHERE id = ?",
+                             (keep["repeats"], keep["last_checked_at"], keep["id"]))
+            conn.executemany("DELETE FROM history WHERE id = ?", merged)
+            conn.commit()
+        self.details_pruned += pruned
+        self.rolled_up += len(merged)
+        if pruned or merged:
+            print(f"🗜️ Summarized verification history: {pruned} details pruned, {len(merged)} records merged")
+
+    async def _run(self):
+        last_maintenance = 0.0
+        while True:
+            await asyncio.sleep(HISTORY_FLUSH_INTERVAL)
+            await self.flush()
+            if time.monotonic() - last_maintenance >= HISTORY_MAINTENANCE_INTERVAL:
+                last_maintenance = time.monotonic()
+                try:
+                    await asyncio.to_thread(self._maintain)
+                except Exception as e:
+                    print(f"⚠️ Error summarizing verification history: {e}")
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        await self.flush()
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+verification_history = VerificationHistory(HISTORY_DB)
+
+# Policy store configuration
+POLICY_FILE = "policy.json"
+POLICY_CONFIG_DEFAULTS = {
+    "auto_check_channel_id": AUTO_CHECK_CHANNEL_ID,
+    "privacy_issue_channel_id": PRIVACY_ISSUE_CHANNEL_ID,
+    "enable_auto_check": ENABLE_AUTO_CHECK,
+    "auto_check_role_name": AUTO_CHECK_ROLE_NAME,
+    "flagged_role_name": FLAGGED_ROLE_NAME,
+}
+
+@dataclass(frozen=True)
+class PolicySnapshot:
+    """One immutable version of the moderation policy; changes build a new snapshot"""
+    version: int
+    flagged_groups: frozenset
+    whitelist: frozenset
+    group_info: dict  # Group ID -> {"name", "added_at", "added_by"}; never mutated in place
+    config: dict  # POLICY_CONFIG_DEFAULTS keys -> values; never mutated in place
+    groups_version: int = 0  # Bumped only when flagged_groups changes, so cached scan results survive other edits
+
+class PolicyStore:
+    """Versioned flagged groups, whitelist and auto-check config persisted to POLICY_FILE.
+
+    Every change builds a new PolicySnapshot with a bumped version, writes it
+    atomically (temp file + rename) and rebinds the module-level names such as
+    FLAGGED_GROUP_IDS, so lookups stay O(1) set checks and a scan can keep the
+    snapshot it started with. Cached scan results are keyed on groups_version,
+    which only changes with the flagged group set.
+    """
+
+    def __init__(self, path, flagged_groups, whitelist, config):
+        self.path = path
+        group_info = {gid: {"name": None, "added_at": None, "added_by": "built-in"} for gid in flagged_groups}
+        self.snapshot = PolicySnapshot(0, frozenset(group_info), frozenset(whitelist), group_info, dict(config))
+
+    def load(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, 'r') as f:
+                    data = json.load(f)
+                group_info = {int(gid): info for gid, info in data.get("flagged_groups", {}).items()}
+                self.snapshot = PolicySnapshot(
+                    data.get("version", 0),
+                    frozenset(group_info),
+                    frozenset(data.get("whitelist", [])),
+                    group_info,
+                    {**POLICY_CONFIG_DEFAULTS, **data.get("config", {})},
+                    data.get("groups_version", data.get("version", 0))
+                )
+                print(f"✅ Loaded policy v{self.snapshot.version} ({len(group_info)} flagged groups)")
+            except Exception as e:
+                print(f"⚠️ Error loading policy, using built-in defaults: {e}")
+        apply_policy(self.snapshot)
+
+    def _write(self, snapshot):
+        data = {
+            "version": snapshot.version,
+            "groups_version": snapshot.groups_version,
+            "flagged_groups": {str(gid): info for gid, info in snapshot.group_info.items()},
+            "whitelist": sorted(snapshot.whitelist),
+            "config": snapshot.config,
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def _commit(self, group_info=None, whitelist=None, config=None):
+        current = self.snapshot
+        group_info = current.group_info if group_info is None else group_info
+        flagged_groups = frozenset(group_info)
+        snapshot = PolicySnapshot(
+            current.version + 1,
+            flagged_groups,
+            current.whitelist if whitelist is None else frozenset(whitelist),
+            group_info,
+            current.config if config is None else config,
+            current.groups_version + (flagged_groups != current.flagged_groups)
+        )
+        # Persist first so memory never runs ahead of disk
+        self._write(snapshot)
+        self.snapshot = snapshot
+        apply_policy(snapshot)
+        print(f"📜 Policy updated to v{snapshot.version}")
+        return snapshot
+
+    def add_group(self, group_id, name, added_by):
+        info = {"name": name, "added_at": datetime.now().isoformat(timespec="seconds"), "added_by": added_by}
+        return self._commit(group_info={**self.snapshot.group_info, group_id: info})
+
+    def remove_group(self, group_id):
+        return self._commit(group_info={gid: info for gid, info in self.snapshot.group_info.items() if gid != group_id})
+
+    def add_whitelist(self, user_id):
+        return self._commit(whitelist=self.snapshot.whitelist | {user_id})
+
+    def remove_whitelist(self, user_id):
+        return self._commit(whitelist=self.snapshot.whitelist - {user_id})
+
+    def update_config(self, **values):
+        unknown = set(values) - set(POLICY_CONFIG_DEFAULTS)
+        if unknown:
+            raise KeyError(f"Unknown policy config keys: {', '.join(sorted(unknown))}")
+        return self._commit(config={**self.snapshot.config, **values})
+
+def apply_policy(snapshot):
+    """Point the module-level policy names at a snapshot"""
+    global FLAGGED_GROUP_IDS, WHITELIST, AUTO_CHECK_CHANNEL_ID, PRIVACY_ISSUE_CHANNEL_ID, ENABLE_AUTO_CHECK, AUTO_CHECK_ROLE_NAME, FLAGGED_ROLE_NAME
+    FLAGGED_GROUP_IDS = snapshot.flagged_groups
+    WHITELIST = snapshot.whitelist
+    AUTO_CHECK_CHANNEL_ID = snapshot.config["auto_check_channel_id"]
+    PRIVACY_ISSUE_CHANNEL_ID = snapshot.config["privacy_issue_channel_id"]
+    ENABLE_AUTO_CHECK = snapshot.config["enable_auto_check"]
+    AUTO_CHECK_ROLE_NAME = snapshot.config["auto_check_role_name"]
+    FLAGGED_ROLE_NAME = snapshot.config["flagged_role_name"]
+
+policy_store = PolicyStore(POLICY_FILE, FLAGGED_GROUP_IDS, WHITELIST, POLICY_CONFIG_DEFAULTS)
+
+async def auto_check_user(member, roblox_username, channel, test_mode=False, interaction=None, recheck=False):
+    """Automatically run check command on a newly verified user.
+
+    With recheck=True (background re-verification of an already verified
+    member) nothing is posted unless the member now fails. Returns
+    (verdict, scan); scan is None if the user could not be scanned.
+    """
+    tracer.tag(command="reverify" if recheck else "testcheck" if test_mode else "auto_check", user=roblox_username)
+    try:
+        print(f"🔄 {'Re-verifying' if recheck else 'Auto-checking'} {member.display_name} ({roblox_username})")
+        
+        user_id = await get_user_id(roblox_username)
+        if not user_id:
+            if not recheck:
+                outbound_dispatcher.post(channel, f"⚠️ Auto-check failed: Could not find Roblox user `{roblox_username}` for {member.mention}", digest=True)
+            verification_history.record("reverify" if recheck else "auto_check", VERDICT_ERROR, roblox_username, discord_id=member.id)
+            return VERDICT_ERROR, None
+
+        # Run the same scan as the main /check command, reporting progress in one message.
+        # A backlogged channel skips the progress message; the digest summary covers it.
+        prefix = "🧪 **Test Mode** - " if test_mode else ""
+        title = f"{prefix}🤖 **Auto-Check Triggered** for {member.mention}\n🔍 Scanning `{roblox_username}`"
+        if recheck or outbound_dispatcher.backlogged(channel):
+            progress = ScanProgress(None, title)
+        else:
+            progress = await ScanProgress.start(lambda content: outbound_dispatcher.send(channel, content), title)
+        scan = await scan_user(user_id, roblox_username, on_friend_result=progress.friend_done)
+        header = (f"{prefix}🤖 **Auto-Check Triggered** for {member.mention}\n"
+                  f"🔍 Scanned `{roblox_username}`{scan.validation_info()} and {scan.friends_label()} friends.")
+        changes = scan.change_summary()
+        await progress.finish(f"{header}\n{changes}" if changes else header)
+        badges = scan.badges
+        
+        # Track issues
+        verification_failed = False
+        privacy_issues = []
+        standard_issues = []
+        
+        # Badge check
+        if badges.status == BADGES_UNAVAILABLE:
+            if badges.private:
+                privacy_issues.append(f"⚠️ `{roblox_username}` has badges set to private")
+            else:
+                privacy_issues.append(f"⚠️ Could not fetch badge count for `{roblox_username}`")
+        elif badges.status == BADGES_BELOW_THRESHOLD:
+            standard_issues.append(f"⚠️ `{roblox_username}` only has **{badges.count}** badges (minimum {BADGE_THRESHOLD} required)")
+            verification_failed = True
+        
+        # Age check
+        if scan.user_info is None:
+            privacy_issues.append(f"⚠️ Could not fetch account information for `{roblox_username}`")
+        elif not scan.age_valid:
+            standard_issues.append(f"⚠️ `{roblox_username}` account age validation failed: {scan.age_message}")
+            verification_failed = True
+
+        if scan.mococo_flagged:
+            outbound_dispatcher.post(channel, f"🚨 **MOCOCO ALERT**: `{roblox_username}` flagged for suspicious content associations!")
+            verification_failed = True
         
-        async with aiohttp.ClientSession() as session:
-            user_id = await get_user_id(session, roblox_username)
-            if not user_id:
-                await channel.send(f"⚠️ Auto-check failed: Could not find Roblox user `{roblox_username}` for {member.mention}")
-                return
+        # Main user groups, then flagged friends
+        flagged_content = [f"⚠️ **{roblox_username}** is in flagged group: {name}" for name in scan.flagged_groups]
+        flagged_content.extend(scan.friend_issues)
+        if flagged_content:
+            verification_failed = True
 
-            # Run the same checks as the main /check command
-            badge_count = await get_user_badges_count(user_id)
-            user_info = await get_user_info(user_id)
-            friends = await get_all_friends(session, user_id, max_friends=200)
-            
-            # Build validation info and track issues
-            validation_info = ""
-            verification_failed = False
-            privacy_issues = []
-            standard_issues = []
+        mococo_note = ""
+        if scan.mococo_skipped:
+            mococo_note = f"\n⚠️ Mococo skipped (breaker open) for **{scan.mococo_skipped}** accounts; local group checks only."
+
+        verdict = scan.verdict()
+        command = "reverify" if recheck else "testcheck" if test_mode else "auto_check"
+        verification_history.record(command, verdict, roblox_username, scan, discord_id=member.id)
+
+        # Determine verification outcome and assign roles
+        if recheck and verdict != VERDICT_FAIL:
+            # Still fine (or temporarily private); an already verified member keeps their role quietly
+            pass
+        elif privacy_issues and not test_mode:
+            # Privacy issues - don't assign any role, prompt to make info public
+            # Use privacy issue channel if configured, otherwise use main channel
+            privacy_channel = None
+            if PRIVACY_ISSUE_CHANNEL_ID:
+                privacy_channel = bot.get_channel(PRIVACY_ISSUE_CHANNEL_ID)
             
-            # Badge check
-            if badge_count is None:
-                privacy_issues.append(f"⚠️ Could not fetch badge count for `{roblox_username}`")
-            elif badge_count == 0:
-                privacy_issues.append(f"⚠️ `{roblox_username}` has badges set to private")
-            elif badge_count < 600:
-                standard_issues.append(f"⚠️ `{roblox_username}` only has **{badge_count}** badges (minimum 600 required)")
-                verification_failed = True
+            if not privacy_channel:
+                privacy_channel = channel
             
-            if badge_count is not None:
-                validation_info += f" (Badges: {badge_count})"
+            privacy_message = (
+                f"🔒 **Privacy Issue Detected** for {member.mention}\n\n"
+                f"The following information needs to be made public:\n" + 
+                "\n".join(privacy_issues) + 
+                f"\n\n📋 **Next Steps:**\n"
+                f"1. Make your Roblox profile information public (badges, games, etc.)\n"
+                f"2. Press the **Bloxlink verify button** to verify again\n"
+                f"3. Contact staff if you need help with privacy settings"
+            )
             
-            # Age check
-            if user_info is None:
-                privacy_issues.append(f"⚠️ Could not fetch account information for `{roblox_username}`")
+            # Try to send as ephemeral if we have an interaction, otherwise use channel
+            if interaction:
+                try:
+                    await interaction.followup.send(privacy_message, ephemeral=True)
+                except Exception as e:
+                    print(f"Failed to send ephemeral message: {e}")
+                    outbound_dispatcher.post(privacy_channel, privacy_message, digest=True)
             else:
-                age_valid, age_message = await check_account_age(user_info)
-                validation_info += f" ({age_message})"
-                if not age_valid:
-                    standard_issues.append(f"⚠️ `{roblox_username}` account age validation failed: {age_message}")
-                    verification_failed = True
-
-            # Send initial message
-            prefix = "🧪 **Test Mode** - " if test_mode else ""
-            await channel.send(f"{prefix}🤖 **Auto-Check Triggered** for {member.mention}\n"
-                             f"🔍 Scanning `{roblox_username}`{validation_info} and **{len(friends)}** friends...")
-            
-            # Quick Mococo check
-            mococo_result = await check_user_with_mococo(session, user_id)
-            if mococo_result and mococo_result.get("flagged"):
-                await channel.send(f"🚨 **MOCOCO ALERT**: `{roblox_username}` flagged for suspicious content associations!")
-                verification_failed = True
-            
-            # Get friend usernames
-            friend_ids = [friend["id"] for friend in friends if friend["id"] != -1]
-            id_to_username = await get_usernames_from_ids(session, friend_ids)
-
-            flagged_content = []
-            
-            # Check main user groups
-            user_groups = await get_user_groups(session, user_id)
-            for gid in user_groups:
-                if gid in FLAGGED_GROUP_IDS:
-                    name = await get_group_name(session, gid)
-                    flagged_content.append(f"⚠️ **{roblox_username}** is in flagged group: {name}")
-                    verification_failed = True
-
-            # Enhanced friend checking
-            sem = asyncio.Semaphore(3)  # Lower limit for auto-checks to be more gentle
-
-            async def enhanced_friend_check(friend):
-                async with sem:
-                    friend_id = friend["id"]
-                    if friend_id == -1:
-                        return None
-                    
-                    friend_name = id_to_username.get(friend_id, f"User_{friend_id}")
-                    results = []
-                    
-                    # Check local flagged groups
-                    local_result = await check_friend_groups(session, friend_name, friend_id)
-                    if local_result:
-                        results.append(local_result)
-                    
-                    # Check with Mococo API
-                    mococo_friend_result = await check_user_with_mococo(session, friend_id)
-                    if mococo_friend_result and mococo_friend_result.get("flagged"):
-                        results.append(f"🚨 **Friend {friend_name}** flagged by Mococo for suspicious content!")
-                    
-                    return results if results else None
-
-            # Check friends
-            tasks = [enhanced_friend_check(friend) for friend in friends]
-            results = await asyncio.gather(*tasks)
-
-            # Collect flagged friend results
-            for result_set in results:
-                if result_set:
-                    flagged_content.extend(result_set)
-                    verification_failed = True
-
-            # Determine verification outcome and assign roles
-            if privacy_issues and not test_mode:
-                # Privacy issues - don't assign any role, prompt to make info public
-                # Use privacy issue channel if configured, otherwise use main channel
-                privacy_channel = None
-                if PRIVACY_ISSUE_CHANNEL_ID:
-                    privacy_channel = bot.get_channel(PRIVACY_ISSUE_CHANNEL_ID)
-                
-                if not privacy_channel:
-                    privacy_channel = channel
-                
-                privacy_message = (
-                    f"🔒 **Privacy Issue Detected** for {member.mention}\n\n"
-                    f"The following information needs to be made public:\n" + 
-                    "\n".join(privacy_issues) + 
-                    f"\n\n📋 **Next Steps:**\n"
-                    f"1. Make your Roblox profile information public (badges, games, etc.)\n"
-                    f"2. Press the **Bloxlink verify button** to verify again\n"
-                    f"3. Contact staff if you need help with privacy settings"
-                )
+                outbound_dispatcher.post(privacy_channel, privacy_message, digest=True)
                 
-                # Try to send as ephemeral if we have an interaction, otherwise use channel
-                if interaction:
-                    try:
-                        await interaction.followup.send(privacy_message, ephemeral=True)
-                    except Exception as e:
-                        print(f"Failed to send ephemeral message: {e}")
-                        await privacy_channel.send(privacy_message)
-                else:
-                    await privacy_channel.send(privacy_message)
-                    
-            elif verification_failed and not test_mode:
-                # Failed verification - remove verified role, assign Flagged role and create private channel
-                role_actions = []
+        elif verification_failed and not test_mode:
+            # Failed verification - remove verified role, assign Flagged role and create private channel
+            role_actions = []
+            
+            try:
+                # Remove the verified role
+                verified_role = discord.utils.get(member.guild.roles, name=AUTO_CHECK_ROLE_NAME)
+                if verified_role and verified_role in member.roles:
+                    await member.remove_roles(verified_role, reason="Auto-verification failed")
+                    role_actions.append(f"🔻 Removed **{AUTO_CHECK_ROLE_NAME}** role")
                 
-                try:
-                    # Remove the verified role
-                    verified_role = discord.utils.get(member.guild.roles, name=AUTO_CHECK_ROLE_NAME)
-                    if verified_role and verified_role in member.roles:
-                        await member.remove_roles(verified_role, reason="Auto-verification failed")
-                        role_actions.append(f"🔻 Removed **{AUTO_CHECK_ROLE_NAME}** role")
+                # Add the flagged role
+                flagged_role = discord.utils.get(member.guild.roles, name=FLAGGED_ROLE_NAME)
+                if flagged_role:
+                    await member.add_roles(flagged_role, reason="Auto-verification failed")
+                    role_actions.append(f"🔺 Assigned **{FLAGGED_ROLE_NAME}** role")
                     
-                    # Add the flagged role
-                    flagged_role = discord.utils.get(member.guild.roles, name=FLAGGED_ROLE_NAME)
-                    if flagged_role:
-                        await member.add_roles(flagged_role, reason="Auto-verification failed")
-                        role_actions.append(f"🔺 Assigned **{FLAGGED_ROLE_NAME}** role")
-                        
-                        # Create private channel for the flagged user
-                        flagged_channel = await create_flagged_channel(member, standard_issues + flagged_content)
-                        if flagged_channel:
-                            role_actions.append(f"📨 Created appeal channel {flagged_channel.mention}")
-                        else:
-                            role_actions.append("⚠️ Failed to create appeal channel")
+                    # Create private channel for the flagged user
+                    flagged_channel = await create_flagged_channel(member, standard_issues + flagged_content)
+                    if flagged_channel:
+                        role_actions.append(f"📨 Created appeal channel {flagged_channel.mention}")
                     else:
-                        role_actions.append(f"⚠️ **{FLAGGED_ROLE_NAME}** role not found in server")
-                        
-                except Exception as e:
-                    role_actions.append(f"❌ Failed to update roles: {str(e)}")
-                
-                # Send detailed failure report
-                all_issues = standard_issues + flagged_content
-                role_status = "\n".join(role_actions)
-                summary = f"❌ **Verification FAILED** for {member.mention}\n{role_status}\n\n"
-                summary += f"**Issues Found ({len(all_issues)}):**\n" + "\n".join(all_issues)
-                
-                if len(summary) > 1900:
-                    await channel.send(f"❌ **Verification FAILED** for {member.mention}\n{role_status}")
-                    chunks = [all_issues[i:i+10] for i in range(0, len(all_issues), 10)]
-                    for i, chunk in enumerate(chunks):
-                        await channel.send(f"**Issues ({i+1}/{len(chunks)}):**\n" + "\n".join(chunk))
+                        role_actions.append("⚠️ Failed to create appeal channel")
                 else:
-                    await channel.send(summary)
+                    role_actions.append(f"⚠️ **{FLAGGED_ROLE_NAME}** role not found in server")
+                    
+            except Exception as e:
+                role_actions.append(f"❌ Failed to update roles: {str(e)}")
+            
+            # Send detailed failure report
+            all_issues = standard_issues + flagged_content
+            role_status = "\n".join(role_actions)
+            failed_title = "Re-verification FAILED" if recheck else "Verification FAILED"
+            summary = f"❌ **{failed_title}** for {member.mention}\n{role_status}{mococo_note}\n\n"
+            summary += f"**Issues Found ({len(all_issues)}):**\n" + "\n".join(all_issues)
+            
+            if len(summary) > 1900:
+                outbound_dispatcher.post(channel, f"❌ **{failed_title}** for {member.mention}\n{role_status}{mococo_note}")
+                chunks = [all_issues[i:i+10] for i in range(0, len(all_issues), 10)]
+                for i, chunk in enumerate(chunks):
+                    outbound_dispatcher.post(channel, f"**Issues ({i+1}/{len(chunks)}):**\n" + "\n".join(chunk))
             else:
-                # Passed verification - user keeps their verified role
-                await channel.send(f"✅ **Verification PASSED** for {member.mention}\n"
-                                 f"`{roblox_username}` and their friends meet all requirements!")
+                outbound_dispatcher.post(channel, summary, digest=True)
+        else:
+            # Passed verification - user keeps their verified role
+            outbound_dispatcher.post(channel, f"✅ **Verification PASSED** for {member.mention}\n"
+                                              f"`{roblox_username}` and their friends meet all requirements!{mococo_note}", digest=True)
+        return verdict, scan
                 
     except Exception as e:
         print(f"❌ Error in auto_check_user: {e}")
-        await channel.send(f"⚠️ Auto-check failed for {member.mention}: {str(e)}")
+        if not recheck:
+            outbound_dispatcher.post(channel, f"⚠️ Auto-check failed for {member.mention}: {str(e)}", digest=True)
+        verification_history.record("reverify" if recheck else "auto_check", VERDICT_ERROR, roblox_username, discord_id=member.id)
+        return VERDICT_ERROR, None
 
 async def create_flagged_channel(member, flagged_issues):
     """Create a private channel for a flagged user to discuss with administrators"""
@@ -962,17 +3921,14 @@ async def create_flagged_channel(member, flagged_issues):
         
         embed.set_footer(text="Please be patient while we review your account. Do not create additional tickets.")
         
-        await channel.send(embed=embed)
+        outbound_dispatcher.post(channel, embed=embed)
         
         # Ping perms role (but delete the ping after a few seconds to reduce spam)
-        ping_message = await channel.send(f"📢 {perms_role.mention} - New flagged user needs review")
+        ping_message = await outbound_dispatcher.send(channel, f"📢 {perms_role.mention} - New flagged user needs review")
         
-        # Delete the ping after 10 seconds to keep channel clean
-        await asyncio.sleep(10)
-        try:
-            await ping_message.delete()
-        except:
-            pass  # Ignore if already deleted
+        # Delete the ping after 10 seconds to keep channel clean (in the background,
+        # so the verification worker is not held up)
+        await ping_message.delete(delay=10)
         
         print(f"✅ Created flagged channel: #{channel_name} for {member.display_name}")
         return channel
@@ -981,6 +3937,158 @@ async def create_flagged_channel(member, flagged_issues):
         print(f"❌ Error creating flagged channel for {member.display_name}: {e}")
         return None
 
+# Re-verification scheduler configuration
+REVERIFY_ENABLED = True  # Set to False to stop background re-verification
+REVERIFY_HOURLY_API_BUDGET = 600  # Upstream API requests re-verification may spend per hour
+REVERIFY_MIN_INTERVAL = 24 * 3600  # Seconds before a member is due again
+REVERIFY_RISK_BONUS = 6 * 3600  # Each risk point makes a member due this much sooner
+REVERIFY_IDLE_POLL = 300  # Seconds to sleep when nobody is due
+REVERIFY_BUSY_POLL = 30  # Seconds to wait while interactive scans are queued or running
+REVERIFY_STATE_TTL = 90 * 24 * 3600
+
+reverify_state_cache = TTLCache("reverify", REVERIFY_STATE_TTL, 100000, store=api_disk_cache)  # Discord member ID -> last re-verification
+
+class ReverificationScheduler:
+    """Background task that keeps re-checking members who hold AUTO_CHECK_ROLE_NAME.
+
+    Members are re-verified oldest-checked first, with higher-risk members
+    treated as overdue sooner. Work goes through the verification queue as
+    background jobs, pauses while interactive scans are waiting, and stops
+    for the hour once REVERIFY_HOURLY_API_BUDGET upstream requests are spent.
+    Only a change to a failing verdict triggers the usual fail path.
+    """
+
+    def __init__(self):
+        self.task = None
+        self.spent = deque()  # (wall time, upstream requests) per re-verification
+        self.status = "starting"
+        self.current = None
+        self.checked = 0
+        self.verdict_changes = 0
+        self.errors = 0
+
+    def budget_used(self):
+        """Upstream requests spent in the last hour"""
+        cutoff = time.time() - 3600
+        while self.spent and self.spent[0][0] < cutoff:
+            self.spent.popleft()
+        return sum(calls for _, calls in self.spent)
+
+    def interactive_busy(self):
+        return verification_queue.depth() > 0 or verification_queue.running >= verification_queue.worker_count
+
+    def eligible_members(self):
+        guild = bot.get_guild(GUILD_ID)
+        role = discord.utils.get(guild.roles, name=AUTO_CHECK_ROLE_NAME) if guild else None
+        if role is None:
+            return []
+        return [member for member in role.members if not member.bot]
+
+    def due_at(self, member_id):
+        state = reverify_state_cache.peek(member_id)
+        if state is None:
+            return 0.0
+        return state["checked_at"] + REVERIFY_MIN_INTERVAL - state["risk"] * REVERIFY_RISK_BONUS
+
+    def due_members(self):
+        """Members due for a re-check, most overdue first"""
+        now = time.time()
+        due = []
+        for member in self.eligible_members():
+            state = reverify_state_cache.peek(member.id)
+            # A stored failure means staff restored the role after review; leave them alone
+            if state and state["verdict"] == VERDICT_FAIL:
+                continue
+            if self.due_at(member.id) <= now:
+                due.append(member)
+        return sorted(due, key=lambda member: self.due_at(member.id))
+
+    async def reverify(self, member):
+        roblox_username = member.nick if member.nick else member.display_name
+        channel = bot.get_channel(AUTO_CHECK_CHANNEL_ID) if AUTO_CHECK_CHANNEL_ID else None
+        previous = reverify_state_cache.peek(member.id) or {}
+        verdict, scan = VERDICT_ERROR, None
+        before = http_stats["requests"]
+        
+        if '#' in roblox_username or channel is None:
+            pass  # Nickname is not a Roblox username, or nowhere to report; retry next interval
+        else:
+            job, accepted = verification_queue.submit(
+                ("verify", member.id), PRIORITY_BACKGROUND,
+                lambda: auto_check_user(member, roblox_username, channel, recheck=True),
+                f"Re-verification of {member.mention}"
+            )
+            if job is None:
+                return False  # Queue full; try again later
+            if accepted:
+                self.current = member
+                try:
+                    verdict, scan = await asyncio.shield(job.done)
+                except Exception as e:
+                    print(f"❌ Re-verification of {member.display_name} failed: {e}")
+                finally:
+                    self.current = None
+            else:
+                verdict = previous.get("verdict", VERDICT_PASS)  # Already being verified by someone else
+        
+        self.spent.append((time.time(), http_stats["requests"] - before))
+        self.checked += 1
+        if verdict == VERDICT_ERROR:
+            self.errors += 1
+        if verdict == VERDICT_FAIL:
+            self.verdict_changes += 1
+            print(f"🚨 Re-verification changed verdict for {member.display_name} to FAIL")
+        reverify_state_cache.set(member.id, {
+            "checked_at": time.time(),
+            "verdict": verdict,
+            "risk": scan.risk_score() if scan else 0,
+        })
+        return True
+
+    async def _run(self):
+        await bot.wait_until_ready()
+        while True:
+            if not REVERIFY_ENABLED:
+                self.status = "disabled"
+                await asyncio.sleep(REVERIFY_IDLE_POLL)
+                continue
+            if self.interactive_busy():
+                self.status = "paused (interactive scans queued)"
+                await asyncio.sleep(REVERIFY_BUSY_POLL)
+                continue
+            if self.budget_used() >= REVERIFY_HOURLY_API_BUDGET:
+                self.status = "paused (hourly API budget spent)"
+                await asyncio.sleep(max(REVERIFY_BUSY_POLL, self.spent[0][0] + 3600 - time.time()))
+                continue
+            
+            members = self.eligible_members()
+            await reverify_state_cache.warm([member.id for member in members])
+            due = self.due_members()
+            if not due:
+                self.status = "idle (nobody due)"
+                await asyncio.sleep(REVERIFY_IDLE_POLL)
+                continue
+            
+            self.status = "running"
+            if not await self.reverify(due[0]):
+                self.status = "paused (verification queue full)"
+                await asyncio.sleep(REVERIFY_BUSY_POLL)
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+reverify_scheduler = ReverificationScheduler()
+
 @bot.event
 async def on_voice_state_update(member, before, after):
     global tracking_channel_id, tracked_users, is_tracking, rally_starter_id
@@ -1030,7 +4138,7 @@ async def whitelist(interaction: discord.Interaction, user: discord.Member):
         await interaction.response.send_message(f"⚠️ {user.mention} is already whitelisted.", ephemeral=True)
         return
     
-    WHITELIST.append(user.id)
+    policy_store.add_whitelist(user.id)
     await interaction.response.send_message(f"✅ Added {user.mention} to the whitelist.")
 
 @tree.command(name="removewhitelist", description="Remove a user from the whitelist (Admin only)")
@@ -1044,7 +4152,7 @@ async def removewhitelist(interaction: discord.Interaction, user: discord.Member
         await interaction.response.send_message(f"⚠️ {user.mention} is not whitelisted.", ephemeral=True)
         return
     
-    WHITELIST.remove(user.id)
+    policy_store.remove_whitelist(user.id)
     await interaction.response.send_message(f"✅ Removed {user.mention} from the whitelist.")
 
 @tree.command(name="addgroup", description="Add a group to the flagged groups list (Whitelist required)")
@@ -1059,13 +4167,12 @@ async def addgroup(interaction: discord.Interaction, group_id: int):
         return
     
     # Verify the group exists by trying to get its name
-    async with aiohttp.ClientSession() as session:
-        try:
-            group_name = await get_group_name(session, group_id)
-            FLAGGED_GROUP_IDS.append(group_id)
-            await interaction.response.send_message(f"✅ Added group **{group_name}** (ID: `{group_id}`) to the flagged groups list.")
-        except Exception:
-            await interaction.response.send_message(f"❌ Could not find a group with ID `{group_id}`. Please verify the group ID is correct.", ephemeral=True)
+    try:
+        group_name = await get_group_name(group_id)
+        snapshot = policy_store.add_group(group_id, group_name, str(interaction.user))
+        await interaction.response.send_message(f"✅ Added group **{group_name}** (ID: `{group_id}`) to the flagged groups list (policy v{snapshot.version}).")
+    except Exception:
+        await interaction.response.send_message(f"❌ Could not find a group with ID `{group_id}`. Please verify the group ID is correct.", ephemeral=True)
 
 @tree.command(name="removegroup", description="Remove a group from the flagged groups list (Whitelist required)")
 @app_commands.describe(group_id="The Roblox group ID to remove from the blacklist")
@@ -1079,15 +4186,15 @@ async def removegroup(interaction: discord.Interaction, group_id: int):
         return
     
     # Get group name for confirmation message
-    async with aiohttp.ClientSession() as session:
-        try:
-            group_name = await get_group_name(session, group_id)
-            FLAGGED_GROUP_IDS.remove(group_id)
-            await interaction.response.send_message(f"✅ Removed group **{group_name}** (ID: `{group_id}`) from the flagged groups list.")
-        except Exception:
-            # Remove anyway if we can't get the name
-            FLAGGED_GROUP_IDS.remove(group_id)
-            await interaction.response.send_message(f"✅ Removed group ID `{group_id}` from the flagged groups list.")
+    try:
+        group_name = policy_store.snapshot.group_info[group_id].get("name") or await get_group_name(group_id)
+        snapshot = policy_store.remove_group(group_id)
+        await interaction.response.send_message(f"✅ Removed group **{group_name}** (ID: `{group_id}`) from the flagged groups list (policy v{snapshot.version}).")
+    except Exception:
+        # Remove anyway if we can't get the name
+        if group_id in FLAGGED_GROUP_IDS:
+            policy_store.remove_group(group_id)
+        await interaction.response.send_message(f"✅ Removed group ID `{group_id}` from the flagged groups list.")
 
 @tree.command(name="listgroups", description="List all flagged groups (Whitelist required)")
 async def listgroups(interaction: discord.Interaction):
@@ -1101,17 +4208,20 @@ async def listgroups(interaction: discord.Interaction):
         await interaction.followup.send("📋 No groups are currently flagged.")
         return
     
-    async with aiohttp.ClientSession() as session:
-        group_list = []
-        for group_id in FLAGGED_GROUP_IDS[:20]:  # Limit to first 20 to avoid message length issues
-            try:
-                group_name = await get_group_name(session, group_id)
-                group_list.append(f"• **{group_name}** (ID: `{group_id}`)")
-            except Exception:
-                group_list.append(f"• Group ID: `{group_id}` (Name unavailable)")
+    policy = policy_store.snapshot
+    group_list = []
+    for group_id, info in list(policy.group_info.items())[:20]:  # Limit to first 20 to avoid message length issues
+        try:
+            group_name = info.get("name") or await get_group_name(group_id)
+            added = f" — added by {info['added_by']}" if info.get("added_by") else ""
+            if info.get("added_at"):
+                added += f" on {info['added_at'][:10]}"
+            group_list.append(f"• **{group_name}** (ID: `{group_id}`){added}")
+        except Exception:
+            group_list.append(f"• Group ID: `{group_id}` (Name unavailable)")
     
-    total_groups = len(FLAGGED_GROUP_IDS)
-    message = f"📋 **Flagged Groups** ({total_groups} total):\n\n" + "\n".join(group_list)
+    total_groups = len(policy.group_info)
+    message = f"📋 **Flagged Groups** ({total_groups} total, policy v{policy.version}):\n\n" + "\n".join(group_list)
     
     if total_groups > 20:
         message += f"\n\n*Showing first 20 of {total_groups} groups*"
@@ -1120,25 +4230,23 @@ async def listgroups(interaction: discord.Interaction):
 
 @tree.command(name="mocostatus", description="Check Mococo API status and information")
 async def mocostatus(interaction: discord.Interaction):
-    await interaction.response.defer(thinking=True)
+    state_labels = {
+        CircuitBreaker.CLOSED: "🟢 Online (breaker closed)",
+        CircuitBreaker.HALF_OPEN: "🟡 Recovering (breaker half-open, probing)",
+        CircuitBreaker.OPEN: "🔴 Offline (breaker open, failing fast)",
+    }
+    status = state_labels[mococo_breaker.state]
+    if mococo_breaker.state == CircuitBreaker.OPEN:
+        remaining = max(0, mococo_breaker.opened_until - time.monotonic())
+        status += f"\nNext probe in {remaining:.0f}s"
+    if mococo_breaker.calls == 0:
+        status = "⚪ No calls yet since startup"
     
-    async with aiohttp.ClientSession() as session:
-        try:
-            # Test API connectivity
-            url = f"{MOCOCO_API_BASE}/status"  # Assuming there's a status endpoint
-            async with session.get(url, timeout=5) as resp:
-                if resp.status == 200:
-                    status = "🟢 Online"
-                else:
-                    status = f"🟡 Issues (Status: {resp.status})"
-        except:
-            # Try with a test user ID if status endpoint doesn't exist
-            try:
-                url = f"{MOCOCO_USER_ENDPOINT}/1"  # Test with Roblox user ID 1
-                async with session.get(url, timeout=5) as resp:
-                    status = "🟢 Online" if resp.status in [200, 404] else f"🟡 Issues (Status: {resp.status})"
-            except:
-                status = "🔴 Offline"
+    percentiles = mococo_breaker.latency_percentiles()
+    if percentiles:
+        latency = " | ".join(f"p{p}: {seconds * 1000:.0f}ms" for p, seconds in percentiles.items())
+    else:
+        latency = "No data"
     
     embed = discord.Embed(
         title="🤖 Mococo API Status",
@@ -1147,13 +4255,534 @@ async def mocostatus(interaction: discord.Interaction):
     )
     
     embed.add_field(name="API Status", value=status, inline=True)
+    embed.add_field(
+        name="Error Rate",
+        value=f"{mococo_breaker.error_rate():.0%} of last {len(mococo_breaker.outcomes)} calls\n"
+              f"{mococo_breaker.failures}/{mococo_breaker.calls} failed since startup",
+        inline=True
+    )
+    embed.add_field(name="Latency", value=latency, inline=False)
+    embed.add_field(
+        name="Resilience",
+        value=f"**Retries:** {mococo_breaker.retries}\n"
+              f"**Rejected (fast-fail):** {mococo_breaker.rejected}\n"
+              f"**Times opened:** {mococo_breaker.times_opened}\n"
+              f"**Cache hit ratio:** {mococo_cache.hit_ratio():.1%}",
+        inline=True
+    )
     embed.add_field(name="Base URL", value=MOCOCO_API_BASE, inline=True)
     embed.add_field(name="Purpose", value="Detects suspicious/condo content associations", inline=False)
     embed.add_field(name="Commands Using Mococo", value="• `/deepcheck` - Full scan with Mococo\n• `/check` - Quick Mococo alert", inline=False)
     
     embed.set_footer(text="Mococo API helps identify users associated with inappropriate Roblox content")
     
-    await interaction.followup.send(embed=embed)
+    await interaction.response.send_message(embed=embed)
+
+@tree.command(name="httpstats", description="Show shared HTTP client connection statistics (Admin only)")
+async def httpstats(interaction: discord.Interaction):
+    """Show request and connection reuse counters for the shared HTTP client"""
+    if not check_admin_or_whitelist(interaction.user):
+        await interaction.response.send_message("❌ You are not authorized to use this command.", ephemeral=True)
+        return
+    
+    embed = discord.Embed(
+        title="🌐 HTTP Client Statistics",
+        description="Counters for the shared connection pool since startup",
+        color=discord.Color.blue()
+    )
+    embed.add_field(name="Requests", value=str(http_stats["requests"]), inline=True)
+    embed.add_field(name="Request Errors", value=str(http_stats["request_errors"]), inline=True)
+    embed.add_field(name="New Connections", value=str(http_stats["connections_created"]), inline=True)
+    embed.add_field(name="Reused Connections", value=str(http_stats["connections_reused"]), inline=True)
+    embed.add_field(name="Reuse Ratio", value=f"{get_connection_reuse_ratio():.1%}", inline=True)
+    embed.add_field(
+        name="Pool Limits",
+        value=f"**Total:** {HTTP_CONNECTION_LIMIT}\n"
+              f"**Per host:** {HTTP_CONNECTION_LIMIT_PER_HOST}\n"
+              f"**Keep-alive:** {HTTP_KEEPALIVE_TIMEOUT}s",
+        inline=True
+    )
+    
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@tree.command(name="queuestatus", description="Show verification queue depth and wait times (Admin only)")
+async def queuestatus(interaction: discord.Interaction):
+    """Show queue depth per lane, running scans and recent wait times"""
+    if not check_admin_or_whitelist(interaction.user):
+        await interaction.response.send_message("❌ You are not authorized to use this command.", ephemeral=True)
+        return
+    
+    average_wait, p95_wait = verification_queue.wait_stats()
+    embed = discord.Embed(
+        title="📥 Verification Queue",
+        description=f"{verification_queue.worker_count} workers shared by all scans",
+        color=discord.Color.blue()
+    )
+    embed.add_field(
+        name="Depth",
+        value=f"**Running:** {verification_queue.running}\n"
+              f"**Interactive queued:** {verification_queue.depth(PRIORITY_INTERACTIVE)}\n"
+              f"**Background queued:** {verification_queue.depth(PRIORITY_BACKGROUND)}/{verification_queue.max_background}",
+        inline=True
+    )
+    embed.add_field(
+        name="Wait Time",
+        value=f"**Average:** {average_wait:.1f}s\n**p95:** {p95_wait:.1f}s",
+        inline=True
+    )
+    embed.add_field(
+        name="Totals",
+        value=f"**Enqueued:** {verification_queue.enqueued}\n"
+              f"**Completed:** {verification_queue.completed}\n"
+              f"**Failed:** {verification_queue.failed}\n"
+              f"**Duplicates dropped:** {verification_queue.deduplicated}\n"
+              f"**Rejected (full):** {verification_queue.rejected}",
+        inline=True
+    )
+    embed.add_field(
+        name="Discord Outbound",
+        value=f"**Queued sends:** {sum(len(queue) for queue in outbound_dispatcher.queues.values())} "
+              f"across {len(outbound_dispatcher.queues)} channels\n"
+              f"**Messages requested:** {outbound_dispatcher.requested}\n"
+              f"**API calls:** {outbound_dispatcher.api_calls} ({outbound_dispatcher.saved_ratio():.0%} saved)\n"
+              f"**Digests:** {outbound_dispatcher.digests} merging {outbound_dispatcher.digested} messages\n"
+              f"**Failed sends:** {outbound_dispatcher.failed}",
+        inline=False
+    )
+    
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@tree.command(name="reverifystatus", description="Show background re-verification progress (Admin only)")
+async def reverifystatus(interaction: discord.Interaction):
+    """Show what the re-verification scheduler is doing and how much budget it has used"""
+    if not check_admin_or_whitelist(interaction.user):
+        await interaction.response.send_message("❌ You are not authorized to use this command.", ephemeral=True)
+        return
+    
+    scheduler = reverify_scheduler
+    members = scheduler.eligible_members()
+    day_ago = time.time() - 24 * 3600
+    states = [reverify_state_cache.peek(member.id) for member in members]
+    checked_today = sum(1 for state in states if state and state["checked_at"] >= day_ago)
+    never_checked = sum(1 for state in states if state is None)
+    budget_used = scheduler.budget_used()
+    
+    embed = discord.Embed(
+        title="🔁 Re-verification Scheduler",
+        description=f"**Status:** {scheduler.status}" +
+                    (f"\n**Checking:** {scheduler.current.mention}" if scheduler.current else ""),
+        color=discord.Color.green() if scheduler.status == "running" else discord.Color.blue()
+    )
+    embed.add_field(
+        name="Members",
+        value=f"**Holding `{AUTO_CHECK_ROLE_NAME}`:** {len(members)}\n"
+              f"**Due now:** {len(scheduler.due_members())}\n"
+              f"**Checked in last 24h:** {checked_today}\n"
+              f"**Never re-checked:** {never_checked}",
+        inline=True
+    )
+    embed.add_field(
+        name="API Budget",
+        value=f"**Used this hour:** {budget_used}/{REVERIFY_HOURLY_API_BUDGET} requests\n"
+              f"**Re-checks this hour:** {len(scheduler.spent)}\n"
+              f"**Interval:** every {REVERIFY_MIN_INTERVAL // 3600}h (sooner for risky members)",
+        inline=True
+    )
+    embed.add_field(
+        name="Totals",
+        value=f"**Re-checked:** {scheduler.checked}\n"
+              f"**Now failing:** {scheduler.verdict_changes}\n"
+              f"**Errors:** {scheduler.errors}",
+        inline=True
+    )
+    
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@tree.command(name="history", description="Show past verification results for a member or Roblox account (Admin only)")
+@app_commands.describe(
+    member="Discord member to look up",
+    roblox_username="Roblox account to look up (also finds checks run by username)",
+    limit="Number of records to show",
+    export="Attach the matching records (every record if no filter) as a JSONL file"
+)
+async def history(interaction: discord.Interaction, member: discord.Member = None, roblox_username: str = None,
+                  limit: app_commands.Range[int, 1, 25] = 10, export: bool = False):
+    """Look up stored verdicts, newest first, showing where the verdict changed"""
+    if not check_admin_or_whitelist(interaction.user):
+        await interaction.response.send_message("❌ You are not authorized to use this command.", ephemeral=True)
+        return
+    
+    await interaction.response.defer(ephemeral=True)
+    discord_id = member.id if member else None
+    roblox_id = None
+    if roblox_username is None and member and member.id in user_links:
+        roblox_username = user_links[member.id]
+    if roblox_username:
+        roblox_id = await get_user_id(roblox_username)
+    label = member.mention if member else f"`{roblox_username}`" if roblox_username else "all members"
+    
+    if export:
+        path = f"history_export_{int(time.time())}.jsonl"
+        exported = await verification_history.export(path, discord_id, roblox_id, roblox_username)
+        await interaction.followup.send(f"📤 Exported **{exported}** records for {label}.", file=discord.File(path), ephemeral=True)
+        os.remove(path)
+        return
+    
+    if discord_id is None and roblox_username is None:
+        await interaction.followup.send("❌ Give a member or a Roblox username (or use `export` for everything).", ephemeral=True)
+        return
+    
+    start = time.perf_counter()
+    # One extra record so the oldest shown one can say whether its verdict changed
+    records = await verification_history.query(discord_id, roblox_id, limit + 1, roblox_username)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    
+    embed = discord.Embed(title="📜 Verification History", description=f"Results for {label}", color=discord.Color.blue())
+    if not records:
+        embed.description += "\n\nNo verification results stored."
+    for record, older in zip(records[:limit], records[1:limit + 1] + [None]):
+        summary = record["summary"]
+        lines = [f"**{record['command']}** of `{record['username']}` → {VERDICT_EMOJI.get(record['verdict'], '')} **{record['verdict']}**"]
+        if older and older["verdict"] != record["verdict"]:
+            lines.append(f"🔀 Changed from **{older['verdict']}**")
+        if summary:
+            lines.append(f"Badges {summary['badges']} | flagged groups {summary['flagged_groups']} | "
+                         f"flagged friends {summary['flagged_friends']}/{summary['friends_checked']}")
+            if summary["added_friends"] or summary["removed_friends"]:
+                lines.append(f"Friends +{summary['added_friends']} / -{summary['removed_friends']} since previous scan")
+        issues = (record["detail"] or {}).get("friend_issues", []) + [
+            f"In flagged group: {name}" for name in (record["detail"] or {}).get("flagged_groups", [])
+        ]
+        if issues:
+            more = f" (+{len(issues) - 3} more)" if len(issues) > 3 else ""
+            lines.append("\n".join(issue[:150] for issue in issues[:3]) + more)
+        if record["repeats"]:
+            lines.append(f"Same verdict {record['repeats']} more times until <t:{int(record['last_checked_at'])}:d>")
+        lines.insert(0, f"<t:{int(record['checked_at'])}:R>")
+        checked_at = datetime.fromtimestamp(record["checked_at"]).strftime("%Y-%m-%d %H:%M")
+        embed.add_field(name=checked_at, value="\n".join(lines)[:1024], inline=False)
+    embed.set_footer(text=f"Query took {elapsed_ms:.1f}ms | policy v{records[0]['policy_version'] if records else policy_store.snapshot.version}")
+    
+    await interaction.followup.send(embed=embed, ephemeral=True)
+
+@tree.command(name="ratelimits", description="Show per-host API rate limiter state (Admin only)")
+async def ratelimits(interaction: discord.Interaction):
+    """Show the current rate, concurrency and queue depth for each upstream host"""
+    if not check_admin_or_whitelist(interaction.user):
+        await interaction.response.send_message("❌ You are not authorized to use this command.", ephemeral=True)
+        return
+    
+    embed = discord.Embed(
+        title="⏱️ API Rate Limiters",
+        description="Adaptive per-host limits shared by every scan",
+        color=discord.Color.blue()
+    )
+    for host, limiter in sorted(host_limiters.items()):
+        stats = limiter.stats()
+        paused = f"\n**Paused:** {stats['paused_for']:.1f}s" if stats['paused_for'] else ""
+        embed.add_field(
+            name=host,
+            value=f"**Rate:** {stats['rate']:.1f} req/s (started at {stats['start_rate']}, probes up to {stats['max_rate']})\n"
+                  f"**Concurrency:** {stats['in_flight']}/{stats['concurrency']} (max {stats['max_concurrency']})\n"
+                  f"**Queued:** {stats['queue_depth']}\n"
+                  f"**Requests:** {stats['requests']} | **Throttled:** {stats['throttled']}"
+                  f"{paused}",
+            inline=True
+        )
+    if not host_limiters:
+        embed.add_field(name="No traffic yet", value="Limiters are created on first request to each host", inline=False)
+    
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@tree.command(name="cachestats", description="Show cache hit, miss and eviction counters (Admin only)")
+async def cachestats(interaction: discord.Interaction):
+    """Show per-cache counters so TTLs and sizes can be tuned"""
+    if not check_admin_or_whitelist(interaction.user):
+        await interaction.response.send_message("❌ You are not authorized to use this command.", ephemeral=True)
+        return
+    
+    embed = discord.Embed(
+        title="🗃️ Cache Statistics",
+        description="Counters since startup",
+        color=discord.Color.blue()
+    )
+    for cache in cache_registry:
+        stats = cache.stats()
+        embed.add_field(
+            name=cache.name,
+            value=f"**Entries:** {stats['entries']}/{stats['max_entries']}\n"
+                  f"**Hit ratio:** {stats['hit_ratio']:.1%}\n"
+                  f"**Hits:** {stats['hits']} ({stats['negative_hits']} negative, {stats['stale_hits']} stale)\n"
+                  f"**Misses:** {stats['misses']}\n"
+                  f"**Evictions:** {stats['evictions']} | **Expired:** {stats['expirations']}\n"
+                  f"**Loaded from disk:** {stats['disk_hits']}",
+            inline=True
+        )
+    
+    flights = "\n".join(
+        f"**{flight.name}:** {flight.shared}/{flight.calls} shared ({flight.dedupe_rate():.1%})"
+        for flight in singleflight_registry
+    )
+    for batcher in batcher_registry:
+        flights += (f"\n**{batcher.name} batches:** {batcher.shared_lookups}/{batcher.lookups} shared, "
+                    f"{batcher.ids_requested} IDs in {batcher.requests_sent} requests")
+    embed.add_field(name="In-flight Dedupe", value=flights, inline=False)
+    
+    fresh_groups, flagged_groups = roster_index.coverage()
+    crawled = [roster.crawled_at for roster in roster_index.rosters.values() if not roster.too_large]
+    oldest = f"{(time.time() - min(crawled)) / 60:.0f}m ago" if crawled else "never"
+    too_large = sum(1 for roster in roster_index.rosters.values() if roster.too_large)
+    embed.add_field(
+        name="Flagged Group Roster Index",
+        value=f"**Fresh rosters:** {fresh_groups}/{flagged_groups} ({too_large} too large, live lookups)\n"
+              f"**Users indexed:** {len(roster_index.members)}\n"
+              f"**Oldest full crawl:** {oldest}\n"
+              f"**Local answers:** {roster_index.local_hits} | **Live fallbacks:** {roster_index.live_fallbacks}\n"
+              f"**Pages crawled:** {roster_index.pages_crawled} | **Errors:** {roster_index.crawl_errors}",
+        inline=False
+    )
+    
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+# Metrics endpoint configuration
+METRICS_HOST = "127.0.0.1"  # Local only; put a reverse proxy in front to scrape remotely
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))  # 0 disables the HTTP endpoint
+LOOP_LAG_INTERVAL = 0.5  # Seconds between event loop lag probes
+
+cache_hits = metrics.gauge("bot_cache_hits", "Cache hits since startup")
+cache_misses = metrics.gauge("bot_cache_misses", "Cache misses since startup")
+cache_hit_ratio = metrics.gauge("bot_cache_hit_ratio", "Cache hit ratio since startup")
+cache_entries = metrics.gauge("bot_cache_entries", "Entries held in memory per cache")
+queue_depth = metrics.gauge("bot_queue_depth", "Verification jobs waiting by priority")
+queue_running = metrics.gauge("bot_queue_running", "Verification jobs running")
+outbound_backlog = metrics.gauge("bot_discord_outbound_queued", "Channel messages waiting in the outbound dispatcher")
+limiter_rate = metrics.gauge("bot_rate_limiter_rate", "Current allowed requests/second per host")
+limiter_queued = metrics.gauge("bot_rate_limiter_queued", "Requests waiting for a rate limiter slot per host")
+loop_lag_current = metrics.gauge("bot_event_loop_lag_current_seconds", "Most recent event loop lag probe")
+
+def collect_runtime_metrics():
+    """Copy counters kept by caches, queues and limiters into gauges"""
+    for cache in cache_registry:
+        stats = cache.stats()
+        cache_hits.set(stats["hits"], cache=cache.name)
+        cache_misses.set(stats["misses"], cache=cache.name)
+        cache_hit_ratio.set(round(stats["hit_ratio"], 4), cache=cache.name)
+        cache_entries.set(stats["entries"], cache=cache.name)
+    queue_depth.set(verification_queue.depth(PRIORITY_INTERACTIVE), priority="interactive")
+    queue_depth.set(verification_queue.depth(PRIORITY_BACKGROUND), priority="background")
+    queue_running.set(verification_queue.running)
+    outbound_backlog.set(sum(len(queue) for queue in outbound_dispatcher.queues.values()))
+    for host, limiter in host_limiters.items():
+        stats = limiter.stats()
+        limiter_rate.set(round(stats["rate"], 3), host=host)
+        limiter_queued.set(stats["queue_depth"], host=host)
+
+metrics.collectors.append(collect_runtime_metrics)
+
+class MetricsExporter:
+    """Serves /metrics on METRICS_HOST:METRICS_PORT and probes event loop lag"""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.runner = None
+        self.lag_task = None
+        self.scrapes = 0
+
+    async def handle_metrics(self, request):
+        self.scrapes += 1
+        return web.Response(text=metrics.render(), content_type="text/plain", charset="utf-8",
+                            headers={"X-Content-Type-Options": "nosniff"})
+
+    async def _probe_lag(self):
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(LOOP_LAG_INTERVAL)
+            lag = max(0.0, time.monotonic() - start - LOOP_LAG_INTERVAL)
+            loop_lag.observe(lag)
+            loop_lag_current.set(round(lag, 4))
+
+    async def start(self):
+        if self.lag_task is None:
+            self.lag_task = asyncio.create_task(self._probe_lag())
+        if self.port and self.runner is None:
+            app = web.Application()
+            app.router.add_get("/metrics", self.handle_metrics)
+            self.runner = web.AppRunner(app, access_log=None)
+            await self.runner.setup()
+            try:
+                await web.TCPSite(self.runner, self.host, self.port).start()
+                print(f"📈 Serving metrics on http://{self.host}:{self.port}/metrics")
+            except OSError as e:
+                print(f"⚠️ Could not serve metrics on port {self.port}: {e}")
+                await self.runner.cleanup()
+                self.runner = None
+
+    async def stop(self):
+        if self.lag_task is not None:
+            self.lag_task.cancel()
+            try:
+                await self.lag_task
+            except asyncio.CancelledError:
+                pass
+            self.lag_task = None
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+metrics_exporter = MetricsExporter(METRICS_HOST, METRICS_PORT)
+
+@tree.command(name="botstats", description="Summarize API latency, cache efficiency and scan throughput (Admin only)")
+async def botstats(interaction: discord.Interaction):
+    """Condensed view of the /metrics endpoint"""
+    if not check_admin_or_whitelist(interaction.user):
+        await interaction.response.send_message("❌ You are not authorized to use this command.", ephemeral=True)
+        return
+    
+    metrics.collect()
+    embed = discord.Embed(
+        title="📈 Bot Statistics",
+        description=f"Since startup | full metrics on port {METRICS_PORT}" if metrics_exporter.runner else "Since startup",
+        color=discord.Color.blue()
+    )
+    
+    # Upstream latency per endpoint, slowest p95 first
+    endpoint_lines = []
+    for key, series in sorted(upstream_latency.values.items(), key=lambda item: -upstream_latency.quantile(0.95, item[0])):
+        endpoint = dict(key)["endpoint"]
+        failures = sum(value for labels, value in upstream_responses.values.items()
+                       if dict(labels)["endpoint"] == endpoint and not dict(labels)["status"].startswith("2"))
+        failures += sum(value for labels, value in upstream_errors.values.items() if dict(labels)["endpoint"] == endpoint)
+        endpoint_lines.append(
+            f"**{endpoint}:** {series['count']} req | p50 {upstream_latency.quantile(0.5, key) * 1000:.0f}ms | "
+            f"p95 {upstream_latency.quantile(0.95, key) * 1000:.0f}ms | non-2xx {failures}"
+        )
+    embed.add_field(name="Upstream Latency", value="\n".join(endpoint_lines)[:1024] or "No requests yet", inline=False)
+    
+    wait_lines = [
+        f"**{dict(key)['host']}:** p95 wait {rate_limit_wait.quantile(0.95, key) * 1000:.0f}ms"
+        for key in rate_limit_wait.values
+    ]
+    embed.add_field(name="Rate Limiter Wait", value="\n".join(wait_lines)[:1024] or "No requests yet", inline=True)
+    
+    discord_lines = [
+        f"**Channel sends:** {series['count']} | p95 {discord_send_latency.quantile(0.95, key) * 1000:.0f}ms"
+        for key, series in discord_send_latency.values.items()
+    ]
+    failed_sends = sum(value for labels, value in discord_sends.values.items() if dict(labels)["status"] != "200")
+    discord_lines.append(f"**Failed sends:** {failed_sends} | **Queued:** {outbound_backlog.get()}")
+    embed.add_field(name="Discord", value="\n".join(discord_lines), inline=True)
+    
+    hits = sum(cache_hits.values.values())
+    lookups = hits + sum(cache_misses.values.values())
+    embed.add_field(
+        name="Caches",
+        value=f"**Overall hit ratio:** {hits / lookups if lookups else 0:.1%} ({lookups} lookups)\n" +
+              "\n".join(f"**{dict(key)['cache']}:** {ratio:.1%}" for key, ratio in cache_hit_ratio.values.items()),
+        inline=True
+    )
+    
+    scan_lines = []
+    for key, series in scan_duration.values.items():
+        command = dict(key)["command"]
+        scan_lines.append(f"**{command}:** {series['count']} scans | avg {series['sum'] / series['count']:.1f}s | "
+                          f"p95 {scan_duration.quantile(0.95, key):.1f}s")
+    embed.add_field(name="Scan Duration", value="\n".join(scan_lines) or "No scans yet", inline=False)
+    
+    lag_series = loop_lag.values.get(())
+    embed.add_field(
+        name="Queue & Event Loop",
+        value=f"**Queued:** {queue_depth.get(priority='interactive')} interactive, {queue_depth.get(priority='background')} background\n"
+              f"**Running:** {queue_running.get()}\n"
+              f"**Loop lag:** {loop_lag_current.get() * 1000:.0f}ms now" +
+              (f", p99 {loop_lag.quantile(0.99, ()) * 1000:.0f}ms" if lag_series else ""),
+        inline=False
+    )
+    
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+# Perfstats configuration
+WATERFALL_WIDTH = 24  # Characters in each waterfall bar
+WATERFALL_MAX_LINES = 30
+WATERFALL_LABEL_WIDTH = 26
+
+def render_waterfall(trace):
+    """Text waterfall of a trace. Sibling spans sharing a name (per-friend checks, HTTP pages) collapse into one row."""
+    total = trace.root.duration or max((span.start + (span.duration or 0) for span in trace.spans), default=0) or 1e-9
+    children = {}
+    for span in trace.spans[1:]:
+        children.setdefault(span.parent_id, []).append(span)
+    lines = []
+
+    def end_of(span):
+        return span.start + span.duration if span.duration is not None else total
+
+    def row(label, start, end, note):
+        left = min(WATERFALL_WIDTH - 1, int(start / total * WATERFALL_WIDTH))
+        right = max(left + 1, min(WATERFALL_WIDTH, round(end / total * WATERFALL_WIDTH)))
+        bar = " " * left + "█" * (right - left) + " " * (WATERFALL_WIDTH - right)
+        lines.append(f"{label[:WATERFALL_LABEL_WIDTH]:<{WATERFALL_LABEL_WIDTH}} {bar} {note}")
+
+    def walk(span, depth):
+        groups = {}
+        for child in sorted(children.get(span.span_id, []), key=lambda child: child.start):
+            groups.setdefault(child.name, []).append(child)
+        for name, group in groups.items():
+            if len(lines) >= WATERFALL_MAX_LINES:
+                return
+            indent = "  " * depth
+            if len(group) == 1:
+                child = group[0]
+                note = f"{child.duration:.2f}s" if child.duration is not None else "running"
+                row(f"{indent}{name}", child.start, end_of(child), note)
+                walk(child, depth + 1)
+            else:
+                durations = sorted(child.duration or 0.0 for child in group)
+                row(f"{indent}{name} ×{len(group)}", min(child.start for child in group), max(end_of(child) for child in group),
+                    f"p50 {durations[len(durations) // 2]:.2f}s max {durations[-1]:.2f}s")
+
+    row(trace.root.tags.get("command", trace.root.name), 0.0, total, f"{total:.2f}s")
+    walk(trace.root, 1)
+    return lines
+
+@tree.command(name="perfstats", description="Show a timing waterfall of the latest scan of a user (Admin only)")
+@app_commands.describe(user="Roblox username from the scan")
+async def perfstats(interaction: discord.Interaction, user: str):
+    """Break down where the most recent scan of a user spent its time"""
+    if not check_admin_or_whitelist(interaction.user):
+        await interaction.response.send_message("❌ You are not authorized to use this command.", ephemeral=True)
+        return
+    
+    trace = await tracer.latest(user)
+    if trace is None:
+        await interaction.response.send_message(f"❌ No trace stored for `{user}`. Run `/check` or `/deepcheck` on them first.", ephemeral=True)
+        return
+    
+    waterfall = "\n".join(render_waterfall(trace))
+    embed = discord.Embed(
+        title=f"⏱️ Scan Timing for `{trace.root.tags.get('user', user)}`",
+        description=f"**{trace.root.tags.get('command', trace.root.name)}** <t:{int(trace.started_at)}:R> | "
+                    f"{len(trace.spans)} spans" + (f" ({trace.dropped} dropped)" if trace.dropped else "") +
+                    f"\n```\n{waterfall[:3800]}\n```",
+        color=discord.Color.blue()
+    )
+    
+    # Where upstream time went, by endpoint
+    upstream = {}
+    for span in trace.spans:
+        if "endpoint" in span.tags and span.duration is not None:
+            calls, seconds = upstream.get(span.tags["endpoint"], (0, 0.0))
+            upstream[span.tags["endpoint"]] = (calls + 1, seconds + span.duration)
+    if upstream:
+        embed.add_field(
+            name="Upstream Calls",
+            value="\n".join(f"**{endpoint}:** {calls} calls, {seconds:.2f}s total"
+                            for endpoint, (calls, seconds) in sorted(upstream.items(), key=lambda item: -item[1][1]))[:1024],
+            inline=False
+        )
+    embed.set_footer(text=f"Trace {trace.trace_id} | written to {TRACE_FILE}")
+    
+    await interaction.response.send_message(embed=embed, ephemeral=True)
 
 @tree.command(name="autoconfig", description="Configure automatic Bloxlink verification checking (Admin only)")
 @app_commands.describe(
@@ -1171,17 +4800,19 @@ async def autoconfig(
         await interaction.response.send_message("❌ Only admins can configure auto-check settings.", ephemeral=True)
         return
     
-    global ENABLE_AUTO_CHECK, AUTO_CHECK_ROLE_NAME, AUTO_CHECK_CHANNEL_ID
-    
     # Update settings if provided
+    updates = {}
     if enable is not None:
-        ENABLE_AUTO_CHECK = enable
+        updates["enable_auto_check"] = enable
     
     if role_name is not None:
-        AUTO_CHECK_ROLE_NAME = role_name
+        updates["auto_check_role_name"] = role_name
     
     if channel is not None:
-        AUTO_CHECK_CHANNEL_ID = channel.id
+        updates["auto_check_channel_id"] = channel.id
+    
+    if updates:
+        policy_store.update_config(**updates)
     
     # Show current settings
     status_emoji = "🟢" if ENABLE_AUTO_CHECK else "🔴"
@@ -1224,6 +4855,19 @@ async def autoconfig(
     
     await interaction.response.send_message(embed=embed)
 
+@bot.event
+async def setup_hook():
+    """Open long-lived resources before the gateway connects"""
+    await get_http_session()
+    await metrics_exporter.start()
+    data_journal.start()
+    api_disk_cache.start()
+    verification_history.start()
+    tracer.start()
+    verification_queue.start()
+    roster_index.start()
+    reverify_scheduler.start()
+
 @bot.event
 async def on_ready():
     """Bot startup event"""
@@ -1316,7 +4960,12 @@ async def testcheck(interaction: discord.Interaction):
     
     # Run the auto-check
     try:
-        await auto_check_user(member, roblox_username, target_channel, test_mode=True, interaction=interaction)
+        await run_queued(
+            interaction,
+            ("verify", member.id),
+            lambda: auto_check_user(member, roblox_username, target_channel, test_mode=True, interaction=interaction),
+            f"Verification of {member.mention}"
+        )
         success_embed = discord.Embed(
             title="✅ Test Complete",
             description="Auto-check test completed successfully!",
@@ -1406,6 +5055,7 @@ async def debugroles(interaction: discord.Interaction, user: discord.Member = No
 
 # Load data at startup
 load_data()
+policy_store.load()
 
 # Save data on exit
 import atexit
@@ -1443,7 +5093,12 @@ async def verify(interaction: discord.Interaction):
     
     # Run the auto-check function
     try:
-        await auto_check_user(member, roblox_username, target_channel, test_mode=False, interaction=interaction)
+        await run_queued(
+            interaction,
+            ("verify", member.id),
+            lambda: auto_check_user(member, roblox_username, target_channel, test_mode=False, interaction=interaction),
+            f"Verification of {member.mention}"
+        )
         
         success_embed = discord.Embed(
             title="✅ Verification Complete",
@@ -1558,8 +5213,7 @@ async def privacy_reset(interaction: discord.Interaction):
         await interaction.response.send_message("❌ You are not authorized to use this command.", ephemeral=True)
         return
     
-    global PRIVACY_ISSUE_CHANNEL_ID
-    PRIVACY_ISSUE_CHANNEL_ID = None
+    policy_store.update_config(privacy_issue_channel_id=None)
     
     embed = discord.Embed(
         title="✅ Privacy Channel Reset",
@@ -1607,17 +5261,52 @@ async def on_member_update(before, after):
                 target_channel = after.guild.text_channels[0]
         
         if target_channel:
-            try:
-                await auto_check_user(after, roblox_username, target_channel, test_mode=False)
-            except Exception as e:
-                print(f"❌ Auto-check failed for {after.display_name}: {e}")
+            async def run_auto_check():
                 try:
-                    await target_channel.send(f"⚠️ Auto-check failed for {after.mention}: {str(e)}")
-                except:
-                    pass  # If we can't send the error message, just log it
+                    await auto_check_user(after, roblox_username, target_channel, test_mode=False)
+                except Exception as e:
+                    print(f"❌ Auto-check failed for {after.display_name}: {e}")
+                    # Send failures are logged by the dispatcher
+                    outbound_dispatcher.post(target_channel, f"⚠️ Auto-check failed for {after.mention}: {str(e)}", digest=True)
+            
+            # Queue behind interactive checks instead of scanning inline
+            job, accepted = verification_queue.submit(
+                ("verify", after.id), PRIORITY_BACKGROUND, run_auto_check, f"Auto-check of {after.mention}"
+            )
+            if job is None:
+                print(f"⚠️ Verification queue full, dropping auto-check for {after.display_name}")
+                outbound_dispatcher.post(target_channel, f"⚠️ Verification queue is full; {after.mention} can run `/verify` once it clears.", digest=True)
+            elif not accepted:
+                print(f"⏭️ Auto-check for {after.display_name} already queued or running")
+            else:
+                position = verification_queue.position(job)
+                if position > 0:
+                    outbound_dispatcher.post(target_channel, f"⏳ Auto-check for {after.mention} queued, position {position}.", digest=True)
         else:
             print(f"❌ No suitable channel found for auto-check of {after.display_name}")
 
 
-bot.run(TOKEN)
+async def main():
+    """Run the bot and release shared resources on shutdown"""
+    discord.utils.setup_logging()
+    async with bot:
+        try:
+            await bot.start(TOKEN)
+        finally:
+            await reverify_scheduler.stop()
+            await verification_queue.stop()
+            await outbound_dispatcher.stop()
+            await roster_index.stop()
+            await data_journal.close()
+            await verification_history.close()
+            await tracer.close()
+            await api_disk_cache.close()
+            await close_http_session()
+            await metrics_exporter.stop()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
 